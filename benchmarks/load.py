@@ -0,0 +1,240 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+# load test of GET /play: a seeded mix of requests is sent by a fixed number of concurrent clients, each
+# sending its next request once the previous one answered. the local target stands in for Lambda with one
+# fresh interpreter per concurrent client, like the containers Lambda would scale out to, each importing
+# the handler on its first request (its cold start). --url sends the same mix over HTTP to `sls offline`
+# or local_server.py, which tell cold from warm invocations with the X-Container-Invocation header
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'load_baseline.json')
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_REQUESTS = 200
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MIX = 'single:8,seeded:1,big:1'
+DEFAULT_TIMEOUT = 60.0
+BIG_LOBBY_PLAYERS = 1000
+
+# the /play query of every kind of request, by request number
+SCENARIOS: Dict[str, Callable[[int], Dict[str, str]]] = {
+    'single': lambda number: {},
+    'seeded': lambda number: {'seed': str(number)},
+    'big': lambda number: {'players': str(BIG_LOBBY_PLAYERS), 'seed': str(number)},
+    'suspicion': lambda number: {'bots': 'suspicion', 'seed': str(number)},
+}
+
+class Invocation(object):
+    __slots__ = ('scenario', 'status', 'latency_ms', 'init_ms', 'cold', 'container_peak_kb')
+
+    def __init__(self, scenario: str, status: int, latency_ms: float, init_ms: float = 0.0, cold: bool = False,
+                 container_peak_kb: Optional[int] = None):
+        self.scenario = scenario
+        self.status = status
+        # as seen by the client, a cold invocation includes its container's init
+        self.latency_ms = latency_ms
+        self.init_ms = init_ms
+        self.cold = cold
+        # the container's peak memory once it answered, which earlier requests may have set
+        self.container_peak_kb = container_peak_kb
+
+def parse_mix(value: str) -> Dict[str, float]:
+    # single:8,big:1 sends 8 single games for every big lobby
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition(':')
+        if name not in SCENARIOS:
+            raise ValueError(f"unknown scenario {name}, expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+        if mix[name] <= 0:
+            raise ValueError("scenario weights must be positive")
+    return mix
+
+def plan_requests(mix: Dict[str, float], requests: int, seed: int) -> List[Tuple[str, Dict[str, str]]]:
+    # the same seed sends the same requests in the same order, so runs on two commits compare
+    rng = random.Random(seed)
+    names = rng.choices(list(mix), weights=list(mix.values()), k=requests)
+    return [(name, SCENARIOS[name](number)) for number, name in enumerate(names)]
+
+_handler = None
+
+def _init_local_worker():
+    # what the function logs isn't part of the load test, the variables are read when the handler is imported
+    os.environ['WEREWOLF_LOG_QUIET'] = '1'
+    os.environ['WEREWOLF_LOG_FILE'] = ''
+
+def _invoke_local(scenario: str, params: Dict[str, str]) -> Invocation:
+    # runs in a worker process, the first call imports the handler like a Lambda init
+    global _handler
+    init_ms = 0.0
+    cold = _handler is None
+    if cold:
+        start = time.perf_counter()
+        import handler
+        _handler = handler
+        init_ms = (time.perf_counter() - start) * 1e3
+    start = time.perf_counter()
+    response = _handler.play({'queryStringParameters': params or None}, None)
+    latency_ms = (time.perf_counter() - start) * 1e3 + init_ms
+    return Invocation(scenario, response["statusCode"], latency_ms, init_ms, cold,
+                      _handler._get_container_peak_memory_kb())
+
+def _invoke_url(url: str, timeout: float, scenario: str, params: Dict[str, str]) -> Invocation:
+    query = f'?{urlencode(params)}' if params else ''
+    start = time.perf_counter()
+    try:
+        with urlopen(f'{url.rstrip("/")}/play{query}', timeout=timeout) as response:
+            response.read()
+            status, headers = response.status, response.headers
+    except HTTPError as error:
+        status, headers = error.code, error.headers
+    except (URLError, OSError):
+        status, headers = 0, None
+    latency_ms = (time.perf_counter() - start) * 1e3
+    if headers is None:
+        return Invocation(scenario, status, latency_ms)
+    peak_kb = headers.get('X-Container-Peak-Memory-Kb')
+    return Invocation(scenario, status, latency_ms, cold=headers.get('X-Container-Invocation') == '1',
+                      container_peak_kb=int(peak_kb) if peak_kb else None)
+
+def run_load(plan: List[Tuple[str, Dict[str, str]]], concurrency: int, url: Optional[str] = None,
+             timeout: float = DEFAULT_TIMEOUT) -> Tuple[List[Invocation], float]:
+    executor: Executor
+    if url is None:
+        # spawned, not forked, so every worker starts without the handler imported
+        executor = ProcessPoolExecutor(max_workers=concurrency, mp_context=get_context('spawn'),
+                                       initializer=_init_local_worker)
+    else:
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+    with executor:
+        start = time.perf_counter()
+        if url is None:
+            futures = [executor.submit(_invoke_local, scenario, params) for scenario, params in plan]
+        else:
+            futures = [executor.submit(_invoke_url, url, timeout, scenario, params) for scenario, params in plan]
+        invocations = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+    return invocations, elapsed
+
+def summarize(invocations: List[Invocation], elapsed: Optional[float] = None) -> Dict[str, float]:
+    # benchmarks.run imports the handler, the workers import this module and must only import it on their
+    # first request
+    from benchmarks.run import _percentile
+    answered = [invocation for invocation in invocations if 200 <= invocation.status < 300]
+    cold = [invocation for invocation in answered if invocation.cold]
+    warm = [invocation for invocation in answered if not invocation.cold]
+    summary: Dict[str, float] = {"requests": len(invocations), "errors": len(invocations) - len(answered),
+                                 "cold_requests": len(cold)}
+    if elapsed is not None:
+        summary["requests_per_second"] = len(answered) / elapsed if elapsed > 0 else 0.0
+    for prefix, group in (('', answered), ('warm_', warm), ('cold_', cold)):
+        latencies = [invocation.latency_ms for invocation in group]
+        if latencies:
+            for percentile in (50, 95, 99):
+                summary[f"{prefix}p{percentile}_ms"] = _percentile(latencies, percentile)
+    init = [invocation.init_ms for invocation in cold if invocation.init_ms]
+    if init:
+        summary["init_p50_ms"] = _percentile(init, 50)
+    # ru_maxrss only ever grows, so this sizes the containers, it doesn't say what one request used
+    peaks = [invocation.container_peak_kb / 1024 for invocation in answered if invocation.container_peak_kb]
+    if peaks:
+        summary["container_peak_p50_mb"] = _percentile(peaks, 50)
+        summary["container_peak_max_mb"] = max(peaks)
+    return summary
+
+def _get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_load_test(mix: Dict[str, float], requests: int, concurrency: int, seed: int, url: Optional[str] = None,
+                  timeout: float = DEFAULT_TIMEOUT) -> Dict[str, object]:
+    invocations, elapsed = run_load(plan_requests(mix, requests, seed), concurrency, url, timeout)
+    load: Dict[str, object] = {"all": summarize(invocations, elapsed)}
+    for name in mix:
+        load[name] = summarize([invocation for invocation in invocations if invocation.scenario == name])
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "commit": _get_commit(),
+        },
+        "settings": {
+            "target": url or 'local',
+            "mix": mix,
+            "requests": requests,
+            "concurrency": concurrency,
+            "seed": seed,
+        },
+        "seconds": elapsed,
+        "load": load,
+    }
+
+def _parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Load test GET /play locally or against sls offline')
+    parser.add_argument('--url', help='base url of a running server, e.g. http://localhost:3000, '
+                                      'in process Lambda stand-ins by default')
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help=f'scenario:weight list, scenarios are {", ".join(SCENARIOS)}')
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='clients sending requests at the same time, and local containers')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the request mix')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='seconds per HTTP request')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline file to compare against')
+    parser.add_argument('--save', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative change that counts as a regression')
+    parser.add_argument('--output', help='also write the results to this file')
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    if args.requests < 1 or args.concurrency < 1:
+        raise SystemExit('requests and concurrency must be positive')
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as error:
+        raise SystemExit(str(error))
+    results = run_load_test(mix, args.requests, args.concurrency, args.seed, args.url, args.timeout)
+    output = json.dumps(results, indent=4)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            file.write(output)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, run with --save to record one', file=sys.stderr)
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline.get("settings") != results["settings"]:
+        print('The baseline was recorded with other settings, its numbers may not compare', file=sys.stderr)
+    from benchmarks.run import find_regressions
+    regressions = find_regressions(results, baseline, args.threshold, ("load",))
+    for regression in regressions:
+        print(f'REGRESSION {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence
+from logs.logger import set_quiet
+from providers.lobby import build_roster
+from providers.objects import Game, NightActions
+
+import handler
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_THRESHOLD = 0.2
+MICRO_PLAYERS = [11, 1000]
+# players per game and how many games to play at that size
+MACRO_GAMES = {11: 300, 100: 30, 1000: 3, 10000: 1}
+QUICK_MACRO_GAMES = {11: 100, 100: 10, 1000: 1}
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+def _summarize(samples_ns: List[float]) -> Dict[str, float]:
+    # throughput comes from the median, a single slow sample shouldn't look like a regression
+    median = _percentile(samples_ns, 50)
+    return {
+        "ops_per_second": 1e9 / median if median > 0 else 0.0,
+        "p50_ns": median,
+        "p99_ns": _percentile(samples_ns, 99),
+        "samples": len(samples_ns),
+    }
+
+def _time_calls(calls: List[Callable[[], object]]) -> List[float]:
+    samples = []
+    for call in calls:
+        start = time.perf_counter_ns()
+        call()
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+def bench_add_werewolf_vote(players: int, rng: random.Random) -> List[float]:
+    game = Game(build_roster(players), seed=1)
+    werewolves, villagers = game.get_werewolves(), game.get_villagers()
+    samples = []
+    # every werewolf votes once per vote, so a fresh vote is started until there are enough samples
+    while len(samples) < 2000:
+        game.start_new_werewolves_vote()
+        samples += _time_calls([lambda werewolf=werewolf: game.add_werewolf_vote(werewolf, rng.choice(villagers))
+                                for werewolf in werewolves])
+    return samples
+
+def bench_get_highest_village_votes(players: int, rng: random.Random) -> List[float]:
+    game = Game(build_roster(players), seed=1)
+    alive = game.get_players_alive()
+    game.start_new_village_vote()
+    for player in alive:
+        game.add_village_vote(player, rng.choice(alive))
+    return _time_calls([game.get_highest_village_votes] * 500)
+
+def bench_process_night_actions(players: int, rng: random.Random) -> List[float]:
+    calls = []
+    for _ in range(200 if players < 1000 else 50):
+        game = Game(build_roster(players), seed=1)
+        villagers = game.get_villagers()
+        night_actions = NightActions()
+        night_actions.werewolf_victim = rng.choice(villagers)
+        night_actions.witch_victim = rng.choice(villagers)
+        night_actions.bodyguard_saved_player = rng.choice(villagers)
+        calls.append(lambda game=game, night_actions=night_actions: game.process_night_actions(night_actions))
+    return _time_calls(calls)
+
+def bench_kill_player(players: int, rng: random.Random) -> List[float]:
+    samples = []
+    # a game only has so many players to kill, so small games are played again until there are enough samples
+    while len(samples) < 2000:
+        game = Game(build_roster(players), seed=1)
+        victims = game.get_players_alive()
+        rng.shuffle(victims)
+        samples += _time_calls([lambda game=game, victim=victim: game.kill_player(victim, 'Benchmark')
+                                for victim in victims[:2000 - len(samples)]])
+    return samples
+
+def bench_is_game_over(players: int, rng: random.Random) -> List[float]:
+    game = Game(build_roster(players), seed=1)
+    return _time_calls([game.is_game_over] * 2000)
+
+MICRO_BENCHMARKS = {
+    "add_werewolf_vote": bench_add_werewolf_vote,
+    "get_highest_village_votes": bench_get_highest_village_votes,
+    "process_night_actions": bench_process_night_actions,
+    "kill_player": bench_kill_player,
+    "is_game_over": bench_is_game_over,
+}
+
+def _play_timed_game(game: Game, phases: Dict[str, List[float]]):
+    # the loop of handler._run_game, with every phase timed on its own
+    game.start()
+    while not game.is_game_over():
+        start = time.perf_counter_ns()
+        day_actions = handler._play_night(game)
+        phases["night"].append(time.perf_counter_ns() - start)
+        if game.is_game_over():
+            break
+        start = time.perf_counter_ns()
+        handler._play_day(game, day_actions)
+        phases["day"].append(time.perf_counter_ns() - start)
+    game.end()
+
+def bench_play(players: int, games: int) -> Dict[str, object]:
+    phases: Dict[str, List[float]] = {"night": [], "day": []}
+    start = time.perf_counter()
+    for index in range(games):
+        _play_timed_game(Game(build_roster(players), seed=index), phases)
+    elapsed = time.perf_counter() - start
+
+    # peak memory is measured on a separate game, tracemalloc slows everything down
+    tracemalloc.start()
+    _play_timed_game(Game(build_roster(players), seed=games), {"night": [], "day": []})
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result: Dict[str, object] = {
+        "games": games,
+        "games_per_second": games / elapsed if elapsed > 0 else 0.0,
+        "peak_memory_bytes": peak_memory,
+        "idle_game_bytes": Game(build_roster(players)).memory_footprint(),
+    }
+    for phase, samples in phases.items():
+        if samples:
+            result[f"{phase}_p50_ns"] = _percentile(samples, 50)
+            result[f"{phase}_p99_ns"] = _percentile(samples, 99)
+    return result
+
+def run_benchmarks(quick: bool = False, only: Optional[List[str]] = None) -> Dict[str, object]:
+    set_quiet(True)
+    results: Dict[str, object] = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "micro": {},
+        "macro": {},
+    }
+    for name, benchmark in MICRO_BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        for players in MICRO_PLAYERS:
+            results["micro"][f"{name}/{players}"] = _summarize(benchmark(players, random.Random(players)))
+
+    if not only or "play" in only:
+        for players, games in (QUICK_MACRO_GAMES if quick else MACRO_GAMES).items():
+            results["macro"][f"play/{players}"] = bench_play(players, games)
+    return results
+
+# metrics where a higher value is better, every other metric is a latency or a size
+HIGHER_IS_BETTER = ("ops_per_second", "games_per_second", "requests_per_second")
+IGNORED_METRICS = ("samples", "games", "requests", "errors", "cold_requests")
+
+def find_regressions(results: Dict[str, object], baseline: Dict[str, object], threshold: float,
+                     sections: Sequence[str] = ("micro", "macro")) -> List[str]:
+    regressions = []
+    for section in sections:
+        for name, metrics in results.get(section, {}).items():
+            baseline_metrics = baseline.get(section, {}).get(name)
+            if not baseline_metrics:
+                continue
+            for metric, value in metrics.items():
+                previous = baseline_metrics.get(metric)
+                if metric in IGNORED_METRICS or not previous:
+                    continue
+                change = (value - previous) / previous
+                if metric in HIGHER_IS_BETTER:
+                    change = -change
+                if change > threshold:
+                    regressions.append(f"{section} {name} {metric}: {previous:.0f} -> {value:.0f} ({change:+.0%})")
+    return regressions
+
+def _parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmark the werewolves engine hot paths and full games')
+    parser.add_argument('--quick', action='store_true', help='skip the 10,000 player game and play fewer games')
+    parser.add_argument('--only', nargs='*', help=f'benchmarks to run: {", ".join(MICRO_BENCHMARKS)} or play')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline file to compare against')
+    parser.add_argument('--save', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='relative change that counts as a regression')
+    parser.add_argument('--output', help='also write the results to this file')
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    results = run_benchmarks(args.quick, args.only)
+    output = json.dumps(results, indent=4)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+
+    if args.save:
+        with open(args.baseline, 'w') as file:
+            file.write(output)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, run with --save to record one', file=sys.stderr)
+        return 0
+
+    with open(args.baseline) as file:
+        regressions = find_regressions(results, json.load(file), args.threshold)
+    for regression in regressions:
+        print(f'REGRESSION {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from logs.logger import set_quiet
+from providers.lobby import build_roster
+from providers.objects import Game
+from providers.store import SHARD_SEPARATOR, StateStore, create_state_store
+
+# many workers vote in the same stored games at once, every vote a read, restore, vote, snapshot and
+# compare and swap on the game's shard. each player votes once, so a game that ends up short of votes
+# lost an update. run it with more workers and shards to see how throughput scales
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_SHARDS = 4
+DEFAULT_GAMES = 20
+DEFAULT_PLAYERS = 50
+
+# (game id, voter id, victim id)
+Ballot = Tuple[str, int, int]
+
+_store: Optional[StateStore] = None
+
+def _init_worker(url: str):
+    global _store
+    set_quiet(True)
+    # every worker opens the stores itself, connections don't survive being sent to another process
+    _store = create_state_store(url)
+
+def _vote(voter_id: int, victim_id: int) -> Callable[[Game], bool]:
+    def update(game: Game) -> bool:
+        return bool(game.add_village_vote(game.get_player(voter_id), game.get_player(victim_id)))
+    return update
+
+def _cast_votes(ballots: List[Ballot]) -> Tuple[int, int]:
+    # runs in a worker process, returns the votes the games took and the conflicts it retried
+    cast = sum(_store.update_game(game_id, _vote(voter_id, victim_id)) for game_id, voter_id, victim_id in ballots)
+    return cast, _store.conflicts
+
+def get_shards_url(shards: int, directory: str) -> str:
+    return SHARD_SEPARATOR.join(f'sqlite:{os.path.join(directory, f"shard{shard}.db")}' for shard in range(shards))
+
+def create_games(store: StateStore, games: int, players: int, rng: random.Random) -> List[Ballot]:
+    # every game is saved at the start of its first village vote, the ballots are its players' votes
+    ballots = []
+    for _ in range(games):
+        game = Game(build_roster(players), seed=rng.getrandbits(32))
+        game.start()
+        game.start_new_village_vote()
+        store.save_game(game)
+        for voter in game.players:
+            victim = rng.choice([player for player in game.players if player != voter])
+            ballots.append((game.game_id, voter.id, victim.id))
+    rng.shuffle(ballots)
+    return ballots
+
+def run_sessions(url: str, workers: int, games: int, players: int, seed: int) -> Dict[str, object]:
+    set_quiet(True)
+    store = create_state_store(url)
+    ballots = create_games(store, games, players, random.Random(seed))
+    game_ids = sorted({game_id for game_id, _, _ in ballots})
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(url,)) as executor:
+        results = list(executor.map(_cast_votes, [ballots[worker::workers] for worker in range(workers)]))
+    elapsed = time.perf_counter() - start
+
+    # the tallies count votes by target
+    counted = sum(vote.votes for game_id in game_ids for vote in store.load_game(game_id).village_votes.values())
+    return {
+        "store": url,
+        "workers": workers,
+        "games": games,
+        "players": players,
+        "votes": len(ballots),
+        "seconds": elapsed,
+        "votes_per_second": len(ballots) / elapsed if elapsed > 0 else 0.0,
+        "accepted_votes": sum(cast for cast, _ in results),
+        "conflicts": sum(conflicts for _, conflicts in results),
+        "lost_updates": len(ballots) - counted,
+    }
+
+def _parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Vote concurrently in stored games and check no vote is lost')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--shards', type=int, default=DEFAULT_SHARDS, help='sqlite shards in a temporary directory')
+    parser.add_argument('--store', help='state store url instead of the temporary shards, e.g. '
+                                        'sqlite:/tmp/a.db;sqlite:/tmp/b.db')
+    parser.add_argument('--games', type=int, default=DEFAULT_GAMES)
+    parser.add_argument('--players', type=int, default=DEFAULT_PLAYERS, help='players per game, each votes once')
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    if args.workers < 1 or args.shards < 1 or args.games < 1 or args.players < 3:
+        raise SystemExit('workers, shards and games must be positive and games need at least 3 players')
+    if args.store and args.store.partition(':')[0] == 'memory':
+        raise SystemExit('the workers are processes, they need a store they can share')
+    with tempfile.TemporaryDirectory() as directory:
+        report = run_sessions(args.store or get_shards_url(args.shards, directory), args.workers, args.games,
+                              args.players, args.seed)
+    print(json.dumps(report, indent=4))
+    return 1 if report["lost_updates"] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# runs in a fresh interpreter, like a Lambda cold start: import the handler, then serve /play twice
+CHILD = '''
+import json, time
+started = time.perf_counter()
+import handler
+imported = time.perf_counter()
+handler.play({'queryStringParameters': {'seed': '1'}}, None)
+first = time.perf_counter()
+handler.play({'queryStringParameters': {'seed': '1'}}, None)
+warm = time.perf_counter()
+print(json.dumps({"import_ms": (imported - started) * 1e3, "first_play_ms": (first - imported) * 1e3,
+                  "warm_play_ms": (warm - first) * 1e3}))
+'''
+REPO_PACKAGES = ('handler', 'providers', 'logs', 'simulate')
+
+def _median(values: List[float]) -> float:
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+def parse_importtime(output: str) -> Dict[str, Dict[str, float]]:
+    # lines look like "import time:   self [us] | cumulative | imported package"
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = {"self_ms": int(self_us) / 1e3, "cumulative_ms": int(cumulative_us) / 1e3}
+    return modules
+
+def profile_startup(runs: int = 5) -> Dict[str, object]:
+    env = dict(os.environ, PYTHONPROFILEIMPORTTIME='1', WEREWOLF_LOG_QUIET='1', WEREWOLF_LOG_FILE='')
+    timings: Dict[str, List[float]] = {}
+    modules: Dict[str, Dict[str, List[float]]] = {}
+    for _ in range(runs):
+        child = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env, capture_output=True, text=True,
+                               check=True)
+        for name, value in json.loads(child.stdout.strip().splitlines()[-1]).items():
+            timings.setdefault(name, []).append(value)
+        for name, module in parse_importtime(child.stderr).items():
+            for metric, value in module.items():
+                modules.setdefault(name, {}).setdefault(metric, []).append(value)
+
+    report: Dict[str, object] = {name: _median(values) for name, values in timings.items()}
+    report["modules"] = sorted(
+        ({"module": name, **{metric: _median(values) for metric, values in metrics.items()},
+          "repo": name.split('.')[0] in REPO_PACKAGES}
+         for name, metrics in modules.items()),
+        key=lambda module: module["cumulative_ms"], reverse=True)
+    return report
+
+def _parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Profile the cold start of the /play handler')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to start, medians are reported')
+    parser.add_argument('--top', type=int, default=20, help='modules to list, slowest cumulative import first')
+    parser.add_argument('--repo-only', action='store_true', help='only list the modules of this repository')
+    parser.add_argument('--output', help='also write the report to this file')
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = _parse_args(argv)
+    report = profile_startup(args.runs)
+    modules = [module for module in report["modules"] if module["repo"] or not args.repo_only]
+    report["modules"] = modules[:args.top]
+    output = json.dumps(report, indent=4)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+
+if __name__ == '__main__':
+    main()
@@ -1,234 +1,423 @@
 import json
-import random
-from logs.logger import logger
-from typing import List, Optional
-from providers.objects import Game, NightActions, DayActions, Player, Vote, Werewolf, Villager, Seer, Bodyguard, Witch
+import logging
+from logs.logger import suppressed_logging
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+from providers.metrics import enable_metrics_from_env
+from providers.lobby import RoleComposition, build_lobby, get_balance_tolerance, get_default_composition, get_default_names, get_max_players
+from providers.objects import Game, NightActions, DayActions, Player, Vote
+from providers.policies import DEFAULT_BOT_BUDGET_MS, RANDOM_POLICY, SEARCH_BOT_POLICIES, BotPolicy, create_bot_policy
+from providers.registry import GameRegistry
+from providers.streaming import CONTENT_TYPES, end_message, format_stream, get_stream_format, phase_message, start_message
+from providers.voting import DEFAULT_VOTE_RULES, VoteRules
 
-game: Optional[Game] = None
+if TYPE_CHECKING:
+    from providers.simulation import SimulationStats
+
+DEFAULT_SIMULATION_GAMES = 1000
+# at 11 players the object engine plays about 2,000 games per second and the vectorized one about 35 times more,
+# at 20 players about 25 times more
+MAX_SIMULATION_GAMES = 100000
+MAX_VECTORIZED_SIMULATION_GAMES = 1000000
+# a search bot's budget per decision
+MAX_BOT_BUDGET_MS = 100.0
+# a search bot decides hundreds of times per game, every decision of a request shares this budget and the
+# ones left when it's spent are drawn at random. with the lobby capped too, a /play with search bots ends
+# in about 4 s, within the function's 6 s timeout
+MAX_BOT_GAME_BUDGET_MS = 2000.0
+MAX_SEARCH_BOT_PLAYERS = 20
+
+# in-progress games held by this warm container
+registry = GameRegistry()
+# /play requests this container served, the first one is its cold start
+invocations = 0
+# per phase timings, only hooked into Game when WEREWOLF_METRICS is set
+enable_metrics_from_env()
 
 def play(event, context):
-    global game 
+    global invocations
+    invocations += 1
+    params = (event or {}).get('queryStringParameters') or {}
+    try:
+        rules = VoteRules.from_params(params)
+        seed = _parse_seed(params)
+        composition = _parse_composition(params)
+        bots = _parse_bots(params, seed, composition)
+    except ValueError as error:
+        return _respond_error(str(error))
+
+    game = Game(_init_players(composition), seed=seed)
+    game_id = registry.add(game)
+    try:
+        _run_game(game, rules, bots)
+    finally:
+        registry.remove(game_id)
+    return _respond(game)
+
+def play_stream(event, context):
+    # same game as /play, returned as one NDJSON line (or server-sent event) per phase.
+    # API Gateway buffers Lambda responses, local_server.py sends each phase as soon as it resolves
+    try:
+        stream_format, chunks = open_stream(event)
+    except ValueError as error:
+        return _respond_error(str(error))
+    return {"statusCode": 200, "headers": {"Content-Type": CONTENT_TYPES[stream_format]}, "body": ''.join(chunks)}
+
+def open_stream(event) -> Tuple[str, Iterator[str]]:
+    # validates the request, the game itself only starts when the first chunk is read
+    params = (event or {}).get('queryStringParameters') or {}
+    rules = VoteRules.from_params(params)
+    seed = _parse_seed(params)
+    composition = _parse_composition(params)
+    bots = _parse_bots(params, seed, composition)
+    stream_format = get_stream_format(params, (event or {}).get('headers'))
+    game = Game(_init_players(composition), seed=seed)
+    return stream_format, format_stream(stream_game(game, rules, bots), stream_format)
+
+def stream_game(game: Game, rules: VoteRules = DEFAULT_VOTE_RULES, bots: BotPolicy = RANDOM_POLICY) -> Iterator[dict]:
+    # plays the game lazily: each message is built from the events recorded since the previous one,
+    # so nothing of the transcript is kept besides the game's own event log
+    game_id = registry.add(game)
+    try:
+        game.start()
+        yield start_message(game)
+        first_event = len(game.events)
+        for phase in _iter_phases(game, rules, bots):
+            yield phase_message(game, phase, first_event)
+            first_event = len(game.events)
+        yield end_message(game, first_event)
+    finally:
+        registry.remove(game_id)
+
+def simulate(event, context):
+    params = (event or {}).get('queryStringParameters') or {}
+    try:
+        games = int(params.get('games', DEFAULT_SIMULATION_GAMES))
+    except (TypeError, ValueError):
+        return _respond_error("games must be an integer")
+
+    engine = params.get('engine', 'objects')
+    if engine not in ('objects', 'vectorized'):
+        return _respond_error(f"unknown engine {engine}")
+    max_games = MAX_VECTORIZED_SIMULATION_GAMES if engine == 'vectorized' else MAX_SIMULATION_GAMES
+    if games < 1 or games > max_games:
+        return _respond_error(f"games must be between 1 and {max_games} with the {engine} engine")
 
-    players = _init_players()
-    game = Game(players)
+    try:
+        rules = VoteRules.from_params(params)
+        seed = _parse_seed(params)
+        composition = _parse_composition(params)
+    except ValueError as error:
+        return _respond_error(str(error))
+
+    probability = None
+    if str(params.get('exact', '')).lower() in ('1', 'true'):
+        # exact P(villagers win) to compare the simulated rate with, solved first as it may be refused
+        from providers.solver import get_villagers_win_probability
+        try:
+            probability = get_villagers_win_probability(composition or get_default_composition(), rules)
+        except ValueError as error:
+            return _respond_error(str(error))
+
+    if engine == 'vectorized':
+        # numpy is only needed by the array engine, so keep it off the /play import path
+        from providers.vectorized import run_vectorized_simulations, role_codes
+        stats = run_vectorized_simulations(role_codes(_init_players(composition)), games, seed, rules=rules)
+    else:
+        stats = run_simulations(games, rules, seed, composition=composition)
+
+    body = stats.toJson()
+    if probability is not None:
+        from providers.solver import cross_check
+        body["exact"] = cross_check(probability, stats.wins.get('Villagers', 0), stats.games)
+    return {"statusCode": 200, "body": json.dumps(body)}
+
+def run_simulations(games: int, rules: VoteRules = DEFAULT_VOTE_RULES, seed: Optional[int] = None,
+                    first_game: int = 0, composition: Optional[RoleComposition] = None,
+                    bots: BotPolicy = RANDOM_POLICY) -> 'SimulationStats':
+    # only /simulate and the tournament CLI need the stats, keep them off the /play cold start
+    from providers.simulation import SimulationStats, derive_game_seed
+    stats = SimulationStats()
+    with suppressed_logging():
+        for index in range(first_game, first_game + games):
+            game_seed = None if seed is None else derive_game_seed(seed, index)
+            stats.add_game(_run_game(Game(_init_players(composition), seed=game_seed), rules, bots))
+    return stats
+
+def _run_game(game: Game, rules: VoteRules = DEFAULT_VOTE_RULES, bots: BotPolicy = RANDOM_POLICY) -> Game:
     game.start()
+    return _resume_game(game, rules, bots)
+
+def _resume_game(game: Game, rules: VoteRules = DEFAULT_VOTE_RULES, bots: BotPolicy = RANDOM_POLICY) -> Game:
+    # plays a started game, e.g. one rebuilt by providers.replay, from the next night until it is over
     while not game.is_game_over():
-        should_continue = _play_round(game)
+        should_continue = _play_round(game, rules, bots)
         if not should_continue:
             break
 
     game.end()
-    return _respond(game)
+    return game
+
+def _iter_phases(game: Game, rules: VoteRules = DEFAULT_VOTE_RULES, bots: BotPolicy = RANDOM_POLICY) -> Iterator[str]:
+    # plays a started game like _resume_game, pausing after every phase
+    while not game.is_game_over():
+        day_actions = _play_night(game, rules, bots)
+        yield 'night'
+        if game.is_game_over():
+            break
+        _play_day(game, day_actions, rules, bots)
+        yield 'day'
+
+    game.end()
+
+def _play_round(game: Game, rules: VoteRules = DEFAULT_VOTE_RULES, bots: BotPolicy = RANDOM_POLICY):
+    day_actions = _play_night(game, rules, bots)
+    if game.is_game_over():
+        return False
 
-def _play_round(game: Game):
+    _play_day(game, day_actions, rules, bots)
+    return True
+
+def _play_night(game: Game, rules: VoteRules = DEFAULT_VOTE_RULES, bots: BotPolicy = RANDOM_POLICY) -> DayActions:
     night_actions: NightActions = game.new_night()
     # night moves
     # 1 -  werewolves kill a player
-    logger.info("\nWerewolves vote to kill a player")
-    night_actions.werewolf_victim = _collect_werewolf_votes().player
+    game.logger.info("\nWerewolves vote to kill a player")
+    werewolf_vote = _collect_werewolf_votes(game, rules, bots)
+    night_actions.werewolf_victim = werewolf_vote.player if werewolf_vote else None
     # 2 - bodyguard saves a player
-    night_actions.bodyguard_saved_player = _let_bodyguard_save()
+    night_actions.bodyguard_saved_player = _let_bodyguard_save(game, bots)
     # 3 - seer investigates a player
-    night_actions.did_seer_find_werewolf = _let_seer_investigate()
+    night_actions.did_seer_find_werewolf = _let_seer_investigate(game, night_actions, bots)
     # 4 - witch saves a player
-    night_actions.did_witch_save_werewolf_victim = _let_witch_save()
+    night_actions.did_witch_save_werewolf_victim = _let_witch_save(game, night_actions, bots)
     # 5 - witch kills a player
-    night_actions.witch_victim = _let_witch_kill()
+    night_actions.witch_victim = _let_witch_kill(game, night_actions, bots)
 
     game.process_night_actions(night_actions)
 
     day_actions: DayActions = game.new_day()
     game.announce_last_night_results()
-    if game.is_game_over():
-        return False
-    
+    return day_actions
+
+def _play_day(game: Game, day_actions: DayActions, rules: VoteRules = DEFAULT_VOTE_RULES,
+              bots: BotPolicy = RANDOM_POLICY):
     # day moves
     # 1 - the village votes to kill a player
-    logger.info("\nVillagers discuss and vote to kill a player")
-    day_actions.village_victim = _collect_village_votes().player
+    game.logger.info("\nVillagers discuss and vote to kill a player")
+    village_vote = _collect_village_votes(game, rules, bots)
+    day_actions.village_victim = village_vote.player if village_vote else None
     game.process_day_actions(day_actions)
     game.announce_todays_results()
-    return True
 
 
+def _parse_seed(params) -> Optional[int]:
+    if params.get('seed') is None:
+        return None
+    try:
+        seed = int(params['seed'])
+    except (TypeError, ValueError):
+        raise ValueError("seed must be an integer")
+    if seed < 0:
+        raise ValueError("seed can't be negative")
+    return seed
+
+def _parse_composition(params) -> Optional[RoleComposition]:
+    # players=N and/or roles=Werewolf:0.15,Seer:1,... build a custom lobby, the default is the configured one
+    if params.get('players') is None and params.get('roles') is None:
+        return None
+    players = None
+    if params.get('players') is not None:
+        try:
+            players = int(params['players'])
+        except (TypeError, ValueError):
+            raise ValueError("players must be an integer")
+    composition = RoleComposition.parse(params.get('roles'), players)
+    allow_unbalanced = str(params.get('allowUnbalanced', '')).lower() in ('1', 'true')
+    composition.validate(get_max_players(), None if allow_unbalanced else get_balance_tolerance())
+    return composition
+
+def _parse_bots(params, seed: Optional[int] = None, composition: Optional[RoleComposition] = None) -> BotPolicy:
+    # bots is one of BOT_POLICIES, botBudgetMs is the search bot's budget per decision. a seeded game's
+    # search counts playouts instead of reading the clock, so its seed replays it
+    try:
+        budget_ms = float(params.get('botBudgetMs', DEFAULT_BOT_BUDGET_MS))
+    except (TypeError, ValueError):
+        raise ValueError("botBudgetMs must be a number")
+    if not 0 < budget_ms <= MAX_BOT_BUDGET_MS:
+        raise ValueError(f"botBudgetMs must be between 0 and {MAX_BOT_BUDGET_MS}")
+    name = params.get('bots', 'random')
+    players = (composition or get_default_composition()).get_players_count()
+    if name in SEARCH_BOT_POLICIES and players > MAX_SEARCH_BOT_PLAYERS:
+        raise ValueError(f"search bots play lobbies of at most {MAX_SEARCH_BOT_PLAYERS} players")
+    return create_bot_policy(name, budget_ms, seed is None, MAX_BOT_GAME_BUDGET_MS)
+
 def _respond(game):
     body = {
             "winners": [winner.toJson() for winner in game.winners],
+            "seed": game.seed,
         }
-    return {"statusCode": 200, "body": json.dumps(body)}
+    # lets load tests tell cold from warm invocations and size the function's memory
+    headers = {"X-Container-Invocation": str(invocations),
+               "X-Container-Peak-Memory-Kb": str(_get_container_peak_memory_kb())}
+    return {"statusCode": 200, "headers": headers, "body": json.dumps(body)}
 
-def _init_players()->List[Player]:
-    # create 11 players. 4 werewolves, 1 seer, 1 bodyguard, 1 witch, 4 villagers
-    player_1 = Player(1, 'John', Werewolf())
-    player_2 = Player(2, 'Jane', Werewolf())
-    player_3 = Player(3, 'Tom', Werewolf())
-    player_4 = Player(4, 'Jerry', Werewolf())
-    player_5 = Player(5, 'Sue', Seer())
-    player_6 = Player(6, 'Mary', Villager())
-    player_7 = Player(7, 'Harry', Villager())
-    player_8 = Player(8, 'Larry', Villager())
-    player_9 = Player(9, 'Henry', Villager())
-    player_10 = Player(10, 'Andy', Bodyguard())
-    player_11 = Player(11, 'Vikky', Witch())
-
-    players = [player_1, player_2, player_3, player_4, player_5, player_6, player_7, player_8, player_9, player_10, player_11]
-    return players
-
-def _collect_werewolf_votes(_villagers: List[Player] = [])->Vote:
-    global game
-    if game is None:
-        raise ValueError("Game has not started yet.")
-
-    game.start_new_werewolves_vote()
-
-    if len(_villagers) == 0:
-        villagers: List[Player] = game.get_villagers()
-    else:
-        villagers: List[Player] = _villagers
+def _get_container_peak_memory_kb() -> int:
+    # peak resident memory of the process in kilobytes (on Linux, like Lambda), its "max memory used".
+    # it is the most any request of this container needed so far, not what this one used
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _respond_error(message: str, status_code: int = 400):
+    return {"statusCode": status_code, "body": json.dumps({"error": message})}
 
+def _init_players(composition: Optional[RoleComposition] = None) -> List[Player]:
+    # the configured game is 11 named players: 4 werewolves, 1 seer, 1 bodyguard, 1 witch, 4 villagers
+    if composition is None:
+        return build_lobby(get_default_composition(), get_default_names())
+    return build_lobby(composition)
+
+def _collect_werewolf_votes(game: Game, rules: VoteRules = DEFAULT_VOTE_RULES,
+                            bots: BotPolicy = RANDOM_POLICY) -> Optional[Vote]:
+    villagers: List[Player] = game.get_villagers()
     werewolves: List[Player] = game.get_werewolves()
-    for werewolf in werewolves:
-        # pick a random villager
-        victim = random.choice(villagers)
-        game.add_werewolf_vote(werewolf_player=werewolf, victim_player=victim)
-
-    logger.info(f"Current Votes {game.get_werewolves_votes()}")
-    highest_votes = game.get_highest_werewolves_votes()
-    if len(highest_votes) > 1:
-        logger.info("There is a tie")
-        logger.info("Werewolves need to vote again")
-        tied_players = [vote.player for vote in highest_votes]
-        return _collect_werewolf_votes(tied_players)
+
+    revotes = 0
+    while True:
+        game.start_new_werewolves_vote()
+        for werewolf in werewolves:
+            victim = bots.choose_werewolf_victim(game, werewolf, villagers)
+            game.add_werewolf_vote(werewolf_player=werewolf, victim_player=victim)
+
+        if game.logger.isEnabledFor(logging.INFO):
+            game.logger.info("Current Votes %s", game.get_werewolves_votes())
+        highest_votes = game.get_highest_werewolves_votes()
+        if len(highest_votes) <= 1 or revotes >= rules.max_revotes:
+            break
+
+        game.logger.info("There is a tie")
+        game.logger.info("Werewolves need to vote again")
+        game.werewolf_revotes += 1
+        revotes += 1
+        villagers = [vote.player for vote in highest_votes]
+
+    game.end_werewolves_vote()
+    highest_vote = _break_tie(game, highest_votes, rules)
+    if highest_vote is None:
+        game.logger.info("Werewolves could not agree on a victim")
     else:
-        # get the player with the highest votes
-        highest_vote = highest_votes[0]
-        logger.info(f"Werewolves have voted to kill {highest_vote.player}")
-        game.end_werewolves_vote()
-        return highest_vote
-
-def _let_seer_investigate() -> bool:
-    logger.info("")
-
-    global game
-    if game is None:
-        raise ValueError("Game has not started yet.")
-    
+        game.logger.info("Werewolves have voted to kill %s", highest_vote.player)
+    return highest_vote
+
+def _break_tie(game: Game, highest_votes: List[Vote], rules: VoteRules) -> Optional[Vote]:
+    if len(highest_votes) == 0:
+        return None
+    if len(highest_votes) == 1:
+        return highest_votes[0]
+
+    game.logger.info("The tie is still not broken after %s revotes", rules.max_revotes)
+    return rules.tie_break.break_tie(highest_votes, game.rng)
+
+def _let_seer_investigate(game: Game, night_actions: NightActions, bots: BotPolicy = RANDOM_POLICY) -> bool:
+    game.logger.info("")
+
     seer = game.get_seer()
     if seer is None or not seer.is_alive:
-        logger.info("Seer is dead. No investigation")
+        game.logger.info("Seer is dead. No investigation")
         return False
     
-    players = [player for player in game.get_players_alive() if player != seer]
-    investigated_player = random.choice(players)
-    logger.info(f"Seer investigates {investigated_player}")
+    investigated_player = bots.choose_seer_target(game, seer)
+    game.logger.info("Seer investigates %s", investigated_player)
+    night_actions.seer_investigated_player = investigated_player
     is_werewolf = game.is_werewolf(investigated_player)
     return is_werewolf
        
-def _let_bodyguard_save() -> Optional[Player]:
-    logger.info("")
+def _let_bodyguard_save(game: Game, bots: BotPolicy = RANDOM_POLICY) -> Optional[Player]:
+    game.logger.info("")
 
-    global game
-    if game is None:
-        raise ValueError("Game has not started yet.")
-    
     bodyguard = game.get_bodyguard()
     if bodyguard is None or not bodyguard.is_alive:
-        logger.info("Bodyguard is dead. No saving")
+        game.logger.info("Bodyguard is dead. No saving")
         return None
     
-    last_bodyguard_saved_player = game.get_last_bodyguard_saved_player()
-    
-    players = game.get_players_alive()
-    saved_player = random.choice(players)
-    if last_bodyguard_saved_player is not None and saved_player == last_bodyguard_saved_player:
-        logger.info("Bodyguard can't save the same player twice in a row")
-        return _let_bodyguard_save()
-    
-    logger.info(f"Bodyguard saves {saved_player}")
+    saved_player = bots.choose_bodyguard_target(game, bodyguard)
+    if saved_player is None:
+        game.logger.info("Bodyguard has no one to save")
+        return None
+
+    game.logger.info("Bodyguard saves %s", saved_player)
     return saved_player
 
-def _let_witch_save() -> bool:
-    logger.info("")
+def _let_witch_save(game: Game, night_actions: NightActions, bots: BotPolicy = RANDOM_POLICY) -> bool:
+    game.logger.info("")
 
-    global game
-    if game is None:
-        raise ValueError("Game has not started yet.")
-    
     witch = game.get_witch()
     if witch is None or not witch.is_alive:
-        logger.info("Witch is dead. No saving")
+        game.logger.info("Witch is dead. No saving")
         return False
     
     if game.is_witch_save_potion_used():
-        logger.info("Witch has already used the save potion")
+        game.logger.info("Witch has already used the save potion")
         return False
     
-    options = [True, False]
-    save_werewolf_victim = random.choice(options)
+    save_werewolf_victim = bots.choose_witch_save(game, witch, night_actions)
     if save_werewolf_victim:
         game.set_witch_save_potion_used()
     else:
-        logger.info("Witch chose not to save the werewolf victim tonight.")
+        game.logger.info("Witch chose not to save the werewolf victim tonight.")
 
     return save_werewolf_victim
 
-def _let_witch_kill() -> Optional[Player]:
-    global game
-    if game is None:
-        raise ValueError("Game has not started yet.")
-    
+def _let_witch_kill(game: Game, night_actions: NightActions, bots: BotPolicy = RANDOM_POLICY) -> Optional[Player]:
     witch = game.get_witch()
     if witch is None or not witch.is_alive:
-        logger.info("Witch is dead. No killing")
+        game.logger.info("Witch is dead. No killing")
         return None
     
     if game.is_witch_kill_potion_used():
-        logger.info("Witch has already used the kill potion")
+        game.logger.info("Witch has already used the kill potion")
         return None
     
-    options = [True, False]
-    use_kill_potion = random.choice(options)
-    if use_kill_potion:
-        players = [player for player in game.get_players_alive() if player != witch]
-        killed_player = random.choice(players)
+    killed_player = bots.choose_witch_victim(game, witch, night_actions)
+    if killed_player is not None:
         game.set_witch_kill_potion_used(killed_player)
         return killed_player
     else:
-        logger.info("Witch chose not to kill a player tonight.")
+        game.logger.info("Witch chose not to kill a player tonight.")
         return None
 
-def _collect_village_votes(_suspected_players: List[Player] = [])->Vote:
-    global game
-    if game is None:
-        raise ValueError("Game has not started yet.")
-
-    game.start_new_village_vote()
+def _collect_village_votes(game: Game, rules: VoteRules = DEFAULT_VOTE_RULES,
+                           bots: BotPolicy = RANDOM_POLICY) -> Optional[Vote]:
     players_alive = game.get_players_alive()
+    suspected_players = players_alive
 
-    if len(_suspected_players) == 0:
-        suspected_players = players_alive
-    else:
-        suspected_players = _suspected_players
-
-    suspected_villagers: List[Player] = [player for player in suspected_players if not game.is_werewolf(player)]
-
-    for player in players_alive:
-        if game.is_werewolf(player):
-            victim = random.choice(suspected_villagers)
-        else:
-            victim = random.choice(suspected_players)
-        game.add_village_vote(player, victim)
-
-    logger.info(f"Current Votes {game.get_village_votes()}")
-    highest_votes = game.get_highest_village_votes()
-    if len(highest_votes) > 1:
-        logger.info("There is a tie")
-        logger.info("Everyone needs to vote again")
-        tied_players = [vote.player for vote in highest_votes]
-        return _collect_village_votes(tied_players)
+    revotes = 0
+    while True:
+        game.start_new_village_vote()
+        suspected_villagers: List[Player] = [player for player in suspected_players if not game.is_werewolf(player)]
+        if len(suspected_villagers) == 0:
+            # only werewolves are suspected, so werewolves have to vote for one of their own
+            suspected_villagers = suspected_players
+
+        for player in players_alive:
+            victim = bots.choose_village_victim(game, player, suspected_players, suspected_villagers)
+            game.add_village_vote(player, victim)
+
+        if game.logger.isEnabledFor(logging.INFO):
+            game.logger.info("Current Votes %s", game.get_village_votes())
+        highest_votes = game.get_highest_village_votes()
+        if len(highest_votes) <= 1 or revotes >= rules.max_revotes:
+            break
+
+        game.logger.info("There is a tie")
+        game.logger.info("Everyone needs to vote again")
+        game.village_revotes += 1
+        revotes += 1
+        suspected_players = [vote.player for vote in highest_votes]
+
+    game.end_village_vote()
+    highest_vote = _break_tie(game, highest_votes, rules)
+    if highest_vote is None:
+        game.logger.info("The Village could not agree on a victim")
     else:
-        # get the player with the highest votes
-        highest_vote = highest_votes[0]
-        logger.info(f"The Village has voted to kill {highest_vote.player}")
-        game.end_village_vote()
-        return highest_vote
+        game.logger.info("The Village has voted to kill %s", highest_vote.player)
+    return highest_vote
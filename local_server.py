@@ -0,0 +1,85 @@
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qsl, urlsplit
+import handler
+from providers.metrics import PrometheusExporter, enable_metrics, get_exporter
+
+# a stand-in for `sls offline` on the same port and routes, except that /play/stream really streams:
+# every phase is written as a chunk as soon as it resolves. with --metrics, /metrics serves the phase timings
+# in the Prometheus text format
+DEFAULT_PORT = 3000
+ROUTES = {'/play': handler.play, '/simulate': handler.simulate, '/play/stream': handler.play_stream}
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        event = {'queryStringParameters': dict(parse_qsl(url.query)) or None, 'headers': dict(self.headers)}
+        if url.path == '/play/stream':
+            self._stream(event)
+        elif url.path == '/metrics' and isinstance(get_exporter(), PrometheusExporter):
+            self._respond({"statusCode": 200, "headers": {"Content-Type": 'text/plain; version=0.0.4'},
+                           "body": get_exporter().render()})
+        elif url.path in ROUTES:
+            self._respond(ROUTES[url.path](event, None))
+        else:
+            self._respond({"statusCode": 404, "body": json.dumps({"error": "not found"})})
+
+    def _respond(self, response: dict):
+        body = response["body"].encode()
+        headers = response.get("headers") or {}
+        self.send_response(response["statusCode"])
+        self.send_header('Content-Type', headers.get('Content-Type', 'application/json'))
+        for name, value in headers.items():
+            if name != 'Content-Type':
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, event: dict):
+        try:
+            stream_format, chunks = handler.open_stream(event)
+        except ValueError as error:
+            self._respond(handler._respond_error(str(error)))
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', handler.CONTENT_TYPES[stream_format])
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                data = chunk.encode()
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                self.wfile.flush()
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # the client went away, closing the generator stops the game and frees its registry slot
+            chunks.close()
+
+def _parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Serve the handlers locally, streaming /play/stream')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--metrics', action='store_true', help='time every phase and serve the totals on /metrics')
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = _parse_args(argv)
+    if args.metrics and not isinstance(get_exporter(), PrometheusExporter):
+        enable_metrics(PrometheusExporter())
+    server = ThreadingHTTPServer((args.host, args.port), RequestHandler)
+    print(f'Serving on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,116 @@
-from calendar import c
+import atexit
+import json
 import logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-logging.basicConfig(format='%(message)s')
-formatter = logging.Formatter('%(message)s')
-
-fh = logging.FileHandler('logs/werewolf.log')
-fh.setFormatter(formatter)
-fh.setLevel(logging.INFO)
-logger.addHandler(fh)
-
-if (len(logger.handlers) > 0):
-    logger.handlers[0].setFormatter(formatter)
\ No newline at end of file
+import os
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+
+LOG_LEVEL = os.environ.get('WEREWOLF_LOG_LEVEL', 'INFO').upper()
+# json writes one structured event per line, text keeps the narrative format
+LOG_FORMAT = os.environ.get('WEREWOLF_LOG_FORMAT', 'text')
+# Lambda can't write next to the code, so the log file is off there unless asked for
+DEFAULT_LOG_FILE = '' if 'AWS_LAMBDA_FUNCTION_NAME' in os.environ else 'logs/werewolf.log'
+LOG_FILE = os.environ.get('WEREWOLF_LOG_FILE', DEFAULT_LOG_FILE)
+LOG_QUIET = os.environ.get('WEREWOLF_LOG_QUIET', '') not in ('', '0', 'false')
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "time": record.created,
+            "level": record.levelname,
+            "game_id": getattr(record, 'game_id', None),
+            "event": getattr(record, 'event', None) or 'narrative',
+            "message": record.getMessage().strip(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            event.update(fields)
+        return json.dumps(event, default=str)
+
+class _ThreadState(threading.local):
+    # suppressed_logging only silences its own thread, e.g. a /simulate served next to a /play by local_server
+    quiet = False
+
+_thread_state = _ThreadState()
+
+class GameLogger(logging.LoggerAdapter):
+    # tags every record with the game id, and keeps the extra fields passed by the caller
+    def process(self, msg, kwargs):
+        extra = kwargs.get('extra')
+        kwargs['extra'] = {**self.extra, **extra} if extra else self.extra
+        return msg, kwargs
+
+    def isEnabledFor(self, level: int) -> bool:
+        # the adapter checks this before building a record, so a suppressed thread's calls stay no-ops
+        return not _thread_state.quiet and self.logger.isEnabledFor(level)
+
+def _create_handlers() -> List[logging.Handler]:
+    formatter = JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter('%(message)s')
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    if LOG_FILE:
+        try:
+            handlers.append(logging.FileHandler(LOG_FILE))
+        except OSError:
+            pass
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+class DeferredHandler(logging.Handler):
+    # stands in until the first record is actually emitted, so importing this module does no I/O
+    # and starts no thread, and quiet runs never set up the real handlers at all
+    def emit(self, record: logging.LogRecord):
+        _configure().handle(record)
+
+logger = logging.getLogger('werewolves')
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+logger.disabled = LOG_QUIET
+_deferred_handler = DeferredHandler()
+logger.addHandler(_deferred_handler)
+_listener = None
+_configure_lock = threading.Lock()
+
+def _configure() -> logging.Handler:
+    global _listener
+    # records are handed to a background thread, so logging calls never wait on stderr or disk
+    import queue
+    from logging.handlers import QueueHandler, QueueListener
+    with _configure_lock:
+        if _listener is None:
+            log_queue: 'queue.SimpleQueue[logging.LogRecord]' = queue.SimpleQueue()
+            queue_handler = QueueHandler(log_queue)
+            _listener = QueueListener(log_queue, *_create_handlers(), respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
+            logger.addHandler(queue_handler)
+            logger.removeHandler(_deferred_handler)
+    return next(handler for handler in logger.handlers if handler is not _deferred_handler)
+
+def get_game_logger(game_id: Optional[str]) -> GameLogger:
+    return GameLogger(logger, {'game_id': game_id})
+
+def is_quiet() -> bool:
+    return logger.disabled or _thread_state.quiet
+
+def set_quiet(quiet: bool):
+    # the whole process, for the command line tools
+    logger.disabled = quiet
+
+def flush():
+    # wait until every queued record has been written
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+@contextmanager
+def suppressed_logging():
+    # quiet mode for the calling thread: every narrative log line becomes a no-op, e.g. while running batch
+    # simulations
+    was_quiet = _thread_state.quiet
+    _thread_state.quiet = True
+    try:
+        yield
+    finally:
+        _thread_state.quiet = was_quiet
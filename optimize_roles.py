@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from logs.logger import set_quiet
+from providers.balance import (DEFAULT_ALPHA, DEFAULT_BATCH_GAMES, DEFAULT_MARGIN, DEFAULT_MAX_GAMES, FAIR,
+                               CandidateResult, ResultCache, SequentialTest, fit_balance_points, get_batch_key,
+                               get_candidates)
+from providers.lobby import RoleComposition
+from providers.objects import ROLES
+from providers.voting import DEFAULT_MAX_REVOTES, TIE_BREAK_POLICIES, VoteRules
+
+DEFAULT_SEED = 1
+
+def _init_worker():
+    set_quiet(True)
+
+def _run_batch(counts: Dict[str, int], first_game: int, games: int, seed: int, tie_break: str,
+               max_revotes: int) -> int:
+    # villager wins of one batch, played in a worker process
+    import handler
+    rules = VoteRules(max_revotes, TIE_BREAK_POLICIES[tie_break])
+    stats = handler.run_simulations(games, rules, seed, first_game, RoleComposition(counts))
+    return stats.wins.get('Villagers', 0)
+
+def optimize(players: List[int], workers: int, seed: int = DEFAULT_SEED, test: Optional[SequentialTest] = None,
+             rules: Optional[VoteRules] = None, cache: Optional[ResultCache] = None,
+             progress: bool = False) -> List[CandidateResult]:
+    # every round plays the next batch of each candidate still undecided. candidates play the same seed
+    # range, so a cached batch is exactly the batch a rerun would play
+    test = test or SequentialTest()
+    rules = rules or VoteRules()
+    cache = cache or ResultCache()
+    results = [CandidateResult(composition) for count in players for composition in get_candidates(count)]
+    pending = list(results)
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers > 1 else None
+    if executor is None:
+        _init_worker()
+    try:
+        while pending:
+            batches = []
+            for result in pending:
+                games = min(test.batch_games, test.max_games - result.games)
+                key = get_batch_key(result.composition, rules, seed, result.games, games)
+                wins = cache.get(key)
+                if wins is not None:
+                    result.cached_games += games
+                    batches.append((result, key, games, wins, None))
+                    continue
+                arguments = (result.composition.counts, result.games, games, seed, rules.tie_break.name,
+                             rules.max_revotes)
+                if executor is None:
+                    batches.append((result, key, games, None, _run_batch(*arguments)))
+                else:
+                    batches.append((result, key, games, None, executor.submit(_run_batch, *arguments)))
+
+            for result, key, games, wins, played in batches:
+                if wins is None:
+                    wins = played if executor is None else played.result()
+                    cache.put(key, wins)
+                result.games += games
+                result.villager_wins += wins
+                result.verdict = test.get_verdict(result.villager_wins, result.games)
+            pending = [result for result in pending if result.verdict is None]
+            if progress:
+                print(f'{len(results) - len(pending)}/{len(results)} compositions settled', file=sys.stderr)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        cache.save()
+    return sorted(results, key=lambda result: (result.verdict != FAIR, result.get_distance()))
+
+def _parse_players(value: str) -> List[int]:
+    # 11, 8-16 or 8,10,12
+    players = []
+    for item in value.split(','):
+        first, _, last = item.partition('-')
+        players.extend(range(int(first), int(last or first) + 1))
+    return players
+
+def _parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Search the role compositions whose games are closest to even')
+    parser.add_argument('--players', type=_parse_players, default=[11], help='player counts, e.g. 11, 8-16 or 8,12')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='base seed of every candidate\'s games')
+    parser.add_argument('--margin', type=float, default=DEFAULT_MARGIN, help='largest distance from 50%% that is fair')
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA, help='error rate of the sequential test')
+    parser.add_argument('--batch-games', type=int, default=DEFAULT_BATCH_GAMES, help='games between two looks')
+    parser.add_argument('--max-games', type=int, default=DEFAULT_MAX_GAMES, help='games before giving up on a candidate')
+    parser.add_argument('--tie-break', choices=sorted(TIE_BREAK_POLICIES), default='random')
+    parser.add_argument('--max-revotes', type=int, default=DEFAULT_MAX_REVOTES)
+    parser.add_argument('--cache', help='json file keeping the results of every batch between runs')
+    parser.add_argument('--top', type=int, default=10, help='compositions to report, 0 for all')
+    parser.add_argument('--output', help='write the report to this file instead of stdout')
+    parser.add_argument('--progress', action='store_true', help='print settled compositions to stderr')
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = _parse_args(argv)
+    if args.workers < 1 or min(args.players) < 3:
+        raise SystemExit('workers must be positive and games need at least 3 players')
+    try:
+        test = SequentialTest(args.margin, args.alpha, args.batch_games, args.max_games)
+        rules = VoteRules(args.max_revotes, TIE_BREAK_POLICIES[args.tie_break])
+    except ValueError as error:
+        raise SystemExit(str(error))
+
+    start = time.perf_counter()
+    results = optimize(args.players, args.workers, args.seed, test, rules, ResultCache(args.cache), args.progress)
+    elapsed = time.perf_counter() - start
+
+    verdicts: Dict[str, int] = {}
+    for result in results:
+        verdicts[result.verdict] = verdicts.get(result.verdict, 0) + 1
+    report = {
+        "compositions": [result.toJson(test) for result in (results[:args.top] if args.top else results)],
+        "verdicts": verdicts,
+        "balance_points": {
+            "current": {name: ROLES[name].balance_points
+                        for name in sorted({name for result in results for name in result.composition.counts})},
+            "fitted": fit_balance_points(results),
+        },
+        "run": {
+            "players": args.players,
+            "seed": args.seed,
+            "workers": args.workers,
+            "games": sum(result.games for result in results),
+            "cached_games": sum(result.cached_games for result in results),
+            "seconds": elapsed,
+        },
+    }
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import json
+import os
+from math import log, sqrt
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+from providers.lobby import SINGLE_ROLES, RoleComposition
+from providers.objects import ROLES
+from providers.voting import VoteRules
+
+# finding fair lobbies: every candidate composition plays batches of seeded games until a sequential test
+# settles whether its villagers win rate is within the margin of 50%, and each batch is cached by its
+# composition and seed range so reruns only play what they haven't played yet
+FAIR_RATE = 0.5
+DEFAULT_MARGIN = 0.05
+DEFAULT_ALPHA = 0.01
+DEFAULT_BATCH_GAMES = 200
+DEFAULT_MAX_GAMES = 20000
+
+FAIR = 'fair'
+UNFAIR = 'unfair'
+UNDECIDED = 'undecided'
+
+def get_candidates(players: int) -> List[RoleComposition]:
+    # every mix of the single roles, with from one werewolf to as many as the rest of the village
+    candidates = []
+    for mask in range(1 << len(SINGLE_ROLES)):
+        specials = {name: 1 for bit, name in enumerate(SINGLE_ROLES) if mask >> bit & 1}
+        for werewolves in range(1, players // 2 + 1):
+            if werewolves + len(specials) < players:
+                candidates.append(RoleComposition.from_spec({'Werewolf': werewolves, **specials}, players))
+    return candidates
+
+class SequentialTest(object):
+    # looks at the win rate after every batch and stops once its confidence interval lies inside the fair
+    # band (fair) or outside it (unfair). the interval is widened for the number of looks a candidate can
+    # take (Bonferroni), so stopping early doesn't inflate the error rate past alpha
+    def __init__(self, margin: float = DEFAULT_MARGIN, alpha: float = DEFAULT_ALPHA,
+                 batch_games: int = DEFAULT_BATCH_GAMES, max_games: int = DEFAULT_MAX_GAMES):
+        if not 0 < margin < FAIR_RATE or not 0 < alpha < 1 or batch_games < 1 or max_games < batch_games:
+            raise ValueError("invalid sequential test settings")
+        self.margin = margin
+        self.alpha = alpha
+        self.batch_games = batch_games
+        self.max_games = max_games
+        looks = -(-max_games // batch_games)
+        self.z = NormalDist().inv_cdf(1 - alpha / (2 * looks))
+
+    def get_interval(self, wins: int, games: int) -> Tuple[float, float]:
+        # wilson score interval, which stays sensible for rates close to 0 or 1
+        if games == 0:
+            return 0.0, 1.0
+        z = self.z
+        rate = wins / games
+        center = (rate + z * z / (2 * games)) / (1 + z * z / games)
+        width = z * sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / (1 + z * z / games)
+        return max(0.0, center - width), min(1.0, center + width)
+
+    def get_verdict(self, wins: int, games: int) -> Optional[str]:
+        # None while more games are needed
+        low, high = self.get_interval(wins, games)
+        if FAIR_RATE - self.margin <= low and high <= FAIR_RATE + self.margin:
+            return FAIR
+        if high < FAIR_RATE - self.margin or low > FAIR_RATE + self.margin:
+            return UNFAIR
+        if games >= self.max_games:
+            return UNDECIDED
+        return None
+
+class CandidateResult(object):
+    def __init__(self, composition: RoleComposition):
+        self.composition = composition
+        self.games = 0
+        self.villager_wins = 0
+        self.verdict: Optional[str] = None
+        self.cached_games = 0
+
+    def get_win_rate(self) -> float:
+        return self.villager_wins / self.games if self.games else FAIR_RATE
+
+    def get_distance(self) -> float:
+        return abs(self.get_win_rate() - FAIR_RATE)
+
+    def toJson(self, test: SequentialTest):
+        low, high = test.get_interval(self.villager_wins, self.games)
+        return {
+            "roles": self.composition.counts,
+            "balance_points": self.composition.get_balance(),
+            "villagers_win_rate": self.get_win_rate(),
+            "interval": [low, high],
+            "verdict": self.verdict,
+            "games": self.games,
+            "cached_games": self.cached_games,
+        }
+
+def get_batch_key(composition: RoleComposition, rules: VoteRules, seed: int, first_game: int, games: int) -> str:
+    roles = ','.join(f'{name}:{count}' for name, count in sorted(composition.counts.items()))
+    return f'{roles}|{rules.tie_break}:{rules.max_revotes}|{seed}:{first_game}+{games}'
+
+class ResultCache(object):
+    # villager wins per batch of seeded games, optionally kept in a json file between runs
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.wins: Dict[str, int] = {}
+        if path and os.path.exists(path):
+            with open(path) as file:
+                self.wins = json.load(file)
+
+    def get(self, key: str) -> Optional[int]:
+        return self.wins.get(key)
+
+    def put(self, key: str, wins: int):
+        self.wins[key] = wins
+
+    def save(self):
+        if not self.path:
+            return
+        temporary_path = f'{self.path}.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(self.wins, file)
+        os.replace(temporary_path, self.path)
+
+def fit_balance_points(results: List[CandidateResult]) -> Optional[Dict[str, float]]:
+    # the balance points model says a lobby is fair when its points add up to zero. fitting the log odds
+    # of the villagers winning as a weighted sum of role counts gives every role's weight, and scaled so
+    # a villager is worth its current points they are the balance points the simulations suggest
+    from providers.solver import _solve_linear
+    names = sorted({name for result in results for name in result.composition.counts})
+    if 'Villager' not in names:
+        return None
+    normal = [[0.0] * (len(names) + 1) for _ in names]
+    for result in results:
+        if result.games == 0:
+            continue
+        # smoothed so that lobbies one side always wins still have finite log odds
+        rate = (result.villager_wins + 0.5) / (result.games + 1)
+        weight = result.games * rate * (1 - rate)
+        log_odds = log(rate / (1 - rate))
+        counts = [result.composition.counts.get(name, 0) for name in names]
+        for row, row_count in enumerate(counts):
+            for column, column_count in enumerate(counts):
+                normal[row][column] += weight * row_count * column_count
+            normal[row][-1] += weight * row_count * log_odds
+    try:
+        coefficients = _solve_linear(normal)
+    except ZeroDivisionError:
+        return None
+    villager = coefficients[names.index('Villager')]
+    if villager == 0:
+        return None
+    scale = ROLES['Villager'].balance_points / villager
+    return {name: coefficient * scale for name, coefficient in zip(names, coefficients)}
@@ -0,0 +1,110 @@
+from array import array
+from typing import Iterator, List, Optional
+
+# event codes are plain ints: they go straight into the array without any enum conversion
+class EventType(object):
+    GameStarted = 0
+    GameEnded = 1
+    NightStarted = 2
+    DayStarted = 3
+    VoteStarted = 4
+    VoteCast = 5
+    VoteRemoved = 6
+    VoteEnded = 7
+    WerewolfVictimChosen = 8
+    BodyguardSaved = 9
+    SeerResult = 10
+    WitchSaved = 11
+    WitchVictimChosen = 12
+    PotionUsed = 13
+    PlayerKilled = 14
+    NightResolved = 15
+    VillageVictimChosen = 16
+    DayResolved = 17
+
+EVENT_TYPE_NAMES = {code: name for name, code in vars(EventType).items() if not name.startswith('_')}
+
+class VoteKind(object):
+    Werewolves = 0
+    Village = 1
+
+class Potion(object):
+    Save = 0
+    Kill = 1
+
+class KillReason(object):
+    Other = 0
+    WerewolfVictim = 1
+    WitchVictim = 2
+    VillageVictim = 3
+
+KILL_REASONS = {'Werewolf victim': KillReason.WerewolfVictim, 'Witch victim': KillReason.WitchVictim,
+                'Village victim': KillReason.VillageVictim}
+KILL_REASON_NAMES = {code: reason for reason, code in KILL_REASONS.items()}
+
+NO_PLAYER = -1
+# every event is stored as 5 consecutive ints in one flat array
+EVENT_FIELDS = 5
+
+class Event(object):
+    __slots__ = ('type', 'round', 'actor', 'target', 'value')
+
+    def __init__(self, type: int, round: int, actor: int, target: int, value: int):
+        self.type = type
+        self.round = round
+        self.actor = actor
+        self.target = target
+        self.value = value
+
+    def __repr__(self):
+        return f'{EVENT_TYPE_NAMES[self.type]} (round {self.round}, actor {self.actor}, target {self.target}, value {self.value})'
+
+    def toJson(self):
+        return {"type": EVENT_TYPE_NAMES[self.type], "round": self.round, "actor": self.actor, "target": self.target,
+                "value": self.value}
+
+class EventLog(object):
+    __slots__ = ('data',)
+
+    def __init__(self, data: Optional['array[int]'] = None):
+        self.data = data if data is not None else array('i')
+
+    def append(self, type: int, round: int, actor: int = NO_PLAYER, target: int = NO_PLAYER, value: int = 0):
+        self.data.fromlist([type, round, actor, target, value])
+
+    def __len__(self):
+        return len(self.data) // EVENT_FIELDS
+
+    def __getitem__(self, index: int) -> Event:
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('event index out of range')
+        start = index * EVENT_FIELDS
+        type, round, actor, target, value = self.data[start:start + EVENT_FIELDS]
+        return Event(type, round, actor, target, value)
+
+    def __iter__(self) -> Iterator[Event]:
+        return self.since(0)
+
+    def since(self, index: int) -> Iterator[Event]:
+        # the events from index on, e.g. the ones recorded since a stream last read the log
+        data = self.data
+        for start in range(index * EVENT_FIELDS, len(data), EVENT_FIELDS):
+            yield Event(data[start], data[start + 1], data[start + 2], data[start + 3], data[start + 4])
+
+    def get_nbytes(self) -> int:
+        return self.data.itemsize * len(self.data)
+
+    def to_bytes(self) -> bytes:
+        return self.data.tobytes()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> 'EventLog':
+        data = array('i')
+        data.frombytes(raw)
+        return cls(data)
+
+    def toJson(self) -> List[dict]:
+        return [event.toJson() for event in self]
@@ -0,0 +1,130 @@
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional
+from providers.objects import ROLES, Player, Villager, Werewolf, get_role
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'deploy', 'config.json')
+DEFAULT_MAX_PLAYERS = 20000
+# absolute balance points per player a composition may be off by
+DEFAULT_BALANCE_TOLERANCE = 1.0
+# the game engine only lets one player act for each special role
+SINGLE_ROLES = ('Seer', 'Bodyguard', 'Witch')
+
+@lru_cache(maxsize=None)
+def load_config(path: str = CONFIG_PATH) -> Dict:
+    with open(path) as file:
+        return json.load(file)
+
+class RoleComposition(object):
+    def __init__(self, counts: Dict[str, int]):
+        for name, count in counts.items():
+            get_role(name)
+            if count < 0:
+                raise ValueError(f"{name} count can't be negative")
+        self.counts = {name: count for name, count in counts.items() if count > 0}
+
+    def __repr__(self):
+        return ', '.join(f'{count} {name}' for name, count in self.counts.items())
+
+    def get_players_count(self) -> int:
+        return sum(self.counts.values())
+
+    def get_balance(self) -> int:
+        return sum(ROLES[name].balance_points * count for name, count in self.counts.items())
+
+    def is_balanced(self, tolerance: float = DEFAULT_BALANCE_TOLERANCE) -> bool:
+        players = self.get_players_count()
+        return players > 0 and abs(self.get_balance()) <= tolerance * players
+
+    def validate(self, max_players: int = DEFAULT_MAX_PLAYERS, tolerance: Optional[float] = DEFAULT_BALANCE_TOLERANCE):
+        # tolerance None skips the balance check, for stress games
+        players = self.get_players_count()
+        if players > max_players:
+            raise ValueError(f"a game can't have more than {max_players} players")
+        werewolves = sum(count for name, count in self.counts.items() if isinstance(ROLES[name], Werewolf))
+        villagers = sum(count for name, count in self.counts.items() if isinstance(ROLES[name], Villager))
+        if werewolves == 0 or villagers == 0:
+            raise ValueError("a game needs at least one werewolf and one villager")
+        for name in SINGLE_ROLES:
+            if self.counts.get(name, 0) > 1:
+                raise ValueError(f"a game can't have more than one {name}")
+        if tolerance is not None and not self.is_balanced(tolerance):
+            raise ValueError(f"{self} is unbalanced ({self.get_balance()} balance points for {players} players)")
+
+    @classmethod
+    def from_spec(cls, spec: Dict[str, float], players: Optional[int] = None) -> 'RoleComposition':
+        # whole numbers are counts, fractions are ratios of the players.
+        # with a player count, villagers fill up whatever the other roles leave
+        counts: Dict[str, int] = {}
+        for name, amount in spec.items():
+            if isinstance(amount, float) and not amount.is_integer():
+                if players is None:
+                    raise ValueError("role ratios need a number of players")
+                if not 0 < amount < 1:
+                    raise ValueError(f"{name} ratio must be between 0 and 1")
+                counts[name] = max(1, round(players * amount))
+            else:
+                counts[name] = int(amount)
+
+        if players is not None:
+            assigned = sum(count for name, count in counts.items() if name != 'Villager')
+            if assigned > players:
+                raise ValueError(f"{assigned} roles don't fit in {players} players")
+            counts['Villager'] = players - assigned
+        return cls(counts)
+
+    @classmethod
+    def parse(cls, roles: Optional[str], players: Optional[int] = None) -> 'RoleComposition':
+        # "Werewolf:0.15,Seer:1,Witch:1" as given in a query string
+        spec: Dict[str, float] = {}
+        for item in filter(None, (roles or '').split(',')):
+            name, _, amount = item.partition(':')
+            try:
+                spec[name.strip()] = float(amount) if '.' in amount else int(amount)
+            except ValueError:
+                raise ValueError(f"invalid amount for role {name.strip()}")
+        if spec:
+            return cls.from_spec(spec, players)
+        if players is None:
+            return get_default_composition()
+        return cls.balanced(players)
+
+    @classmethod
+    def balanced(cls, players: int) -> 'RoleComposition':
+        # the default special roles, with as many werewolves as brings the balance points closest to zero
+        specials = {name: count for name, count in get_default_composition().counts.items()
+                    if name not in ('Werewolf', 'Villager')}
+        special_players = sum(specials.values())
+        special_points = sum(ROLES[name].balance_points * count for name, count in specials.items())
+        villager_points, werewolf_points = ROLES['Villager'].balance_points, ROLES['Werewolf'].balance_points
+        werewolves = round(((players - special_players) * villager_points + special_points) /
+                           (villager_points - werewolf_points))
+        werewolves = min(max(1, werewolves), players - special_players - 1)
+        return cls.from_spec({'Werewolf': werewolves, **specials}, players)
+
+@lru_cache(maxsize=None)
+def get_default_composition() -> RoleComposition:
+    # built once per container and reused by every warm invocation
+    return RoleComposition(load_config().get('ROLES', {}))
+
+def get_default_names() -> List[str]:
+    return load_config().get('PLAYER_NAMES', [])
+
+def get_max_players() -> int:
+    return load_config().get('MAX_PLAYERS', DEFAULT_MAX_PLAYERS)
+
+def get_balance_tolerance() -> float:
+    return load_config().get('BALANCE_TOLERANCE', DEFAULT_BALANCE_TOLERANCE)
+
+def build_roster(players: int) -> List[Player]:
+    # same role mix as the default 11 player game: 4/11 werewolves, one of each special role, the rest villagers
+    werewolves = max(1, round(players * 4 / 11))
+    return build_lobby(RoleComposition.from_spec({'Werewolf': werewolves, 'Seer': 1, 'Bodyguard': 1, 'Witch': 1}, players))
+
+def build_lobby(composition: RoleComposition, names: Optional[List[str]] = None) -> List[Player]:
+    # players get ids from 1 in composition order, named from `names` and then by their id
+    names = names or []
+    roles = [ROLES[name] for name, count in composition.counts.items() for _ in range(count)]
+    return [Player(id, names[id - 1] if id <= len(names) else f'Player {id}', role)
+            for id, role in enumerate(roles, 1)]
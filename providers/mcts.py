@@ -0,0 +1,340 @@
+import math
+import random
+import time
+from typing import Callable, List, Optional, Sequence
+from providers.objects import Bodyguard, Game, NightActions, Player, Seer, Werewolf, Witch
+from providers.policies import (DEFAULT_BOT_BUDGET_MS, RANDOM_POLICY, BotPolicy, get_bodyguard_targets,
+                                get_village_vote_targets, get_witch_targets)
+
+# a search bot: every decision runs as many playouts as fit in its budget and keeps the action that won
+# most often for its side. actions are picked with UCB1 at the root and everything after them is played
+# randomly, so the tree is one level deep. players whose role the bot can't know get a random role from the
+# ones still unaccounted for before every playout, and playouts run on plain lists of role codes instead of
+# game objects, which is what makes thousands of them fit in 50 ms.
+# playouts break ties at random instead of revoting
+
+WEREWOLF, VILLAGER, SEER, BODYGUARD, WITCH = range(5)
+NOBODY = -1
+# the playout draws this action like a random bot would
+DRAW = -2
+
+DEFAULT_MAX_ROLLOUTS = 100000
+# an untimed search turns its budget into playouts at about the rate one core plays them, 30 per ms in an
+# 11 player game and fewer the more players there are, so the same seed plays the same game on any machine
+PLAYOUTS_PER_MS = 30
+PLAYOUTS_PER_MS_PLAYERS = 11
+EXPLORATION = math.sqrt(2)
+# the clock is read once per this many playouts
+CLOCK_INTERVAL = 16
+
+def pick(random: Callable[[], float], items: Sequence):
+    # rng.choice goes through getrandbits, a float draw is about three times cheaper in the playout loops
+    return items[int(random() * len(items))]
+
+def get_role_code(player: Player) -> int:
+    role = player.role
+    if isinstance(role, Werewolf):
+        return WEREWOLF
+    if isinstance(role, Seer):
+        return SEER
+    if isinstance(role, Bodyguard):
+        return BODYGUARD
+    if isinstance(role, Witch):
+        return WITCH
+    return VILLAGER
+
+class Rollout(object):
+    # one determinized game played to the end. indices are positions in game.players
+    __slots__ = ('rng', 'roles', 'alive', 'werewolves', 'villagers', 'save_potion', 'kill_potion', 'last_saved')
+
+    def __init__(self, rng: random.Random, roles: List[int], alive: List[int], save_potion: bool, kill_potion: bool,
+                 last_saved: int):
+        self.rng = rng
+        self.roles = roles
+        self.alive = alive
+        self.werewolves = sum(1 for index in alive if roles[index] == WEREWOLF)
+        self.villagers = len(alive) - self.werewolves
+        self.save_potion = save_potion
+        self.kill_potion = kill_potion
+        self.last_saved = last_saved
+
+    def _get_special(self, role: int) -> int:
+        roles = self.roles
+        for index in self.alive:
+            if roles[index] == role:
+                return index
+        return NOBODY
+
+    def _kill(self, index: int):
+        if index in self.alive:
+            self.alive.remove(index)
+            if self.roles[index] == WEREWOLF:
+                self.werewolves -= 1
+            else:
+                self.villagers -= 1
+
+    def is_over(self) -> bool:
+        return self.werewolves == 0 or self.werewolves > self.villagers
+
+    def play_night(self, victim: int = DRAW, guarded: int = DRAW, save: Optional[bool] = None,
+                   witch_victim: int = DRAW):
+        random = self.rng.random
+        roles = self.roles
+        alive = self.alive
+        if victim == DRAW:
+            # random werewolf votes with a random tie break pick any villager as likely as the others
+            victim = pick(random, [index for index in alive if roles[index] != WEREWOLF])
+
+        if guarded == DRAW:
+            guarded = NOBODY
+            if self._get_special(BODYGUARD) != NOBODY:
+                targets = [index for index in alive if index != self.last_saved]
+                if targets:
+                    guarded = pick(random, targets)
+        self.last_saved = guarded
+
+        witch = self._get_special(WITCH)
+        if save is None:
+            save = witch != NOBODY and self.save_potion and random() < 0.5
+        if save:
+            self.save_potion = False
+        if witch_victim == DRAW:
+            witch_victim = NOBODY
+            if witch != NOBODY and self.kill_potion and random() < 0.5:
+                witch_victim = pick(random, [index for index in alive if index != witch])
+        if witch_victim != NOBODY:
+            self.kill_potion = False
+
+        if victim != NOBODY and not save and guarded != victim:
+            self._kill(victim)
+        if witch_victim != NOBODY and guarded != witch_victim:
+            self._kill(witch_victim)
+
+    def play_day(self, votes: Optional[List[int]] = None, voters: Optional[Sequence[int]] = None,
+                 suspects: Optional[List[int]] = None):
+        # votes holds the votes already cast per player index, voters are the players still to vote
+        random = self.rng.random
+        roles = self.roles
+        alive = self.alive
+        if votes is None:
+            votes = [0] * len(roles)
+        if voters is None:
+            voters = alive
+        if suspects is None:
+            suspects = alive
+        suspected_villagers = [index for index in suspects if roles[index] != WEREWOLF] or suspects
+        villagers_count = len(suspected_villagers)
+        suspects_count = len(suspects)
+        for voter in voters:
+            if roles[voter] == WEREWOLF:
+                votes[suspected_villagers[int(random() * villagers_count)]] += 1
+            else:
+                votes[suspects[int(random() * suspects_count)]] += 1
+        self._kill(get_vote_winner(random, votes))
+
+    def play_out(self, night: bool = True) -> bool:
+        # True when the villagers win
+        while not self.is_over():
+            if night:
+                self.play_night()
+                if self.is_over():
+                    break
+            self.play_day()
+            night = True
+        return self.werewolves == 0
+
+def get_vote_winner(random: Callable[[], float], votes: List[int]) -> int:
+    highest = max(votes)
+    if highest == 0:
+        return NOBODY
+    if votes.count(highest) == 1:
+        return votes.index(highest)
+    return pick(random, [index for index, count in enumerate(votes) if count == highest])
+
+class Position(object):
+    # what the deciding player knows of the game: their own role, the roles of the dead, and the werewolves
+    # when they are one. the other alive players share the remaining roles in every possible way
+    __slots__ = ('roles', 'alive', 'unknown', 'unknown_roles', 'not_werewolf', 'save_potion', 'kill_potion',
+                 'last_saved')
+
+    def __init__(self, game: Game, decider: Player, not_werewolf: Optional[Player] = None):
+        players = game.players
+        self.roles = [get_role_code(player) for player in players]
+        self.alive = [index for index, is_alive in enumerate(game.alive_mask) if is_alive]
+        decider_index = game._get_index(decider.id)
+        knows_werewolves = self.roles[decider_index] == WEREWOLF
+        self.unknown = [index for index in self.alive if index != decider_index
+                        and not (knows_werewolves and self.roles[index] == WEREWOLF)]
+        self.unknown_roles = [self.roles[index] for index in self.unknown]
+        # e.g. the witch knows the werewolves' victim isn't one of them
+        not_werewolf_index = NOBODY if not_werewolf is None else game._get_index(not_werewolf.id)
+        self.not_werewolf = not_werewolf_index if not_werewolf_index in self.unknown else NOBODY
+        self.save_potion = not game.is_witch_save_potion_used()
+        self.kill_potion = not game.is_witch_kill_potion_used()
+        last_saved = game.get_last_bodyguard_saved_player()
+        self.last_saved = NOBODY if last_saved is None else game._get_index(last_saved.id)
+
+    def get_index(self, game: Game, player: Optional[Player]) -> int:
+        return NOBODY if player is None else game._get_index(player.id)
+
+    def determinize(self, rng: random.Random) -> Rollout:
+        random = rng.random
+        roles = list(self.roles)
+        unknown_roles = list(self.unknown_roles)
+        unknown = self.unknown
+        if self.not_werewolf != NOBODY:
+            choices = [position for position, role in enumerate(unknown_roles) if role != WEREWOLF]
+            roles[self.not_werewolf] = unknown_roles.pop(pick(random, choices))
+            unknown = [index for index in unknown if index != self.not_werewolf]
+        # deals the unknown roles out in a random order, a Fisher-Yates shuffle on float draws
+        for count in range(len(unknown_roles), 0, -1):
+            role = unknown_roles.pop(int(random() * count))
+            roles[unknown[count - 1]] = role
+        return Rollout(rng, roles, list(self.alive), self.save_potion, self.kill_potion, self.last_saved)
+
+class MctsPolicy(BotPolicy):
+    name = 'mcts'
+
+    def __init__(self, budget_ms: float = DEFAULT_BOT_BUDGET_MS, max_rollouts: int = DEFAULT_MAX_ROLLOUTS,
+                 timed: bool = True, total_budget_ms: Optional[float] = None):
+        # budget_ms is per decision and total_budget_ms shared by every decision this policy makes, when it
+        # is spent the remaining decisions are drawn at random. a timed search reads the clock, an untimed
+        # one counts playouts instead
+        self.budget_ms = budget_ms
+        self.max_rollouts = max_rollouts
+        self.timed = timed
+        self.remaining_ms = total_budget_ms
+        # playouts run by the last decision, to see what the budget buys
+        self.last_rollouts = 0
+
+    def search(self, game: Game, decider: Player, position: Position, actions: List,
+               play: Callable[[Rollout, object], bool]):
+        # play runs a determinized rollout to the end after the action and tells whether the villagers won
+        if len(actions) <= 1:
+            self.last_rollouts = 0
+            return actions[0] if actions else None
+
+        # a private generator, so the search draws the game's generator once whatever its length
+        rng = random.Random(game.rng.getrandbits(64))
+        is_werewolf = game.is_werewolf(decider)
+        visits = [0] * len(actions)
+        wins = [0] * len(actions)
+        start = time.perf_counter()
+        budget_ms = self.budget_ms if self.remaining_ms is None else min(self.budget_ms, self.remaining_ms)
+        playouts_per_ms = PLAYOUTS_PER_MS * PLAYOUTS_PER_MS_PLAYERS / len(game.players)
+        if self.timed:
+            deadline = start + budget_ms / 1000
+            max_rollouts = self.max_rollouts if budget_ms > 0 else 0
+        else:
+            deadline = math.inf
+            max_rollouts = min(self.max_rollouts, int(budget_ms * playouts_per_ms))
+        if max_rollouts <= 0:
+            self.last_rollouts = 0
+            return pick(rng.random, actions)
+
+        rollouts = 0
+        while rollouts < max_rollouts:
+            if rollouts < len(actions):
+                choice = rollouts
+            else:
+                log_rollouts = math.log(rollouts)
+                choice = max(range(len(actions)), key=lambda action: wins[action] / visits[action] +
+                             EXPLORATION * math.sqrt(log_rollouts / visits[action]))
+            villagers_win = play(position.determinize(rng), actions[choice])
+            visits[choice] += 1
+            wins[choice] += villagers_win != is_werewolf
+            rollouts += 1
+            if self.timed and rollouts % CLOCK_INTERVAL == 0 and time.perf_counter() >= deadline:
+                break
+
+        self.last_rollouts = rollouts
+        if self.remaining_ms is not None:
+            self.remaining_ms -= (time.perf_counter() - start) * 1000 if self.timed else rollouts / playouts_per_ms
+        return actions[max(range(len(actions)), key=lambda action: (visits[action], wins[action]))]
+
+    def choose_werewolf_victim(self, game: Game, werewolf: Player, villagers: List[Player]) -> Player:
+        position = Position(game, werewolf)
+        tally = game.werewolf_tally
+        votes = [0] * len(game.players)
+        voters = []
+        if tally is not None:
+            for vote in tally.candidates.values():
+                votes[game._get_index(vote.player.id)] = vote.votes
+        for other in game.get_werewolves():
+            if other != werewolf and (tally is None or tally.get_target(other) is None):
+                voters.append(game._get_index(other.id))
+        candidates = [game._get_index(villager.id) for villager in villagers]
+
+        def play(rollout: Rollout, victim: int) -> bool:
+            random = rollout.rng.random
+            night_votes = list(votes)
+            night_votes[victim] += 1
+            for _ in voters:
+                night_votes[pick(random, candidates)] += 1
+            rollout.play_night(victim=get_vote_winner(random, night_votes))
+            return rollout.play_out(night=False)
+
+        return game.players[self.search(game, werewolf, position, candidates, play)]
+
+    def choose_village_victim(self, game: Game, voter: Player, suspected_players: List[Player],
+                              suspected_villagers: List[Player]) -> Player:
+        position = Position(game, voter)
+        tally = game.village_tally
+        votes = [0] * len(game.players)
+        voters = []
+        if tally is not None:
+            for vote in tally.candidates.values():
+                votes[game._get_index(vote.player.id)] = vote.votes
+        for player in game.get_players_alive():
+            if player != voter and (tally is None or tally.get_target(player) is None):
+                voters.append(game._get_index(player.id))
+        suspects = [game._get_index(player.id) for player in suspected_players]
+        candidates = [game._get_index(player.id)
+                      for player in get_village_vote_targets(game, voter, suspected_players, suspected_villagers)]
+
+        def play(rollout: Rollout, victim: int) -> bool:
+            day_votes = list(votes)
+            day_votes[victim] += 1
+            rollout.play_day(day_votes, voters, suspects)
+            return rollout.play_out()
+
+        return game.players[self.search(game, voter, position, candidates, play)]
+
+    def choose_seer_target(self, game: Game, seer: Player) -> Player:
+        # what the seer finds changes nothing in the game yet, so there is nothing to search
+        return RANDOM_POLICY.choose_seer_target(game, seer)
+
+    def choose_bodyguard_target(self, game: Game, bodyguard: Player) -> Optional[Player]:
+        position = Position(game, bodyguard)
+        candidates = [game._get_index(player.id) for player in get_bodyguard_targets(game)]
+
+        def play(rollout: Rollout, guarded: int) -> bool:
+            rollout.play_night(guarded=guarded)
+            return rollout.play_out(night=False)
+
+        index = self.search(game, bodyguard, position, candidates, play)
+        return None if index is None else game.players[index]
+
+    def choose_witch_save(self, game: Game, witch: Player, night_actions: NightActions) -> bool:
+        # the witch is told who the werewolves chose, not who the bodyguard protects
+        position = Position(game, witch, night_actions.werewolf_victim)
+        victim = position.get_index(game, night_actions.werewolf_victim)
+
+        def play(rollout: Rollout, save: bool) -> bool:
+            rollout.play_night(victim=victim, save=save)
+            return rollout.play_out(night=False)
+
+        return self.search(game, witch, position, [True, False], play)
+
+    def choose_witch_victim(self, game: Game, witch: Player, night_actions: NightActions) -> Optional[Player]:
+        position = Position(game, witch, night_actions.werewolf_victim)
+        victim = position.get_index(game, night_actions.werewolf_victim)
+        save = night_actions.did_witch_save_werewolf_victim
+        candidates = [NOBODY] + [game._get_index(player.id) for player in get_witch_targets(game, witch)]
+
+        def play(rollout: Rollout, witch_victim: int) -> bool:
+            rollout.play_night(victim=victim, save=save, witch_victim=witch_victim)
+            return rollout.play_out(night=False)
+
+        index = self.search(game, witch, position, candidates, play)
+        return None if index == NOBODY else game.players[index]
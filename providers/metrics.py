@@ -0,0 +1,233 @@
+import json
+import os
+import sys
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+from providers.objects import Game
+
+# where the time of a game goes, phase by phase. the hooks wrap Game's methods only once metrics are
+# enabled, so a disabled build runs the original methods and pays nothing, not even a flag check.
+# every hook records its wall time and the blocks the interpreter allocated meanwhile (net, freed blocks
+# cancel out), and a game's samples are exported together when it ends
+METRICS = os.environ.get('WEREWOLF_METRICS', '')
+NAMESPACE = os.environ.get('WEREWOLF_METRICS_NAMESPACE', 'Werewolves')
+# games that never end, e.g. a stream whose client left, are dropped past this many
+MAX_PENDING_GAMES = 10000
+# CloudWatch takes at most 100 values per metric and line
+MAX_EMF_VALUES = 100
+
+# the timed Game methods, by metric name
+TIMED_METHODS = {
+    'new_night': 'new_night',
+    'process_night_actions': 'process_night_actions',
+    'process_day_actions': 'process_day_actions',
+    'is_game_over': 'is_game_over',
+}
+# a vote round lasts from its tally being opened to the next revote or the end of the vote
+VOTE_ROUNDS = {
+    'werewolf_vote_round': ('start_new_werewolves_vote', 'end_werewolves_vote'),
+    'village_vote_round': ('start_new_village_vote', 'end_village_vote'),
+}
+
+class GameMetrics(object):
+    __slots__ = ('game_id', 'timings', 'allocations', 'counters', 'open_rounds')
+
+    def __init__(self, game_id: str):
+        self.game_id = game_id
+        # milliseconds per call, by metric
+        self.timings: Dict[str, List[float]] = {}
+        self.allocations: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self.open_rounds: Dict[str, Tuple[float, int]] = {}
+
+    def add(self, name: str, seconds: float, blocks: int):
+        timings = self.timings.get(name)
+        if timings is None:
+            timings = self.timings[name] = []
+            self.allocations[name] = 0
+        timings.append(seconds * 1000)
+        self.allocations[name] += blocks
+
+    def open_round(self, name: str):
+        self.close_round(name)
+        self.open_rounds[name] = (time.perf_counter(), sys.getallocatedblocks())
+
+    def close_round(self, name: str):
+        started = self.open_rounds.pop(name, None)
+        if started is not None:
+            self.add(name, time.perf_counter() - started[0], sys.getallocatedblocks() - started[1])
+
+class MetricsExporter(object):
+    def export(self, metrics: GameMetrics):
+        raise NotImplementedError()
+
+class EmfExporter(MetricsExporter):
+    # one CloudWatch Embedded Metric Format line per game on stdout, which Lambda ships to CloudWatch Logs
+    # where the metrics are extracted without any API call
+    def __init__(self, stream: Optional[TextIO] = None, namespace: str = NAMESPACE):
+        self.stream = stream
+        self.namespace = namespace
+        self.function = os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local')
+
+    def to_emf(self, metrics: GameMetrics) -> dict:
+        definitions = []
+        line = {"Function": self.function, "game_id": metrics.game_id}
+        for name, timings in metrics.timings.items():
+            definitions.append({"Name": f'{name}_ms', "Unit": "Milliseconds"})
+            line[f'{name}_ms'] = timings[:MAX_EMF_VALUES]
+            definitions.append({"Name": f'{name}_allocated_blocks', "Unit": "Count"})
+            line[f'{name}_allocated_blocks'] = metrics.allocations[name]
+        for name, count in metrics.counters.items():
+            definitions.append({"Name": name, "Unit": "Count"})
+            line[name] = count
+        line["_aws"] = {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{"Namespace": self.namespace, "Dimensions": [["Function"]],
+                                   "Metrics": definitions}],
+        }
+        return line
+
+    def export(self, metrics: GameMetrics):
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps(self.to_emf(metrics)) + '\n')
+
+class PrometheusExporter(MetricsExporter):
+    # keeps running totals in memory for offline runs, rendered in the Prometheus text format
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.games = 0
+        # metric: [calls, total seconds, max seconds, allocated blocks]
+        self.summaries: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+
+    def export(self, metrics: GameMetrics):
+        with self.lock:
+            self.games += 1
+            for name, timings in metrics.timings.items():
+                summary = self.summaries.get(name)
+                if summary is None:
+                    summary = self.summaries[name] = [0, 0.0, 0.0, 0]
+                summary[0] += len(timings)
+                summary[1] += sum(timings) / 1000
+                summary[2] = max(summary[2], max(timings) / 1000)
+                summary[3] += metrics.allocations[name]
+            for name, count in metrics.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + count
+
+    def render(self) -> str:
+        with self.lock:
+            lines = ['# TYPE werewolves_games_total counter', f'werewolves_games_total {self.games}',
+                     '# TYPE werewolves_phase_seconds summary']
+            for name, (calls, seconds, _, _) in sorted(self.summaries.items()):
+                lines.append(f'werewolves_phase_seconds_count{{phase="{name}"}} {calls}')
+                lines.append(f'werewolves_phase_seconds_sum{{phase="{name}"}} {seconds!r}')
+            lines.append('# TYPE werewolves_phase_max_seconds gauge')
+            for name, summary in sorted(self.summaries.items()):
+                lines.append(f'werewolves_phase_max_seconds{{phase="{name}"}} {summary[2]!r}')
+            lines.append('# TYPE werewolves_phase_allocated_blocks_total counter')
+            for name, summary in sorted(self.summaries.items()):
+                lines.append(f'werewolves_phase_allocated_blocks_total{{phase="{name}"}} {summary[3]}')
+            for name, count in sorted(self.counters.items()):
+                lines.append(f'# TYPE werewolves_{name}_total counter')
+                lines.append(f'werewolves_{name}_total {count}')
+            return '\n'.join(lines) + '\n'
+
+_exporter: Optional[MetricsExporter] = None
+_originals: Dict[str, Callable] = {}
+# the samples of the games in progress, by game_id: id(game) can be reused by a later game, which would
+# pick up the samples of one that never ended. a game restored from a snapshot goes on with its samples
+_pending: Dict[str, GameMetrics] = {}
+
+def get_exporter() -> Optional[MetricsExporter]:
+    return _exporter
+
+def _get_game_metrics(game: Game) -> GameMetrics:
+    game_id = game.game_id
+    metrics = _pending.get(game_id)
+    if metrics is None:
+        if len(_pending) >= MAX_PENDING_GAMES:
+            _pending.pop(next(iter(_pending)), None)
+        metrics = _pending[game_id] = GameMetrics(game_id)
+    return metrics
+
+def _time_method(name: str, method: Callable) -> Callable:
+    @wraps(method)
+    def hook(game: Game, *args, **kwargs):
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            return method(game, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _get_game_metrics(game).add(name, elapsed, sys.getallocatedblocks() - blocks)
+    return hook
+
+def _start_vote_round(name: str, method: Callable) -> Callable:
+    @wraps(method)
+    def hook(game: Game, *args, **kwargs):
+        _get_game_metrics(game).open_round(name)
+        return method(game, *args, **kwargs)
+    return hook
+
+def _end_vote_round(name: str, method: Callable) -> Callable:
+    @wraps(method)
+    def hook(game: Game, *args, **kwargs):
+        result = method(game, *args, **kwargs)
+        _get_game_metrics(game).close_round(name)
+        return result
+    return hook
+
+def _end_game(method: Callable) -> Callable:
+    @wraps(method)
+    def hook(game: Game, *args, **kwargs):
+        result = method(game, *args, **kwargs)
+        metrics = _pending.pop(game.game_id, None) or GameMetrics(game.game_id)
+        for name in list(metrics.open_rounds):
+            metrics.close_round(name)
+        # revotes are the retries of a vote, a round is the first vote or a revote
+        metrics.counters['werewolf_revotes'] = game.werewolf_revotes
+        metrics.counters['village_revotes'] = game.village_revotes
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(metrics)
+        return result
+    return hook
+
+def enable_metrics(exporter: MetricsExporter):
+    global _exporter
+    disable_metrics()
+    hooks: Dict[str, Callable] = {}
+    for name, method_name in TIMED_METHODS.items():
+        hooks[method_name] = _time_method(name, getattr(Game, method_name))
+    for name, (start_name, end_name) in VOTE_ROUNDS.items():
+        hooks[start_name] = _start_vote_round(name, getattr(Game, start_name))
+        hooks[end_name] = _end_vote_round(name, getattr(Game, end_name))
+    hooks['end'] = _end_game(Game.end)
+    for method_name, hook in hooks.items():
+        _originals[method_name] = getattr(Game, method_name)
+        setattr(Game, method_name, hook)
+    _exporter = exporter
+
+def disable_metrics():
+    global _exporter
+    for method_name, method in _originals.items():
+        setattr(Game, method_name, method)
+    _originals.clear()
+    _pending.clear()
+    _exporter = None
+
+def create_exporter(kind: str) -> MetricsExporter:
+    if kind == 'emf':
+        return EmfExporter()
+    if kind == 'prometheus':
+        return PrometheusExporter()
+    raise ValueError(f"unknown metrics exporter {kind}")
+
+def enable_metrics_from_env() -> Optional[MetricsExporter]:
+    # WEREWOLF_METRICS=emf on Lambda, prometheus for local runs, unset to leave Game untouched
+    if not METRICS:
+        return None
+    enable_metrics(create_exporter(METRICS))
+    return _exporter
@@ -1,50 +1,73 @@
 from datetime import datetime
+from itertools import compress
 import json
-from logs.logger import logger
-from typing import Dict, List, Optional
-from enum import Enum
-
-class RoleAction(Enum):
-    Suspect = "Suspect"
-    Kill = "Kill"
-    Save = "Save"
-    Investigate = "Investigate"
-    Protect = "Protect"
-    Vote = "Vote"
+import logging
+import os
+import random
+import sys
+from logs.logger import get_game_logger
+from providers.events import EventLog, EventType, KILL_REASONS, KillReason, NO_PLAYER, Potion, VoteKind
+from providers.rng import PhaseRandom
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from enum import IntEnum
+
+if TYPE_CHECKING:
+    from providers.timeline import ActionTimeline
+
+class RoleAction(IntEnum):
+    Suspect = 0
+    Kill = 1
+    Save = 2
+    Investigate = 3
+    Protect = 4
+    Vote = 5
     
     def __str__(self):
-        return f'{self.value}'
+        return self.name
 
 class PlayerAction(object):
-    def __init__(self, action: RoleAction, target):
+    # one thing a player did, the target is a player id (NO_PLAYER for the witch's save) and the round is
+    # the night it happened in or followed
+    __slots__ = ('action', 'target', 'round')
+
+    def __init__(self, action: RoleAction, target, round: int = 0):
         self.action = action
         self.target = target
+        self.round = round
 
     def __repr__(self):
-        return f"{self.action} {self.target}"
+        return f"{self.action} {self.target} (round {self.round})"
+
+    def toJson(self):
+        return {"action": self.action.name, "target": self.target, "round": self.round}
 
 class Role(object):
+    __slots__ = ('name', 'description', 'balance_points', 'possible_actions')
+
     def __init__(self, name: str, description: str, balance_points: int = 0):
         self.name = name
         self.description = description
         self.balance_points = balance_points
-        self.possible_actions: List[RoleAction] = [RoleAction.Suspect, RoleAction.Vote]
+        self.possible_actions: Tuple[RoleAction, ...] = (RoleAction.Suspect, RoleAction.Vote)
 
     def __repr__(self):
         return self.name
     
 class Player(object):
+    __slots__ = ('id', 'name', 'role', 'is_alive')
+
     def __init__(self, id: int, name: str, role: Role):
         self.id: int = id
         self.name: str = name
         self.role: Role = role
         self.is_alive = True
-        self.actions_taken: List[PlayerAction] = []
     
     def __repr__(self):
         return f"{self.name} ({self.role})"
     
-    def __eq__(self, __value: 'Player') -> bool:
+    def __eq__(self, __value: object) -> bool:
+        if not isinstance(__value, Player):
+            return NotImplemented
         return self.id == __value.id
     
     def __hash__(self) -> int:
@@ -57,58 +80,191 @@ class Player(object):
         return f'{self.name} ({self.role})'
     
 class Werewolf(Role):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Werewolf', 'Each night, along with the wolves, choose a player to eliminate', -6)
-        self.possible_actions.append(RoleAction.Kill)
+        self.possible_actions += (RoleAction.Kill,)
 
 class Villager(Role):
+    __slots__ = ()
+
     def __init__(self, name = 'Villager', description = 'Find enemies of your village and eliminate them', balance_points = 1):
         super().__init__(name, description, balance_points)
 
 class Seer(Villager):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Seer', 'Each night, learn if a player is wolf or not', 7)
-        self.possible_actions.append(RoleAction.Investigate)
+        self.possible_actions += (RoleAction.Investigate,)
 
 class Bodyguard(Villager):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Bodyguard', 'Each night, choose a player who cannot be eliminated that night', 3)
-        self.possible_actions.append(RoleAction.Save)
+        self.possible_actions += (RoleAction.Save,)
     
 class Witch(Villager):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__('Witch', 'Once per game, you may save or eliminate a player during the night', 4)
-        self.possible_actions.append(RoleAction.Save)
-        self.possible_actions.append(RoleAction.Kill)
-        self.can_kill = True
-        self.can_save = True
+        self.possible_actions += (RoleAction.Save, RoleAction.Kill)
+
+# roles hold no per player state, so every player with the same role shares one instance
+ROLES: Dict[str, Role] = {role.name: role for role in [Werewolf(), Villager(), Seer(), Bodyguard(), Witch()]}
+
+def get_role(name: str) -> Role:
+    if name not in ROLES:
+        raise ValueError(f"unknown role {name}")
+    return ROLES[name]
     
 class Vote(object):
-    def __init__(self, player: Player, votes: int):
+    __slots__ = ('player', 'votes', 'order')
+
+    def __init__(self, player: Player, votes: int, order: int = 0):
         self.player = player
         self.votes = votes
+        # when the player got their first vote, ties are reported in that order
+        self.order = order
 
     def __repr__(self):
         return f'{self.player} ({self.votes})'
+
+class VoteTally(object):
+    # keeps each voter's current target and the candidates bucketed by vote count,
+    # so the leaders and ties are known without rescanning the votes.
+    # everything is keyed by player id, hashing ints is much cheaper than calling Player.__hash__
+    __slots__ = ('votes', 'candidates', 'targets', 'buckets', 'highest', 'next_order')
+
+    def __init__(self):
+        self.votes: Dict[Player, Vote] = {}
+        self.candidates: Dict[int, Vote] = {}
+        self.targets: Dict[int, Player] = {}
+        self.buckets: Dict[int, Dict[int, Vote]] = {}
+        self.highest = 0
+        self.next_order = 0
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def __repr__(self):
+        return repr(self.get_votes())
+
+    def get_target(self, voter: Player) -> Optional[Player]:
+        return self.targets.get(voter.id)
+
+    def add(self, voter: Player, victim: Player) -> bool:
+        targets = self.targets
+        if voter.id in targets:
+            return False
+        targets[voter.id] = victim
+        victim_id = victim.id
+        vote = self.candidates.get(victim_id)
+        if vote is None:
+            vote = self.candidates[victim_id] = self.votes[victim] = Vote(victim, 0, self.next_order)
+            self.next_order += 1
+        else:
+            del self.buckets[vote.votes][victim_id]
+        count = vote.votes = vote.votes + 1
+        bucket = self.buckets.get(count)
+        if bucket is None:
+            self.buckets[count] = {victim_id: vote}
+        else:
+            bucket[victim_id] = vote
+        if count > self.highest:
+            self.highest = count
+        return True
+
+    def remove(self, voter: Player, victim: Player) -> bool:
+        if self.targets.get(voter.id) != victim:
+            return False
+        del self.targets[voter.id]
+        victim_id = victim.id
+        vote = self.candidates[victim_id]
+        bucket = self.buckets[vote.votes]
+        del bucket[victim_id]
+        if not bucket:
+            del self.buckets[vote.votes]
+            if vote.votes == self.highest:
+                self.highest -= 1
+        vote.votes -= 1
+        if vote.votes == 0:
+            del self.candidates[victim_id]
+            del self.votes[victim]
+        else:
+            self.buckets.setdefault(vote.votes, {})[victim_id] = vote
+        return True
+
+    def get_highest_votes(self) -> List[Vote]:
+        leaders = self.buckets.get(self.highest)
+        if not leaders:
+            return []
+        if len(leaders) == 1:
+            return list(leaders.values())
+        return sorted(leaders.values(), key=lambda vote: vote.order)
+
+    def get_leader(self) -> Optional[Vote]:
+        # the only candidate with the most votes, None when nobody voted or it's a tie
+        leaders = self.buckets.get(self.highest)
+        if not leaders or len(leaders) > 1:
+            return None
+        return next(iter(leaders.values()))
+
+    def is_tie(self) -> bool:
+        return len(self.buckets.get(self.highest, ())) > 1
+
+    def get_votes(self) -> List[Vote]:
+        # most votes first, ties in first vote order
+        return sorted(self.candidates.values(), key=lambda vote: (-vote.votes, vote.order))
     
 class NightActions(object):
-    werewolf_victim: Optional[Player] = None
-    did_seer_find_werewolf: bool = False
-    did_witch_save_werewolf_victim: bool = False
-    witch_victim: Optional[Player] = None
-    bodyguard_saved_player: Optional[Player] = None
+    __slots__ = ('werewolf_victim', 'seer_investigated_player', 'did_seer_find_werewolf',
+                 'did_witch_save_werewolf_victim', 'witch_victim', 'bodyguard_saved_player')
 
-class NightResults(NightActions):
-    has_killed_werewolf_victim: bool = False
-    has_killed_witch_victim: bool = False
-    killed_players: List[Player] = []
+    def __init__(self):
+        self.werewolf_victim: Optional[Player] = None
+        self.seer_investigated_player: Optional[Player] = None
+        self.did_seer_find_werewolf: bool = False
+        self.did_witch_save_werewolf_victim: bool = False
+        self.witch_victim: Optional[Player] = None
+        self.bodyguard_saved_player: Optional[Player] = None
+
+class NightResults(object):
+    # keeps a reference to the night's actions instead of copying them
+    __slots__ = ('actions', 'has_killed_werewolf_victim', 'has_killed_witch_victim', 'killed_players')
 
     def __init__(self, night_actions: NightActions):
-        self.werewolf_victim = night_actions.werewolf_victim
-        self.did_seer_find_werewolf = night_actions.did_seer_find_werewolf
-        self.did_witch_save_werewolf_victim = night_actions.did_witch_save_werewolf_victim
-        self.witch_victim = night_actions.witch_victim
-        self.bodyguard_saved_player = night_actions.bodyguard_saved_player
+        self.actions = night_actions
+        self.has_killed_werewolf_victim: bool = False
+        self.has_killed_witch_victim: bool = False
+        self.killed_players: List[Player] = []
+
+    @property
+    def werewolf_victim(self) -> Optional[Player]:
+        return self.actions.werewolf_victim
+
+    @property
+    def seer_investigated_player(self) -> Optional[Player]:
+        return self.actions.seer_investigated_player
+
+    @property
+    def did_seer_find_werewolf(self) -> bool:
+        return self.actions.did_seer_find_werewolf
+
+    @property
+    def did_witch_save_werewolf_victim(self) -> bool:
+        return self.actions.did_witch_save_werewolf_victim
+
+    @property
+    def witch_victim(self) -> Optional[Player]:
+        return self.actions.witch_victim
+
+    @property
+    def bodyguard_saved_player(self) -> Optional[Player]:
+        return self.actions.bodyguard_saved_player
     
     def set_has_killed_werewolf_victim(self, has_killed: bool):
         self.has_killed_werewolf_victim = has_killed
@@ -124,19 +280,39 @@ class NightResults(NightActions):
             if isinstance(player.role, Seer):
                 return False
         return True
+
+    def toJson(self):
+        return {
+            "werewolf_victim": self.werewolf_victim.toJson() if self.werewolf_victim else None,
+            "did_seer_find_werewolf": self.did_seer_find_werewolf,
+            "did_witch_save_werewolf_victim": self.did_witch_save_werewolf_victim,
+            "witch_victim": self.witch_victim.toJson() if self.witch_victim else None,
+            "bodyguard_saved_player": self.bodyguard_saved_player.toJson() if self.bodyguard_saved_player else None,
+            "has_killed_werewolf_victim": self.has_killed_werewolf_victim,
+            "has_killed_witch_victim": self.has_killed_witch_victim,
+            "killed_players": [player.toJson() for player in self.killed_players],
+        }
     
     def __repr__(self):
-        return json.dumps(self.__dict__)
+        return json.dumps(self.toJson())
 
 class DayActions(object):
-    village_victim: Optional[Player] = None
+    __slots__ = ('village_victim',)
+
+    def __init__(self):
+        self.village_victim: Optional[Player] = None
 
-class DayResults(DayActions):
-    killed_players: List[Player] = []
-    has_killed_village_victim: bool = False
+class DayResults(object):
+    __slots__ = ('actions', 'killed_players', 'has_killed_village_victim')
 
     def __init__(self, day_actions: DayActions):
-        self.village_victim = day_actions.village_victim
+        self.actions = day_actions
+        self.killed_players: List[Player] = []
+        self.has_killed_village_victim: bool = False
+
+    @property
+    def village_victim(self) -> Optional[Player]:
+        return self.actions.village_victim
     
     def set_killed_players(self, killed_players: List[Player]):
         self.killed_players = killed_players
@@ -144,182 +320,447 @@ class DayResults(DayActions):
     def set_has_killed_village_victim(self, has_killed: bool):
         self.has_killed_village_victim = has_killed
 
+    def toJson(self):
+        return {
+            "village_victim": self.village_victim.toJson() if self.village_victim else None,
+            "has_killed_village_victim": self.has_killed_village_victim,
+            "killed_players": [player.toJson() for player in self.killed_players],
+        }
+
     def __repr__(self):
-        return json.dumps(self.__dict__)
+        return json.dumps(self.toJson())
 
 class Game(object):
-    def __init__(self, players: List[Player]):
+    # a game is only attributes in slots, and the per game objects (generator, logger, vote tallies)
+    # are created when first needed and dropped when done, so a game costs as little memory as possible
+    __slots__ = ('game_id', 'seed', '_rng', '_logger', 'players', 'players_dead', 'player_index', 'alive_mask',
+                 'werewolves_count', 'villagers_count', 'special_players', '_werewolf_mask', '_villager_mask',
+                 'day', 'night', 'start_time', 'end_time', 'winners', 'werewolf_tally',
+                 'witch_kill_potion_used', 'witch_save_potion_used', 'village_tally', 'events',
+                 'last_night_results', 'last_day_results', 'werewolf_revotes', 'village_revotes', 'winning_side',
+                 '_timeline')
+
+    def __init__(self, players: List[Player], game_id: Optional[str] = None, seed: Optional[int] = None):
+        # 32 hex chars like a uuid4 hex, without importing uuid on the cold start path
+        self.game_id: str = game_id or os.urandom(16).hex()
+        # every random decision of the game is drawn from its own seeded generator
+        self.seed: int = seed if seed is not None else random.getrandbits(32)
+        self._rng: Optional[PhaseRandom] = None
+        self._logger = None
         self.players: List[Player] = players
-        self.players_alive: List[Player] = players
         self.players_dead: List[Player] = []
+        # lobbies number their players 1..n, then a player's index is derived from their id and no map is kept
+        contiguous = all(player.id == index for index, player in enumerate(players, 1))
+        self.player_index: Optional[Dict[int, int]] = None if contiguous else \
+            {player.id: index for index, player in enumerate(players)}
+        # alive players are counted incrementally, so win checks never rescan the roster. a death only
+        # clears the player's byte in the masks, the alive lists are built from them in roster order when
+        # asked for, which is the order players vote in and earliest_vote breaks ties by
+        self.alive_mask = bytearray(1 if player.is_alive else 0 for player in players)
+        self.werewolves_count = 0
+        self.villagers_count = 0
+        self.special_players: List[Player] = []
+        self._werewolf_mask = bytearray(len(players))
+        self._villager_mask = bytearray(len(players))
+        for player in players:
+            if player.is_alive:
+                self._index_player(player)
         self.day = 0
         self.night = 0
         self.start_time = None
         self.end_time = None
         self.winners: List[Player] = []
-        self.werewolf_votes: Dict[Player, Vote] = {}
-        self.werewolf_votes_history: List[Dict[Player, Vote]] = []
-        self.night_results_history: List[NightResults] = []
-        self.day_results_history: List[DayResults] = []
+        self.werewolf_tally: Optional[VoteTally] = None
         self.witch_kill_potion_used = False
         self.witch_save_potion_used = False
-        self.village_votes: Dict[Player, Vote] = {}
-        self.village_votes_history: List[Dict[Player, Vote]] = []
-        
+        self.village_tally: Optional[VoteTally] = None
+        # everything that happened is kept in one compact event stream, the histories are views over it
+        self.events = EventLog()
+        self.last_night_results: Optional[NightResults] = None
+        self.last_day_results: Optional[DayResults] = None
+        self.werewolf_revotes = 0
+        self.village_revotes = 0
+        self.winning_side: Optional[str] = None
+        self._timeline = None
+
+    @property
+    def rng(self) -> PhaseRandom:
+        if self._rng is None:
+            self._rng = PhaseRandom(self.seed)
+        return self._rng
+
+    @property
+    def logger(self):
+        if self._logger is None:
+            self._logger = get_game_logger(self.game_id)
+        return self._logger
+
+    @property
+    def timeline(self) -> 'ActionTimeline':
+        # built on first use, then each access only indexes the events recorded since the previous one
+        if self._timeline is None:
+            from providers.timeline import ActionTimeline
+            self._timeline = ActionTimeline(self.events)
+        self._timeline.update()
+        return self._timeline
+
+    def memory_footprint(self) -> int:
+        # bytes held by this game alone. roles, classes and the shared logger are not counted
+        size = 0
+        seen = set()
+        pending: List[object] = [self]
+        while pending:
+            item = pending.pop()
+            if id(item) in seen or item is None or isinstance(item, (bool, Role, RoleAction, type, logging.Logger)) \
+                    or (isinstance(item, int) and -5 <= item <= 256):
+                continue
+            seen.add(id(item))
+            size += sys.getsizeof(item)
+            if isinstance(item, dict):
+                pending.extend(item.keys())
+                pending.extend(item.values())
+            elif isinstance(item, (list, tuple, set)):
+                pending.extend(item)
+            else:
+                for cls in type(item).__mro__:
+                    for name in cls.__dict__.get('__slots__', ()):
+                        pending.append(getattr(item, name, None))
+                if hasattr(item, '__dict__'):
+                    pending.append(item.__dict__)
+        return size
+
     def start(self):
         self.day = 1
         self.night = 0
         self.start_time = datetime.now()
+        self._record_event(EventType.GameStarted, value=len(self.players))
 
-        logger.info(f'\n\nGame starts at {self.start_time}')
-        logger.info(f"Day: {self.day}. {len(self.players)} players introduced  \n")
+        self.logger.info('\n\nGame starts at %s', self.start_time,
+                         extra={'event': 'game_started', 'fields': {'players': len(self.players)}})
+        self.logger.info("Day: %s. %s players introduced  \n", self.day, len(self.players))
         
     def end(self):
         self.end_time = datetime.now()
-        logger.info(f'Game ends at {self.end_time}')
+        self._record_event(EventType.GameEnded, value=len(self.winners))
+        self.logger.info('Game ends at %s', self.end_time,
+                         extra={'event': 'game_ended', 'fields': {'winning_side': self.winning_side,
+                                                                  'nights': self.night}})
         
     def new_day(self) -> DayActions:
         self.day += 1
-        logger.info(f"\nDay: {self.day}. {len(self.players_alive)} players alive: {self.players_alive} \n")
+        self.reseed_phase_rng()
+        self._record_event(EventType.DayStarted, value=self.day)
+        self.logger.info("\nDay: %s. %s players alive: %s \n", self.day, len(self.players_alive), self.players_alive)
         return DayActions()
         
     def new_night(self) -> NightActions:
         self.night += 1
-        logger.info(f"\nNight: {self.night}. {len(self.players_alive)} players alive: {self.players_alive} \n")
+        self.reseed_phase_rng()
+        self._record_event(EventType.NightStarted, value=self.night)
+        self.logger.info("\nNight: %s. %s players alive: %s \n", self.night, len(self.players_alive), self.players_alive)
         return NightActions()
     
+    def reseed_phase_rng(self):
+        # each phase draws from a generator derived from (seed, night, day), so a replayed game
+        # can resume at any phase boundary without re-running the draws that came before it
+        phase_seed = (self.seed << 32) | (self.night << 16) | self.day
+        if self._rng is None:
+            self._rng = PhaseRandom(phase_seed)
+        else:
+            self._rng.reseed(phase_seed)
+
+    def _record_event(self, type: int, actor: Optional[Player] = None, target: Optional[Player] = None,
+                      value: int = 0):
+        # appends straight to the event array, this sits on the per vote hot path
+        self.events.data.fromlist([type, self.night, NO_PLAYER if actor is None else actor.id,
+                                   NO_PLAYER if target is None else target.id, value])
+
+    def _get_index(self, player_id: int) -> Optional[int]:
+        if self.player_index is not None:
+            return self.player_index.get(player_id)
+        if 1 <= player_id <= len(self.players):
+            return player_id - 1
+        return None
+
+    def get_player(self, player_id: int) -> Optional[Player]:
+        index = self._get_index(player_id)
+        return None if index is None else self.players[index]
+
+    @property
+    def players_alive(self) -> List[Player]:
+        # the alive lists are new on every call, so callers can keep them while players die
+        return list(compress(self.players, self.alive_mask))
+
+    def _index_player(self, player: Player):
+        index = self._get_index(player.id)
+        if isinstance(player.role, Werewolf):
+            self.werewolves_count += 1
+            self._werewolf_mask[index] = 1
+        if isinstance(player.role, Villager):
+            self.villagers_count += 1
+            self._villager_mask[index] = 1
+        if isinstance(player.role, (Seer, Bodyguard, Witch)):
+            self.special_players.append(player)
+
+    def _unindex_player(self, player: Player):
+        index = self._get_index(player.id)
+        if isinstance(player.role, Werewolf):
+            self.werewolves_count -= 1
+            self._werewolf_mask[index] = 0
+        if isinstance(player.role, Villager):
+            self.villagers_count -= 1
+            self._villager_mask[index] = 0
+        if player in self.special_players:
+            self.special_players.remove(player)
+        self.alive_mask[index] = 0
+
+    def _get_special_role(self, role: type) -> Optional[Player]:
+        for player in self.special_players:
+            if isinstance(player.role, role):
+                return player
+        return None
+
     def get_villagers(self) -> List[Player]:
-        return [p for p in self.players_alive if isinstance(p.role, Villager)]
+        return list(compress(self.players, self._villager_mask))
     
     def get_werewolves(self) -> List[Player]:
-        return [p for p in self.players_alive if isinstance(p.role, Werewolf)]
+        return list(compress(self.players, self._werewolf_mask))
+
+    def get_villagers_count(self) -> int:
+        return self.villagers_count
+
+    def get_werewolves_count(self) -> int:
+        return self.werewolves_count
     
     def get_seer(self) -> Optional[Player]:
-        return next(iter([p for p in self.players_alive if isinstance(p.role, Seer)]), None)
+        return self._get_special_role(Seer)
 
     def get_bodyguard(self) -> Optional[Player]:
-        return next(iter([p for p in self.players_alive if isinstance(p.role, Bodyguard)]), None)
+        return self._get_special_role(Bodyguard)
     
     def get_witch(self) -> Optional[Player]:
-        return next(iter([p for p in self.players_alive if isinstance(p.role, Witch)]), None)
+        return self._get_special_role(Witch)
     
     def get_players_alive(self) -> List[Player]:
         return self.players_alive
+
+    def is_player_alive(self, player: Player) -> bool:
+        index = self._get_index(player.id)
+        return index is not None and self.alive_mask[index] == 1
     
     def is_werewolf(self, player: Player) -> bool:
         return isinstance(player.role, Werewolf)
 
     def is_game_over(self):
-        werewolves = self.get_werewolves()
-        villagers = self.get_villagers()
-        werewolves_count = len(werewolves)
-        villagers_count = len(villagers)  
+        werewolves_count = self.get_werewolves_count()
+        villagers_count = self.get_villagers_count()
 
-        
         if werewolves_count == 0:
-            self.winners = villagers
-            logger.info('Villagers win. All werewolves are dead.')
+            self.winners = self.get_villagers()
+            self.winning_side = 'Villagers'
+            self.logger.info('Villagers win. All werewolves are dead.')
             return True
         
         if werewolves_count > villagers_count:
-            self.winners = werewolves
-            logger.info(f"Werewolves win. They outnumber the villagers {werewolves_count} to {villagers_count}")
+            self.winners = self.get_werewolves()
+            self.winning_side = 'Werewolves'
+            self.logger.info("Werewolves win. They outnumber the villagers %s to %s", werewolves_count, villagers_count)
             return True
         
         return False
     
+    @property
+    def werewolf_votes(self) -> Dict[Player, Vote]:
+        return self.werewolf_tally.votes if self.werewolf_tally is not None else {}
+
+    @property
+    def village_votes(self) -> Dict[Player, Vote]:
+        return self.village_tally.votes if self.village_tally is not None else {}
+
     def start_new_werewolves_vote(self):
-        self.werewolf_votes = {}
+        self.werewolf_tally = VoteTally()
+        self._record_event(EventType.VoteStarted, value=VoteKind.Werewolves)
         return self.werewolf_votes
     
     def end_werewolves_vote(self):
-        self.werewolf_votes_history.append(self.werewolf_votes)
-        return self.werewolf_votes
+        # a closed vote is only kept in the event log
+        self._record_event(EventType.VoteEnded, value=VoteKind.Werewolves)
+        votes = self.werewolf_votes
+        self.werewolf_tally = None
+        return votes
 
     def add_werewolf_vote(self, werewolf_player: Player, victim_player: Player):
         if not (werewolf_player.is_alive and isinstance(werewolf_player.role, Werewolf)):
-            logger.info(f'{werewolf_player} is not a werewolf or is dead')
+            self.logger.info('%s is not a werewolf or is dead', werewolf_player)
             return False
 
         if not (victim_player.is_alive):
-            logger.info(f'{victim_player} is dead')
+            self.logger.info('%s is dead', victim_player)
             return False
         
-        # logger.info(f'{werewolf_player} votes to kill {victim_player}')
-        if victim_player in self.werewolf_votes:
-            self.werewolf_votes[victim_player].votes += 1
-        else:
-            self.werewolf_votes[victim_player] = Vote(victim_player, 1)
+        if self.werewolf_tally is None:
+            self.werewolf_tally = VoteTally()
+        if not self.werewolf_tally.add(werewolf_player, victim_player):
+            self.logger.info('%s has already voted for %s', werewolf_player, self.werewolf_tally.get_target(werewolf_player))
+            return False
+        self._record_event(EventType.VoteCast, werewolf_player, victim_player, VoteKind.Werewolves)
 
         return self.werewolf_votes
     
     def remove_werevolves_vote(self, werewolf_player: Player, victim_player: Player):
         if not (werewolf_player.is_alive and isinstance(werewolf_player.role, Werewolf)):
-            logger.info(f'{werewolf_player} is not a werewolf or is dead')
+            self.logger.info('%s is not a werewolf or is dead', werewolf_player)
             return False
         
         # remove vote
-        if victim_player in self.werewolf_votes:
-            logger.info(f'{werewolf_player} has removed vote for {victim_player}')
-            self.werewolf_votes[victim_player].votes -= 1
-            if self.werewolf_votes[victim_player].votes <= 0:
-                del self.werewolf_votes[victim_player]
+        if self.werewolf_tally is not None and self.werewolf_tally.remove(werewolf_player, victim_player):
+            self.logger.info('%s has removed vote for %s', werewolf_player, victim_player)
+            self._record_event(EventType.VoteRemoved, werewolf_player, victim_player, VoteKind.Werewolves)
         else:
-            logger.info(f'{werewolf_player} has not voted for {victim_player}')
+            self.logger.info('%s has not voted for %s', werewolf_player, victim_player)
 
         return self.werewolf_votes    
     
     def get_highest_werewolves_votes(self)-> List[Vote]:
-        if len(self.werewolf_votes) == 0:
-            return []
-        
-        highest_vote = max([vote.votes for vote in self.werewolf_votes.values()])
-        return [vote for vote in self.werewolf_votes.values() if vote.votes == highest_vote]
+        return self.werewolf_tally.get_highest_votes() if self.werewolf_tally is not None else []
     
     def get_werewolves_votes(self) -> List[Vote]:
-        # first sort the votes in descending order
-        votes = sorted(self.werewolf_votes.values(), key=lambda vote: vote.votes, reverse=True)
-        return votes
-    
+        return self.werewolf_tally.get_votes() if self.werewolf_tally is not None else []
+    
+    @property
+    def werewolf_votes_history(self) -> List[Dict[Player, Vote]]:
+        return self._get_votes_history(VoteKind.Werewolves)
+
+    @property
+    def village_votes_history(self) -> List[Dict[Player, Vote]]:
+        return self._get_votes_history(VoteKind.Village)
+
+    def _get_votes_history(self, kind: int) -> List[Dict[Player, Vote]]:
+        history: List[Dict[Player, Vote]] = []
+        tally = VoteTally()
+        for event in self.events:
+            if event.value != kind:
+                continue
+            if event.type == EventType.VoteStarted:
+                tally = VoteTally()
+            elif event.type == EventType.VoteCast:
+                tally.add(self.get_player(event.actor), self.get_player(event.target))
+            elif event.type == EventType.VoteRemoved:
+                tally.remove(self.get_player(event.actor), self.get_player(event.target))
+            elif event.type == EventType.VoteEnded:
+                history.append(tally.votes)
+        return history
+
     def get_werewolves_votes_history(self):
         return self.werewolf_votes_history
 
-    def kill_player(self, player: Player, reason: str = '') -> List[Player]:
-        if player in self.players_alive:
-            logger.info(f'{player} is killed. Reason: {reason}')
-            self.players_alive.remove(player)
-            self.players_dead.append(player)
-            player.is_alive = False
-        
-        return self.players_alive
+    def get_village_votes_history(self):
+        return self.village_votes_history
+
+    @property
+    def night_results_history(self) -> List[NightResults]:
+        history: List[NightResults] = []
+        night_actions = NightActions()
+        killed_players: List[Player] = []
+        for event in self.events:
+            if event.type in (EventType.NightStarted, EventType.DayStarted):
+                night_actions = NightActions()
+                killed_players = []
+            elif event.type == EventType.WerewolfVictimChosen:
+                night_actions.werewolf_victim = self.get_player(event.target)
+            elif event.type == EventType.BodyguardSaved:
+                night_actions.bodyguard_saved_player = self.get_player(event.target)
+            elif event.type == EventType.SeerResult:
+                night_actions.seer_investigated_player = self.get_player(event.target)
+                night_actions.did_seer_find_werewolf = bool(event.value)
+            elif event.type == EventType.WitchSaved:
+                night_actions.did_witch_save_werewolf_victim = bool(event.value)
+            elif event.type == EventType.WitchVictimChosen:
+                night_actions.witch_victim = self.get_player(event.target)
+            elif event.type == EventType.PlayerKilled:
+                killed_players.append(self.get_player(event.target))
+            elif event.type == EventType.NightResolved:
+                night_results = NightResults(night_actions)
+                night_results.set_has_killed_werewolf_victim(bool(event.value & 1))
+                night_results.set_has_killed_witch_victim(bool(event.value & 2))
+                night_results.set_killed_players(killed_players)
+                history.append(night_results)
+                killed_players = []
+        return history
+
+    @property
+    def day_results_history(self) -> List[DayResults]:
+        history: List[DayResults] = []
+        day_actions = DayActions()
+        killed_players: List[Player] = []
+        for event in self.events:
+            if event.type in (EventType.NightStarted, EventType.DayStarted, EventType.NightResolved):
+                day_actions = DayActions()
+                killed_players = []
+            elif event.type == EventType.VillageVictimChosen:
+                day_actions.village_victim = self.get_player(event.target)
+            elif event.type == EventType.PlayerKilled:
+                killed_players.append(self.get_player(event.target))
+            elif event.type == EventType.DayResolved:
+                day_results = DayResults(day_actions)
+                day_results.set_has_killed_village_victim(bool(event.value))
+                day_results.set_killed_players(killed_players)
+                history.append(day_results)
+                killed_players = []
+        return history
+
+    def get_night_results_history(self):
+        return self.night_results_history
+
+    def get_day_results_history(self):
+        return self.day_results_history
+
+    def kill_player(self, player: Player, reason: str = ''):
+        if self.is_player_alive(player):
+            self.logger.info('%s is killed. Reason: %s', player, reason,
+                             extra={'event': 'player_killed', 'fields': {'player_id': player.id,
+                                                                         'role': player.role.name,
+                                                                         'reason': reason}})
+            self.mark_dead(player)
+            self._record_event(EventType.PlayerKilled, target=player, value=KILL_REASONS.get(reason, KillReason.Other))
+
+    def mark_dead(self, player: Player):
+        # removes a player from the alive index without logging or recording an event
+        self._unindex_player(player)
+        self.players_dead.append(player)
+        player.is_alive = False
 
     def get_last_bodyguard_saved_player(self) -> Optional[Player]:
-        if len(self.night_results_history) == 0:
+        if self.last_night_results is None:
             return None
-        return self.night_results_history[-1].bodyguard_saved_player
+        return self.last_night_results.bodyguard_saved_player
     
     def set_witch_kill_potion_used(self, player: Player) -> Optional[Player]:
         if self.witch_kill_potion_used:
-            logger.info('Witch kill potion already used')
+            self.logger.info('Witch kill potion already used')
             return None
         self.witch_kill_potion_used = True
-        logger.info(f'Witch kill potion used on {player}')
+        self._record_event(EventType.PotionUsed, self.get_witch(), player, Potion.Kill)
+        self.logger.info('Witch kill potion used on %s', player,
+                         extra={'event': 'potion_used', 'fields': {'potion': 'kill', 'player_id': player.id}})
     
     def is_witch_kill_potion_used(self) -> bool:
         return self.witch_kill_potion_used
     
     def set_witch_save_potion_used(self) -> Optional[Player]:
         if self.witch_save_potion_used:
-            logger.info('Witch save potion already used')
+            self.logger.info('Witch save potion already used')
             return None
         self.witch_save_potion_used = True
-        logger.info(f'Witch save potion used on werewolf victim')
+        self._record_event(EventType.PotionUsed, self.get_witch(), value=Potion.Save)
+        self.logger.info('Witch save potion used on werewolf victim',
+                         extra={'event': 'potion_used', 'fields': {'potion': 'save'}})
     
     def is_witch_save_potion_used(self) -> bool:
         return self.witch_save_potion_used
     
     def process_night_actions(self, night_actions: NightActions):
-        logger.info("")
+        self.logger.info("")
         # process night results
         # identify who needs to be killed, if seer results should be announced, etc 
         # then append result to history
@@ -334,6 +775,18 @@ class Game(object):
         should_kill_werewolf_victim = True
         should_kill_witch_victim = True
 
+        self._record_event(EventType.WerewolfVictimChosen, target=werewolf_victim)
+        # the special roles acting tonight are still alive, so they are the actors of their events
+        seer_investigated_player = night_actions.seer_investigated_player
+        witch = self.get_witch() if did_witch_save_werewolf_victim or witch_victim is not None else None
+        self._record_event(EventType.BodyguardSaved, bodyguard_saved_player and self.get_bodyguard(),
+                           bodyguard_saved_player)
+        self._record_event(EventType.SeerResult, seer_investigated_player and self.get_seer(), seer_investigated_player,
+                           int(night_actions.did_seer_find_werewolf))
+        self._record_event(EventType.WitchSaved, witch if did_witch_save_werewolf_victim else None,
+                           value=int(did_witch_save_werewolf_victim))
+        self._record_event(EventType.WitchVictimChosen, witch if witch_victim is not None else None, witch_victim)
+
         if (werewolf_victim and (did_witch_save_werewolf_victim) \
             or (bodyguard_saved_player is not None and bodyguard_saved_player == werewolf_victim)):
             should_kill_werewolf_victim = False
@@ -352,96 +805,96 @@ class Game(object):
             night_results.set_has_killed_witch_victim(True)
 
         night_results.set_killed_players(killed_players)
-        self.night_results_history.append(night_results)
-        return self.night_results_history
+        self._record_event(EventType.NightResolved,
+                           value=int(night_results.has_killed_werewolf_victim) | int(night_results.has_killed_witch_victim) << 1)
+        self.last_night_results = night_results
+        return night_results
     
     def announce_last_night_results(self):
-        if len(self.night_results_history) == 0:
-            logger.info('No night results to announce')
+        last_night_results = self.last_night_results
+        if last_night_results is None:
+            self.logger.info('No night results to announce')
             return None
-        last_night_results = self.night_results_history[-1]
-        logger.info('Last night results:')
+        self.logger.info('Last night results:')
 
         # announce players who died
         killed_players = last_night_results.killed_players
         if len(killed_players) == 0:
-            logger.info('No one died last night')
+            self.logger.info('No one died last night')
         else:
             for player in killed_players:
-                logger.info(f'{player} died')
+                self.logger.info('%s died', player)
         
         # announce seer results
         seer = self.get_seer()
         if seer is None:
-            logger.info('No seer in the game')
+            self.logger.info('No seer in the game')
         else:
             if last_night_results.should_announce_seer_results():
                 if last_night_results.did_seer_find_werewolf:
-                    logger.info('Seer found a werewolf last night')
+                    self.logger.info('Seer found a werewolf last night')
                 else:
-                    logger.info('Seer did not find a werewolf last night')
+                    self.logger.info('Seer did not find a werewolf last night')
             else:
-                logger.info("Seer results won't be announced")
+                self.logger.info("Seer results won't be announced")
   
     def start_new_village_vote(self):
-        self.village_votes = {}
+        self.village_tally = VoteTally()
+        self._record_event(EventType.VoteStarted, value=VoteKind.Village)
         return self.village_votes
     
     def end_village_vote(self):
-        self.village_votes_history.append(self.village_votes)
-        return self.village_votes
+        self._record_event(EventType.VoteEnded, value=VoteKind.Village)
+        votes = self.village_votes
+        self.village_tally = None
+        return votes
     
     def add_village_vote(self, voting_player: Player, victim_player: Player):
         if not (voting_player.is_alive):
-            logger.info(f'{voting_player} is dead and cannot vote')
+            self.logger.info('%s is dead and cannot vote', voting_player)
             return False
 
         if not (victim_player.is_alive):
-            logger.info(f'{victim_player} is dead and cannot be voted')
+            self.logger.info('%s is dead and cannot be voted', victim_player)
             return False
         
-        # logger.info(f'{voting_player} votes to kill {victim_player}')
-        if victim_player in self.village_votes:
-            self.village_votes[victim_player].votes += 1
-        else:
-            self.village_votes[victim_player] = Vote(victim_player, 1)
+        if self.village_tally is None:
+            self.village_tally = VoteTally()
+        if not self.village_tally.add(voting_player, victim_player):
+            self.logger.info('%s has already voted for %s', voting_player, self.village_tally.get_target(voting_player))
+            return False
+        self._record_event(EventType.VoteCast, voting_player, victim_player, VoteKind.Village)
 
         return self.village_votes
     
     def remove_village_vote(self, voting_player: Player, victim_player: Player):
         if not voting_player.is_alive:
-            logger.info(f'{voting_player} is dead and cannot vote')
+            self.logger.info('%s is dead and cannot vote', voting_player)
             return False
         
         # remove vote
-        if victim_player in self.village_votes:
-            logger.info(f'{voting_player} has removed vote for {victim_player}')
-            self.village_votes[victim_player].votes -= 1
-            if self.village_votes[victim_player].votes <= 0:
-                del self.village_votes[victim_player]
+        if self.village_tally is not None and self.village_tally.remove(voting_player, victim_player):
+            self.logger.info('%s has removed vote for %s', voting_player, victim_player)
+            self._record_event(EventType.VoteRemoved, voting_player, victim_player, VoteKind.Village)
         else:
-            logger.info(f'{voting_player} has not voted for {victim_player}')
+            self.logger.info('%s has not voted for %s', voting_player, victim_player)
 
         return self.village_votes    
     
     def get_village_votes(self) -> List[Vote]:
-        votes = sorted(self.village_votes.values(), key=lambda vote: vote.votes, reverse=True)
-        return votes
+        return self.village_tally.get_votes() if self.village_tally is not None else []
 
     def get_highest_village_votes(self)-> List[Vote]:
-        if len(self.village_votes) == 0:
-            return []
-        
-        highest_vote = max([vote.votes for vote in self.village_votes.values()])
-        return [vote for vote in self.village_votes.values() if vote.votes == highest_vote]
+        return self.village_tally.get_highest_votes() if self.village_tally is not None else []
     
     def process_day_actions(self, day_actions: DayActions):
-        logger.info("")
+        self.logger.info("")
         # process day results
         # identify who needs to be killed, if hunter, who do they take with them etc
         day_results = DayResults(day_actions)
         killed_players = []
         village_victim: Optional[Player] = day_actions.village_victim
+        self._record_event(EventType.VillageVictimChosen, target=village_victim)
         
         if village_victim:
             self.kill_player(village_victim, 'Village victim')
@@ -449,20 +902,21 @@ class Game(object):
             day_results.set_has_killed_village_victim(True)
 
         day_results.set_killed_players(killed_players)
-        self.day_results_history.append(day_results)
-        return self.day_results_history
+        self._record_event(EventType.DayResolved, value=int(day_results.has_killed_village_victim))
+        self.last_day_results = day_results
+        return day_results
 
     def announce_todays_results(self):
-        if len(self.day_results_history) == 0:
-            logger.info('No results to announce today')
+        last_day_results = self.last_day_results
+        if last_day_results is None:
+            self.logger.info('No results to announce today')
             return None
-        last_day_results = self.day_results_history[-1]
-        logger.info("Today's results:")
+        self.logger.info("Today's results:")
 
         # announce players who died
         killed_players = last_day_results.killed_players
         if len(killed_players) == 0:
-            logger.info('No one died today')
+            self.logger.info('No one died today')
         else:
             for player in killed_players:
-                logger.info(f'{player} died')
+                self.logger.info('%s died', player)
@@ -0,0 +1,130 @@
+from typing import List, Optional
+from providers.objects import Game, NightActions, Player
+
+# how the players nobody controls decide. the random policy draws from the game's generator in a fixed
+# order, so a seeded game makes the same decisions whichever engine plays it
+
+DEFAULT_BOT_BUDGET_MS = 50.0
+
+def get_seer_targets(game: Game, seer: Player) -> List[Player]:
+    return [player for player in game.get_players_alive() if player != seer]
+
+def get_bodyguard_targets(game: Game) -> List[Player]:
+    # the bodyguard can't save the same player twice in a row
+    last_bodyguard_saved_player = game.get_last_bodyguard_saved_player()
+    return [player for player in game.get_players_alive() if player != last_bodyguard_saved_player]
+
+def get_witch_targets(game: Game, witch: Player) -> List[Player]:
+    return [player for player in game.get_players_alive() if player != witch]
+
+def get_village_vote_targets(game: Game, voter: Player, suspected_players: List[Player],
+                             suspected_villagers: List[Player]) -> List[Player]:
+    return suspected_villagers if game.is_werewolf(voter) else suspected_players
+
+class BotPolicy(object):
+    name = ''
+
+    def choose_werewolf_victim(self, game: Game, werewolf: Player, villagers: List[Player]) -> Player:
+        raise NotImplementedError()
+
+    def choose_village_victim(self, game: Game, voter: Player, suspected_players: List[Player],
+                              suspected_villagers: List[Player]) -> Player:
+        raise NotImplementedError()
+
+    def choose_seer_target(self, game: Game, seer: Player) -> Player:
+        raise NotImplementedError()
+
+    def choose_bodyguard_target(self, game: Game, bodyguard: Player) -> Optional[Player]:
+        raise NotImplementedError()
+
+    def choose_witch_save(self, game: Game, witch: Player, night_actions: NightActions) -> bool:
+        raise NotImplementedError()
+
+    def choose_witch_victim(self, game: Game, witch: Player, night_actions: NightActions) -> Optional[Player]:
+        raise NotImplementedError()
+
+    def __repr__(self):
+        return self.name
+
+class RandomPolicy(BotPolicy):
+    name = 'random'
+
+    def choose_werewolf_victim(self, game: Game, werewolf: Player, villagers: List[Player]) -> Player:
+        return game.rng.choice(villagers)
+
+    def choose_village_victim(self, game: Game, voter: Player, suspected_players: List[Player],
+                              suspected_villagers: List[Player]) -> Player:
+        return game.rng.choice(get_village_vote_targets(game, voter, suspected_players, suspected_villagers))
+
+    def choose_seer_target(self, game: Game, seer: Player) -> Player:
+        return game.rng.choice(get_seer_targets(game, seer))
+
+    def choose_bodyguard_target(self, game: Game, bodyguard: Player) -> Optional[Player]:
+        players = get_bodyguard_targets(game)
+        return game.rng.choice(players) if players else None
+
+    def choose_witch_save(self, game: Game, witch: Player, night_actions: NightActions) -> bool:
+        return game.rng.choice([True, False])
+
+    def choose_witch_victim(self, game: Game, witch: Player, night_actions: NightActions) -> Optional[Player]:
+        if not game.rng.choice([True, False]):
+            return None
+        return game.rng.choice(get_witch_targets(game, witch))
+
+RANDOM_POLICY = RandomPolicy()
+
+class SidePolicy(BotPolicy):
+    # one policy for the werewolves and another for everyone else, e.g. to pit a search bot against random ones
+    def __init__(self, werewolves: BotPolicy, villagers: BotPolicy):
+        self.werewolves = werewolves
+        self.villagers = villagers
+        self.name = f'{werewolves} werewolves, {villagers} villagers'
+
+    def _get_policy(self, game: Game, player: Player) -> BotPolicy:
+        return self.werewolves if game.is_werewolf(player) else self.villagers
+
+    def choose_werewolf_victim(self, game: Game, werewolf: Player, villagers: List[Player]) -> Player:
+        return self.werewolves.choose_werewolf_victim(game, werewolf, villagers)
+
+    def choose_village_victim(self, game: Game, voter: Player, suspected_players: List[Player],
+                              suspected_villagers: List[Player]) -> Player:
+        return self._get_policy(game, voter).choose_village_victim(game, voter, suspected_players,
+                                                                   suspected_villagers)
+
+    def choose_seer_target(self, game: Game, seer: Player) -> Player:
+        return self.villagers.choose_seer_target(game, seer)
+
+    def choose_bodyguard_target(self, game: Game, bodyguard: Player) -> Optional[Player]:
+        return self.villagers.choose_bodyguard_target(game, bodyguard)
+
+    def choose_witch_save(self, game: Game, witch: Player, night_actions: NightActions) -> bool:
+        return self.villagers.choose_witch_save(game, witch, night_actions)
+
+    def choose_witch_victim(self, game: Game, witch: Player, night_actions: NightActions) -> Optional[Player]:
+        return self.villagers.choose_witch_victim(game, witch, night_actions)
+
+# the search bots' playouts cost more the bigger the lobby
+SEARCH_BOT_POLICIES = ('mcts', 'mcts_werewolves', 'mcts_villagers')
+BOT_POLICIES = ('random', 'mcts', 'mcts_werewolves', 'mcts_villagers', 'suspicion', 'suspicion_werewolves',
+                'suspicion_villagers')
+
+def create_bot_policy(name: str = 'random', budget_ms: float = DEFAULT_BOT_BUDGET_MS, timed: bool = True,
+                      total_budget_ms: Optional[float] = None) -> BotPolicy:
+    # the budgets only apply to the search bot, see MctsPolicy
+    if name not in BOT_POLICIES:
+        raise ValueError(f"unknown bot policy {name}")
+    if name == 'random':
+        return RANDOM_POLICY
+    # the other bots are only imported by the games that use them
+    kind, _, side = name.partition('_')
+    if kind == 'suspicion':
+        from providers.suspicion import SuspicionPolicy
+        policy: BotPolicy = SuspicionPolicy()
+    else:
+        from providers.mcts import MctsPolicy
+        policy = MctsPolicy(budget_ms, timed=timed, total_budget_ms=total_budget_ms)
+    if side == 'werewolves':
+        return SidePolicy(policy, RANDOM_POLICY)
+    if side == 'villagers':
+        return SidePolicy(RANDOM_POLICY, policy)
+    return policy
@@ -0,0 +1,270 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from providers import policies
+from providers.objects import DayActions, Game, NightActions, Player, RoleAction, Vote
+from providers.voting import DEFAULT_VOTE_RULES, VoteRules
+
+DEFAULT_NIGHT_TIMEOUT = 60.0
+DEFAULT_DAY_TIMEOUT = 120.0
+DEFAULT_REVOTE_TIMEOUT = 30.0
+
+class PhaseTimeouts(object):
+    # seconds players get to act. the whole phase waits at most this long, whatever the number of players
+    def __init__(self, night: float = DEFAULT_NIGHT_TIMEOUT, day: float = DEFAULT_DAY_TIMEOUT,
+                 revote: float = DEFAULT_REVOTE_TIMEOUT):
+        self.night = night
+        self.day = day
+        self.revote = revote
+
+class ActionRequest(object):
+    # an action a human player can take in the current phase. options None means a yes/no choice,
+    # otherwise the answer is one of the options, or None when skipping is allowed. subject is the player
+    # a yes/no choice is about, the werewolves' victim for the witch's save
+    __slots__ = ('player', 'action', 'options', 'can_skip', 'subject', 'future')
+
+    def __init__(self, player: Player, action: RoleAction, options: Optional[List[Player]], can_skip: bool = False,
+                 subject: Optional[Player] = None):
+        self.player = player
+        self.action = action
+        self.options = options
+        self.can_skip = can_skip
+        self.subject = subject
+        self.future: 'asyncio.Future' = asyncio.get_running_loop().create_future()
+
+    def __repr__(self):
+        return f'{self.player} {self.action}'
+
+    def toJson(self):
+        return {
+            "player_id": self.player.id,
+            "action": self.action.name,
+            "options": None if self.options is None else [player.id for player in self.options],
+            "can_skip": self.can_skip,
+            "subject": None if self.subject is None else self.subject.id,
+        }
+
+class PvpGame(object):
+    # plays a game where some players are humans. every action of a phase is opened at once and the
+    # phase ends when all humans answered or its deadline passed, so a night lasts as long as the slowest
+    # human. whatever a human didn't answer is decided by the bot policy, random unless told otherwise
+    def __init__(self, game: Game, humans: Iterable[int], rules: VoteRules = DEFAULT_VOTE_RULES,
+                 timeouts: Optional[PhaseTimeouts] = None, bots: policies.BotPolicy = policies.RANDOM_POLICY):
+        self.game = game
+        self.bots = bots
+        self.humans: Set[int] = set(humans)
+        self.rules = rules
+        self.timeouts = timeouts or PhaseTimeouts()
+        self.requests: Dict[Tuple[int, RoleAction], ActionRequest] = {}
+        # what the seer learnt each night: (night, investigated player, is werewolf)
+        self.seer_findings: List[Tuple[int, Player, bool]] = []
+
+    def is_human(self, player: Player) -> bool:
+        return player.id in self.humans
+
+    def get_pending_actions(self, player_id: int) -> List[ActionRequest]:
+        return [request for (requested_player_id, _), request in self.requests.items()
+                if requested_player_id == player_id and not request.future.done()]
+
+    def disconnect(self, player_id: int):
+        # the player's pending actions and every later one are decided by the bots, phases stop waiting for them
+        self.humans.discard(player_id)
+        for request in self.get_pending_actions(player_id):
+            request.future.cancel()
+
+    def submit(self, player_id: int, action: RoleAction, choice=None):
+        # choice is a player id, None to skip, or a bool for yes/no actions
+        request = self.requests.get((player_id, action))
+        if request is None or request.future.done():
+            raise ValueError(f"player {player_id} has no pending {action} action")
+        if request.options is None:
+            request.future.set_result(bool(choice))
+            return
+        if choice is None:
+            if not request.can_skip:
+                raise ValueError(f"{action} can't be skipped")
+            request.future.set_result(None)
+            return
+        target = self.game.get_player(choice)
+        if target is None or target not in request.options:
+            raise ValueError(f"player {choice} is not a valid target for {action}")
+        request.future.set_result(target)
+
+    def _open(self, player: Player, action: RoleAction, options: Optional[List[Player]],
+              can_skip: bool = False, subject: Optional[Player] = None) -> Optional[ActionRequest]:
+        if not self.is_human(player):
+            return None
+        request = ActionRequest(player, action, options, can_skip, subject)
+        self.requests[(player.id, action)] = request
+        return request
+
+    async def _wait(self, requests: Iterable[Optional[ActionRequest]], timeout: float):
+        futures = [request.future for request in requests if request is not None]
+        if futures:
+            await asyncio.wait(futures, timeout=timeout)
+
+    def _answer(self, request: Optional[ActionRequest]):
+        # (answered, choice). a request that timed out is cancelled, so a late submit is refused
+        if request is None:
+            return False, None
+        self.requests.pop((request.player.id, request.action), None)
+        if request.future.done() and not request.future.cancelled():
+            return True, request.future.result()
+        request.future.cancel()
+        return False, None
+
+    async def _collect_werewolf_votes(self, first_requests: Dict[int, ActionRequest]) -> Optional[Vote]:
+        game = self.game
+        villagers = game.get_villagers()
+        werewolves = game.get_werewolves()
+        requests = first_requests
+
+        revotes = 0
+        while True:
+            game.start_new_werewolves_vote()
+            for werewolf in werewolves:
+                answered, victim = self._answer(requests.get(werewolf.id))
+                if not answered:
+                    victim = self.bots.choose_werewolf_victim(game, werewolf, villagers)
+                game.add_werewolf_vote(werewolf_player=werewolf, victim_player=victim)
+
+            highest_votes = game.get_highest_werewolves_votes()
+            if len(highest_votes) <= 1 or revotes >= self.rules.max_revotes:
+                break
+
+            game.logger.info("There is a tie, werewolves need to vote again")
+            game.werewolf_revotes += 1
+            revotes += 1
+            villagers = [vote.player for vote in highest_votes]
+            requests = {werewolf.id: self._open(werewolf, RoleAction.Kill, villagers) for werewolf in werewolves}
+            await self._wait(requests.values(), self.timeouts.revote)
+
+        game.end_werewolves_vote()
+        return self._break_tie(highest_votes)
+
+    def _break_tie(self, highest_votes: List[Vote]) -> Optional[Vote]:
+        if len(highest_votes) <= 1:
+            return highest_votes[0] if highest_votes else None
+        return self.rules.tie_break.break_tie(highest_votes, self.game.rng)
+
+    async def play_night(self) -> DayActions:
+        game = self.game
+        night_actions: NightActions = game.new_night()
+        deadline = asyncio.get_running_loop().time() + self.timeouts.night
+
+        # every night action is opened at once, but the witch's save, which waits for the werewolves' victim
+        werewolf_requests = {werewolf.id: self._open(werewolf, RoleAction.Kill, game.get_villagers())
+                             for werewolf in game.get_werewolves()}
+        bodyguard = game.get_bodyguard()
+        bodyguard_request = self._open(bodyguard, RoleAction.Protect, policies.get_bodyguard_targets(game)) \
+            if bodyguard is not None else None
+        seer = game.get_seer()
+        seer_request = self._open(seer, RoleAction.Investigate, policies.get_seer_targets(game, seer)) \
+            if seer is not None else None
+        witch = game.get_witch()
+        witch_kill_request = self._open(witch, RoleAction.Kill, policies.get_witch_targets(game, witch), True) \
+            if witch is not None and not game.is_witch_kill_potion_used() else None
+        await self._wait(werewolf_requests.values(), self.timeouts.night)
+
+        # answers are applied, and missing ones drawn, in the order of the bot engine
+        werewolf_vote = await self._collect_werewolf_votes(werewolf_requests)
+        night_actions.werewolf_victim = werewolf_vote.player if werewolf_vote else None
+
+        witch_save_request = None
+        if witch is not None and not game.is_witch_save_potion_used() and night_actions.werewolf_victim is not None:
+            witch_save_request = self._open(witch, RoleAction.Save, None, subject=night_actions.werewolf_victim)
+        # the others keep the rest of the night, the witch has at least a revote's time to decide
+        remaining = deadline - asyncio.get_running_loop().time()
+        if witch_save_request is not None:
+            remaining = max(remaining, self.timeouts.revote)
+        await self._wait([bodyguard_request, seer_request, witch_save_request, witch_kill_request], max(remaining, 0))
+
+        if bodyguard is not None:
+            answered, saved_player = self._answer(bodyguard_request)
+            if not answered:
+                saved_player = self.bots.choose_bodyguard_target(game, bodyguard)
+            night_actions.bodyguard_saved_player = saved_player
+
+        if seer is not None:
+            answered, investigated_player = self._answer(seer_request)
+            if not answered:
+                investigated_player = self.bots.choose_seer_target(game, seer)
+            night_actions.seer_investigated_player = investigated_player
+            night_actions.did_seer_find_werewolf = game.is_werewolf(investigated_player)
+            self.seer_findings.append((game.night, investigated_player, night_actions.did_seer_find_werewolf))
+
+        if witch is not None and not game.is_witch_save_potion_used():
+            answered, save_werewolf_victim = self._answer(witch_save_request)
+            if not answered and self.is_human(witch) and night_actions.werewolf_victim is None:
+                # there is nobody to save, a human witch keeps her potion
+                answered, save_werewolf_victim = True, False
+            if not answered:
+                save_werewolf_victim = self.bots.choose_witch_save(game, witch, night_actions)
+            if save_werewolf_victim:
+                game.set_witch_save_potion_used()
+            night_actions.did_witch_save_werewolf_victim = save_werewolf_victim
+
+        if witch is not None and not game.is_witch_kill_potion_used():
+            answered, witch_victim = self._answer(witch_kill_request)
+            if not answered:
+                witch_victim = self.bots.choose_witch_victim(game, witch, night_actions)
+            if witch_victim is not None:
+                game.set_witch_kill_potion_used(witch_victim)
+            night_actions.witch_victim = witch_victim
+
+        game.process_night_actions(night_actions)
+        day_actions: DayActions = game.new_day()
+        game.announce_last_night_results()
+        return day_actions
+
+    async def play_day(self, day_actions: DayActions):
+        game = self.game
+        players_alive = game.get_players_alive()
+        suspected_players = players_alive
+        timeout = self.timeouts.day
+
+        revotes = 0
+        while True:
+            suspected_villagers = [player for player in suspected_players if not game.is_werewolf(player)]
+            if len(suspected_villagers) == 0:
+                suspected_villagers = suspected_players
+            # humans may vote for anyone suspected, the bot policy only limits what bots pick
+            requests = {player.id: self._open(player, RoleAction.Vote, suspected_players) for player in players_alive}
+            await self._wait(requests.values(), timeout)
+
+            game.start_new_village_vote()
+            for player in players_alive:
+                answered, victim = self._answer(requests.get(player.id))
+                if not answered:
+                    victim = self.bots.choose_village_victim(game, player, suspected_players, suspected_villagers)
+                game.add_village_vote(player, victim)
+
+            highest_votes = game.get_highest_village_votes()
+            if len(highest_votes) <= 1 or revotes >= self.rules.max_revotes:
+                break
+
+            game.logger.info("There is a tie, everyone needs to vote again")
+            game.village_revotes += 1
+            revotes += 1
+            suspected_players = [vote.player for vote in highest_votes]
+            timeout = self.timeouts.revote
+
+        game.end_village_vote()
+        village_vote = self._break_tie(highest_votes)
+        day_actions.village_victim = village_vote.player if village_vote else None
+        game.process_day_actions(day_actions)
+        game.announce_todays_results()
+
+    async def play(self) -> Game:
+        game = self.game
+        game.start()
+        while not game.is_game_over():
+            day_actions = await self.play_night()
+            if game.is_game_over():
+                break
+            await self.play_day(day_actions)
+        game.end()
+        return game
+
+async def play_games(games: List[PvpGame]) -> List[Game]:
+    # thousands of live games share one event loop, each only wakes up when one of its players acts
+    return await asyncio.gather(*(game.play() for game in games))
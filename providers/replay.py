@@ -0,0 +1,109 @@
+from itertools import islice
+from typing import List, Optional, Set
+from logs.logger import suppressed_logging
+from providers.events import EVENT_FIELDS, EventLog, EventType, Potion, VoteKind
+from providers.objects import DayActions, DayResults, Game, NightActions, NightResults, Player, VoteTally
+
+def copy_roster(players: List[Player]) -> List[Player]:
+    # fresh players with the same ids, names and roles, all alive
+    return [Player(player.id, player.name, player.role) for player in players]
+
+def find_round_start(events: EventLog, night: int) -> int:
+    # number of events logged before the given night started.
+    # replaying exactly that many events leaves the game at a round boundary it can be resumed from
+    for index, event in enumerate(events):
+        if event.type == EventType.NightStarted and event.value == night:
+            return index
+    return len(events)
+
+def replay_game(players: List[Player], seed: int, events: EventLog, until: Optional[int] = None,
+                game_id: Optional[str] = None) -> Game:
+    # rebuilds the state of a game after its first `until` events without re-running any decision.
+    # the random generator is reseeded at every phase, so play resumed at a round boundary
+    # continues exactly like the original game did
+    game = Game(players, game_id, seed)
+    until = len(events) if until is None else min(until, len(events))
+    night_actions = NightActions()
+    day_actions = DayActions()
+    killed_players: List[Player] = []
+    open_votes: Set[int] = set()
+
+    with suppressed_logging():
+        for event in islice(events, until):
+            if event.type == EventType.GameStarted:
+                game.day = 1
+                game.night = 0
+            elif event.type == EventType.NightStarted:
+                game.night = event.value
+                game.reseed_phase_rng()
+                night_actions = NightActions()
+                killed_players = []
+            elif event.type == EventType.DayStarted:
+                game.day = event.value
+                game.reseed_phase_rng()
+                day_actions = DayActions()
+                killed_players = []
+            elif event.type == EventType.VoteStarted:
+                if event.value in open_votes:
+                    if event.value == VoteKind.Werewolves:
+                        game.werewolf_revotes += 1
+                    else:
+                        game.village_revotes += 1
+                open_votes.add(event.value)
+                if event.value == VoteKind.Werewolves:
+                    game.werewolf_tally = VoteTally()
+                else:
+                    game.village_tally = VoteTally()
+            elif event.type in (EventType.VoteCast, EventType.VoteRemoved):
+                tally = game.werewolf_tally if event.value == VoteKind.Werewolves else game.village_tally
+                voter, victim = game.get_player(event.actor), game.get_player(event.target)
+                if event.type == EventType.VoteCast:
+                    tally.add(voter, victim)
+                else:
+                    tally.remove(voter, victim)
+            elif event.type == EventType.VoteEnded:
+                open_votes.discard(event.value)
+                if event.value == VoteKind.Werewolves:
+                    game.werewolf_tally = None
+                else:
+                    game.village_tally = None
+            elif event.type == EventType.WerewolfVictimChosen:
+                night_actions.werewolf_victim = game.get_player(event.target)
+            elif event.type == EventType.BodyguardSaved:
+                night_actions.bodyguard_saved_player = game.get_player(event.target)
+            elif event.type == EventType.SeerResult:
+                night_actions.seer_investigated_player = game.get_player(event.target)
+                night_actions.did_seer_find_werewolf = bool(event.value)
+            elif event.type == EventType.WitchSaved:
+                night_actions.did_witch_save_werewolf_victim = bool(event.value)
+            elif event.type == EventType.WitchVictimChosen:
+                night_actions.witch_victim = game.get_player(event.target)
+            elif event.type == EventType.PotionUsed:
+                if event.value == Potion.Save:
+                    game.witch_save_potion_used = True
+                else:
+                    game.witch_kill_potion_used = True
+            elif event.type == EventType.PlayerKilled:
+                player = game.get_player(event.target)
+                game.mark_dead(player)
+                killed_players.append(player)
+            elif event.type == EventType.NightResolved:
+                night_results = NightResults(night_actions)
+                night_results.set_has_killed_werewolf_victim(bool(event.value & 1))
+                night_results.set_has_killed_witch_victim(bool(event.value & 2))
+                night_results.set_killed_players(killed_players)
+                game.last_night_results = night_results
+                killed_players = []
+            elif event.type == EventType.VillageVictimChosen:
+                day_actions.village_victim = game.get_player(event.target)
+            elif event.type == EventType.DayResolved:
+                day_results = DayResults(day_actions)
+                day_results.set_has_killed_village_victim(bool(event.value))
+                day_results.set_killed_players(killed_players)
+                game.last_day_results = day_results
+                killed_players = []
+            elif event.type == EventType.GameEnded:
+                game.is_game_over()
+
+    game.events.data.extend(events.data[:until * EVENT_FIELDS])
+    return game
@@ -0,0 +1,71 @@
+import random
+import threading
+from typing import Optional, Sequence, TypeVar
+
+T = TypeVar('T')
+
+class _SharedGenerator(object):
+    # a thread's Mersenne Twister (about 2.5 KB of state) and the game generator it is positioned at
+    __slots__ = ('generator', 'owner', 'seed', 'draws')
+
+    def __init__(self):
+        self.generator = random.Random()
+        self.owner: Optional['PhaseRandom'] = None
+        self.seed = 0
+        self.draws = 0
+
+_local = threading.local()
+
+class PhaseRandom(object):
+    # a game's generator, kept as its seed and the number of 32 bit words drawn since it was seeded.
+    # draws come from the thread's shared generator, which is seeded again and skips the words already
+    # drawn whenever another game drew from it in between. games reseed at every phase, so that's short.
+    # it draws exactly what random.Random(seed) would, so seeded games play the same either way
+    __slots__ = ('seed', 'draws')
+
+    def __init__(self, seed: int, draws: int = 0):
+        self.seed = seed
+        self.draws = draws
+
+    def __repr__(self):
+        return f'PhaseRandom({self.seed}, {self.draws})'
+
+    def reseed(self, seed: int):
+        self.seed = seed
+        self.draws = 0
+
+    def _position(self) -> _SharedGenerator:
+        try:
+            shared = _local.shared
+        except AttributeError:
+            shared = _local.shared = _SharedGenerator()
+        if shared.owner is not self or shared.draws != self.draws or shared.seed != self.seed:
+            shared.generator.seed(self.seed)
+            if self.draws:
+                shared.generator.getrandbits(32 * self.draws)
+            shared.owner = self
+            shared.seed = self.seed
+            shared.draws = self.draws
+        return shared
+
+    def getrandbits(self, k: int) -> int:
+        shared = self._position()
+        bits = shared.generator.getrandbits(k)
+        self.draws = shared.draws = self.draws + (k + 31) // 32
+        return bits
+
+    def choice(self, seq: Sequence[T]) -> T:
+        # random.Random.choice, which draws k bits until they are below n. it sits on the per vote hot path
+        n = len(seq)
+        if not n:
+            raise IndexError('Cannot choose from an empty sequence')
+        shared = self._position()
+        getrandbits = shared.generator.getrandbits
+        k = n.bit_length()
+        r = getrandbits(k)
+        draws = 1
+        while r >= n:
+            r = getrandbits(k)
+            draws += 1
+        self.draws = shared.draws = self.draws + draws * ((k + 31) // 32)
+        return seq[r]
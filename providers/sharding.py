@@ -0,0 +1,71 @@
+from bisect import bisect
+from hashlib import blake2b
+from typing import Dict, List, Optional, Tuple
+from providers.store import StateStore
+
+# games spread over several stores by consistent hashing of their id. every shard owns many points of a
+# hash ring and a game belongs to the shard of the first point after its hash, so every container maps a
+# game to the same shard without asking anyone, and adding a shard to n others only moves about 1/(n+1)
+# of the games, all of them to the new shard
+DEFAULT_VIRTUAL_NODES = 128
+
+def _hash(key: str) -> int:
+    return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+class HashRing(object):
+    def __init__(self, nodes: Optional[List[str]] = None, virtual_nodes: int = DEFAULT_VIRTUAL_NODES):
+        if virtual_nodes < 1:
+            raise ValueError("virtual_nodes must be positive")
+        self.virtual_nodes = virtual_nodes
+        # sorted (point, node), with the points alone for bisect
+        self.ring: List[Tuple[int, str]] = []
+        self.points: List[int] = []
+        for node in nodes or []:
+            self.add_node(node)
+
+    def __len__(self):
+        return len(self.ring) // self.virtual_nodes
+
+    def add_node(self, node: str):
+        if any(owner == node for _, owner in self.ring):
+            raise ValueError(f"node {node} is already on the ring")
+        self.ring.extend((_hash(f'{node}#{replica}'), node) for replica in range(self.virtual_nodes))
+        self.ring.sort()
+        self.points = [point for point, _ in self.ring]
+
+    def remove_node(self, node: str):
+        self.ring = [(point, owner) for point, owner in self.ring if owner != node]
+        self.points = [point for point, _ in self.ring]
+
+    def get_node(self, key: str) -> str:
+        if not self.ring:
+            raise ValueError("the ring has no nodes")
+        # past the last point the ring wraps around to the first one
+        index = bisect(self.points, _hash(key))
+        return self.ring[index if index < len(self.ring) else 0][1]
+
+class ShardedStateStore(StateStore):
+    # the shards are named by their store urls, so containers configured alike agree on where every game is.
+    # a game is only ever read and written on its own shard, which is what makes compare and swap on the
+    # shard enough for the whole store
+    def __init__(self, shards: Dict[str, StateStore], virtual_nodes: int = DEFAULT_VIRTUAL_NODES):
+        super().__init__()
+        if not shards:
+            raise ValueError("a sharded store needs at least one shard")
+        self.shards = shards
+        self.ring = HashRing(list(shards), virtual_nodes)
+
+    def get_shard(self, game_id: str) -> StateStore:
+        return self.shards[self.ring.get_node(game_id)]
+
+    def get_versioned(self, game_id: str) -> Tuple[Optional[bytes], int]:
+        return self.get_shard(game_id).get_versioned(game_id)
+
+    def compare_and_swap(self, game_id: str, version: int, snapshot: bytes) -> Optional[int]:
+        return self.get_shard(game_id).compare_and_swap(game_id, version, snapshot)
+
+    def put(self, game_id: str, snapshot: bytes) -> int:
+        return self.get_shard(game_id).put(game_id, snapshot)
+
+    def delete(self, game_id: str):
+        self.get_shard(game_id).delete(game_id)
@@ -0,0 +1,97 @@
+from typing import Dict
+from providers.objects import Game
+
+def derive_game_seed(base_seed: int, index: int) -> int:
+    # the n-th game of a seeded run always gets the same seed, whichever worker plays it
+    return (base_seed << 32) | index
+
+class SimulationStats(object):
+    def __init__(self):
+        self.games = 0
+        self.wins: Dict[str, int] = {}
+        # rounds are kept as a histogram so partial results can be merged cheaply
+        self.rounds: Dict[int, int] = {}
+        self.deaths: Dict[str, int] = {}
+        self.death_order_total: Dict[str, int] = {}
+        self.first_deaths: Dict[str, int] = {}
+        self.role_counts: Dict[str, int] = {}
+        self.werewolf_revotes = 0
+        self.village_revotes = 0
+
+    def add_game(self, game: Game):
+        self.games += 1
+        side = game.winning_side or 'Unfinished'
+        self.wins[side] = self.wins.get(side, 0) + 1
+        self.rounds[game.night] = self.rounds.get(game.night, 0) + 1
+        self.werewolf_revotes += game.werewolf_revotes
+        self.village_revotes += game.village_revotes
+
+        for player in game.players:
+            role = player.role.name
+            self.role_counts[role] = self.role_counts.get(role, 0) + 1
+
+        for order, player in enumerate(game.players_dead, start=1):
+            role = player.role.name
+            self.deaths[role] = self.deaths.get(role, 0) + 1
+            self.death_order_total[role] = self.death_order_total.get(role, 0) + order
+            if order == 1:
+                self.first_deaths[role] = self.first_deaths.get(role, 0) + 1
+
+    def merge(self, other: 'SimulationStats'):
+        self.games += other.games
+        self.werewolf_revotes += other.werewolf_revotes
+        self.village_revotes += other.village_revotes
+        for mine, theirs in [(self.wins, other.wins), (self.rounds, other.rounds), (self.deaths, other.deaths),
+                             (self.death_order_total, other.death_order_total), (self.first_deaths, other.first_deaths),
+                             (self.role_counts, other.role_counts)]:
+            for key, value in theirs.items():
+                mine[key] = mine.get(key, 0) + value
+        return self
+
+    def get_rounds_percentile(self, percentile: float) -> int:
+        if self.games == 0:
+            return 0
+        # nearest-rank percentile over the rounds histogram
+        rank = max(1, -(-int(percentile * self.games) // 100))
+        seen = 0
+        for rounds in sorted(self.rounds):
+            seen += self.rounds[rounds]
+            if seen >= rank:
+                return rounds
+        return max(self.rounds)
+
+    def get_mean_rounds(self) -> float:
+        if self.games == 0:
+            return 0.0
+        return sum(rounds * count for rounds, count in self.rounds.items()) / self.games
+
+    def get_death_order(self) -> Dict[str, Dict[str, float]]:
+        death_order = {}
+        for role, count in self.role_counts.items():
+            deaths = self.deaths.get(role, 0)
+            death_order[role] = {
+                "death_rate": deaths / count,
+                "mean_death_order": self.death_order_total.get(role, 0) / deaths if deaths else None,
+                "first_death_rate": self.first_deaths.get(role, 0) / self.games,
+            }
+        return death_order
+
+    def toJson(self):
+        return {
+            "games": self.games,
+            "win_rate": {side: wins / self.games for side, wins in self.wins.items()} if self.games else {},
+            "rounds": {
+                "mean": self.get_mean_rounds(),
+                "p50": self.get_rounds_percentile(50),
+                "p90": self.get_rounds_percentile(90),
+                "p99": self.get_rounds_percentile(99),
+                "max": max(self.rounds) if self.rounds else 0,
+            },
+            "death_order": self.get_death_order(),
+            "tie_revotes": {
+                "werewolves": self.werewolf_revotes,
+                "village": self.village_revotes,
+                "werewolves_per_game": self.werewolf_revotes / self.games if self.games else 0,
+                "village_per_game": self.village_revotes / self.games if self.games else 0,
+            },
+        }
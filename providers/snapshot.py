@@ -0,0 +1,258 @@
+import math
+import struct
+import sys
+from array import array
+from datetime import datetime
+from typing import Callable, List, Optional
+from providers.events import EventLog
+from providers.objects import DayActions, DayResults, Game, NightActions, NightResults, Player, ROLES, VoteTally
+from providers.rng import PhaseRandom
+
+# binary layout, little endian:
+#   header    magic, version
+#   game      game id, seed, day, night, revotes, potions, winning side, start/end time
+#   roster    the player ids, roles, names and alive mask as one column each, then the order players died in
+#   results   last night and last day, with the players they killed
+#   votes     the current werewolf and village votes as (voter, target) pairs
+#   rng       the generator's seed and the words drawn since, so a game saved mid phase resumes exactly
+#   events    the raw event log
+MAGIC = b'WWS'
+VERSION = 2
+SNAPSHOT_ROLES = ('Villager', 'Werewolf', 'Seer', 'Bodyguard', 'Witch')
+ROLE_CODES = {name: code for code, name in enumerate(SNAPSHOT_ROLES)}
+WINNING_SIDES = (None, 'Villagers', 'Werewolves')
+NO_PLAYER = -1
+
+_HEADER = struct.Struct('<3sB')
+_SIZE = struct.Struct('<I')
+_GAME = struct.Struct('<IIIIBBdd')
+_NIGHT = struct.Struct('<iiiiB')
+_DAY = struct.Struct('<iB')
+_DRAWS = struct.Struct('<Q')
+
+class SnapshotError(ValueError):
+    pass
+
+def _pack_bytes(parts: List[bytes], data: bytes):
+    parts.append(_SIZE.pack(len(data)))
+    parts.append(data)
+
+def _pack_ids(parts: List[bytes], players: Optional[List[Player]]):
+    ids = array('i', [player.id for player in players or []])
+    if sys.byteorder != 'little':
+        ids.byteswap()
+    _pack_bytes(parts, ids.tobytes())
+
+def _player_id(player: Optional[Player]) -> int:
+    return NO_PLAYER if player is None else player.id
+
+def _pack_int(parts: List[bytes], value: int):
+    _pack_bytes(parts, value.to_bytes((value.bit_length() + 8) // 8, 'little', signed=True))
+
+def _timestamp(time: Optional[datetime]) -> float:
+    return math.nan if time is None else time.timestamp()
+
+def _pack_tally(parts: List[bytes], tally: Optional[VoteTally]):
+    if tally is None:
+        parts.append(b'\x00')
+        return
+    parts.append(b'\x01')
+    # votes are written grouped by candidate in first vote order, so replaying them keeps the tie order
+    order = {vote.player.id: vote.order for vote in tally.candidates.values()}
+    pairs = sorted(tally.targets.items(), key=lambda pair: order[pair[1].id])
+    values = array('i', [value for voter_id, target in pairs for value in (voter_id, target.id)])
+    if sys.byteorder != 'little':
+        values.byteswap()
+    _pack_bytes(parts, values.tobytes())
+
+def snapshot_game(game: Game) -> bytes:
+    parts: List[bytes] = [_HEADER.pack(MAGIC, VERSION)]
+    _pack_bytes(parts, game.game_id.encode())
+    _pack_int(parts, game.seed)
+    potions = int(game.witch_save_potion_used) | int(game.witch_kill_potion_used) << 1
+    parts.append(_GAME.pack(game.day, game.night, game.werewolf_revotes, game.village_revotes, potions,
+                            WINNING_SIDES.index(game.winning_side), _timestamp(game.start_time),
+                            _timestamp(game.end_time)))
+
+    players = game.players
+    _pack_ids(parts, players)
+    parts.append(bytes([ROLE_CODES[player.role.name] for player in players]))
+    _pack_bytes(parts, '\x00'.join([player.name for player in players]).encode())
+    parts.append(bytes(game.alive_mask))
+    _pack_ids(parts, game.players_dead)
+    _pack_ids(parts, game.winners)
+
+    night_results = game.last_night_results
+    if night_results is None:
+        parts.append(b'\x00')
+    else:
+        flags = int(night_results.did_seer_find_werewolf) | int(night_results.did_witch_save_werewolf_victim) << 1 | \
+            int(night_results.has_killed_werewolf_victim) << 2 | int(night_results.has_killed_witch_victim) << 3
+        parts.append(b'\x01')
+        parts.append(_NIGHT.pack(_player_id(night_results.werewolf_victim), _player_id(night_results.witch_victim),
+                                 _player_id(night_results.bodyguard_saved_player),
+                                 _player_id(night_results.seer_investigated_player), flags))
+        _pack_ids(parts, night_results.killed_players)
+    day_results = game.last_day_results
+    if day_results is None:
+        parts.append(b'\x00')
+    else:
+        parts.append(b'\x01')
+        parts.append(_DAY.pack(_player_id(day_results.village_victim), int(day_results.has_killed_village_victim)))
+        _pack_ids(parts, day_results.killed_players)
+
+    _pack_tally(parts, game.werewolf_tally)
+    _pack_tally(parts, game.village_tally)
+
+    if game._rng is None:
+        parts.append(b'\x00')
+    else:
+        parts.append(b'\x01')
+        _pack_int(parts, game._rng.seed)
+        parts.append(_DRAWS.pack(game._rng.draws))
+
+    events = game.events.data
+    if sys.byteorder != 'little':
+        events = array('i', events)
+        events.byteswap()
+    _pack_bytes(parts, events.tobytes())
+    return b''.join(parts)
+
+class _Reader(object):
+    __slots__ = ('data', 'offset')
+
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, format: struct.Struct) -> tuple:
+        values = format.unpack_from(self.data, self.offset)
+        self.offset += format.size
+        return values
+
+    def read(self, size: int) -> bytes:
+        if self.offset + size > len(self.data):
+            raise SnapshotError("snapshot is truncated")
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return chunk.tobytes()
+
+    def read_flag(self) -> bool:
+        return self.read(1) == b'\x01'
+
+    def read_bytes(self) -> bytes:
+        size, = self.unpack(_SIZE)
+        return self.read(size)
+
+    def read_int(self) -> int:
+        return int.from_bytes(self.read_bytes(), 'little', signed=True)
+
+    def read_ints(self) -> 'array[int]':
+        values = array('i')
+        values.frombytes(self.read_bytes())
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values
+
+def _from_timestamp(timestamp: float) -> Optional[datetime]:
+    return None if math.isnan(timestamp) else datetime.fromtimestamp(timestamp)
+
+def restore_game(data: bytes) -> Game:
+    reader = _Reader(data)
+    try:
+        magic, version = reader.unpack(_HEADER)
+    except struct.error:
+        raise SnapshotError("not a game snapshot")
+    if magic != MAGIC:
+        raise SnapshotError("not a game snapshot")
+    if version != VERSION:
+        raise SnapshotError(f"unsupported snapshot version {version}")
+
+    try:
+        return _read_game(reader)
+    except SnapshotError:
+        raise
+    except (struct.error, IndexError, KeyError, AttributeError, ValueError, OverflowError) as error:
+        raise SnapshotError(f"corrupt snapshot: {error}")
+
+def _read_game(reader: _Reader) -> Game:
+    game_id = reader.read_bytes().decode()
+    seed = reader.read_int()
+    day, night, werewolf_revotes, village_revotes, potions, winning_side, start_time, end_time = reader.unpack(_GAME)
+
+    ids = reader.read_ints()
+    roles = [ROLES[SNAPSHOT_ROLES[code]] for code in reader.read(len(ids))]
+    names = reader.read_bytes().decode().split('\x00')
+    players = [Player(player_id, name, role) for player_id, name, role in zip(ids, names, roles)]
+    alive_mask = reader.read(len(ids))
+
+    # everyone starts alive and dies again in the order they died
+    game = Game(players, game_id, seed)
+    players_by_id = {player.id: player for player in players}
+
+    def get_player(player_id: int) -> Optional[Player]:
+        if player_id == NO_PLAYER:
+            return None
+        if player_id not in players_by_id:
+            raise SnapshotError(f"corrupt snapshot: unknown player {player_id}")
+        return players_by_id[player_id]
+    game.day = day
+    game.night = night
+    game.werewolf_revotes = werewolf_revotes
+    game.village_revotes = village_revotes
+    game.witch_save_potion_used = bool(potions & 1)
+    game.witch_kill_potion_used = bool(potions & 2)
+    game.winning_side = WINNING_SIDES[winning_side]
+    game.start_time = _from_timestamp(start_time)
+    game.end_time = _from_timestamp(end_time)
+    for player_id in reader.read_ints():
+        player = get_player(player_id)
+        if player is None or not player.is_alive:
+            raise SnapshotError(f"corrupt snapshot: player {player_id} died twice")
+        game.mark_dead(player)
+    if bytes(game.alive_mask) != bytes(alive_mask):
+        raise SnapshotError("corrupt snapshot: the alive players don't match the dead ones")
+    game.winners = [get_player(player_id) for player_id in reader.read_ints()]
+
+    if reader.read_flag():
+        werewolf_victim, witch_victim, bodyguard_saved_player, seer_investigated_player, flags = reader.unpack(_NIGHT)
+        night_actions = NightActions()
+        night_actions.werewolf_victim = get_player(werewolf_victim)
+        night_actions.witch_victim = get_player(witch_victim)
+        night_actions.bodyguard_saved_player = get_player(bodyguard_saved_player)
+        night_actions.seer_investigated_player = get_player(seer_investigated_player)
+        night_actions.did_seer_find_werewolf = bool(flags & 1)
+        night_actions.did_witch_save_werewolf_victim = bool(flags & 2)
+        night_results = NightResults(night_actions)
+        night_results.set_has_killed_werewolf_victim(bool(flags & 4))
+        night_results.set_has_killed_witch_victim(bool(flags & 8))
+        night_results.set_killed_players([get_player(player_id) for player_id in reader.read_ints()])
+        game.last_night_results = night_results
+    if reader.read_flag():
+        village_victim, has_killed = reader.unpack(_DAY)
+        day_actions = DayActions()
+        day_actions.village_victim = get_player(village_victim)
+        day_results = DayResults(day_actions)
+        day_results.set_has_killed_village_victim(bool(has_killed))
+        day_results.set_killed_players([get_player(player_id) for player_id in reader.read_ints()])
+        game.last_day_results = day_results
+
+    game.werewolf_tally = _read_tally(reader, get_player)
+    game.village_tally = _read_tally(reader, get_player)
+
+    if reader.read_flag():
+        rng_seed = reader.read_int()
+        draws, = reader.unpack(_DRAWS)
+        game._rng = PhaseRandom(rng_seed, draws)
+
+    game.events = EventLog(reader.read_ints())
+    return game
+
+def _read_tally(reader: _Reader, get_player: Callable[[int], Optional[Player]]) -> Optional[VoteTally]:
+    if not reader.read_flag():
+        return None
+    tally = VoteTally()
+    values = reader.read_ints()
+    for voter_id, target_id in zip(values[::2], values[1::2]):
+        tally.add(get_player(voter_id), get_player(target_id))
+    return tally
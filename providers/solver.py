@@ -0,0 +1,394 @@
+from functools import lru_cache
+from math import comb, factorial, sqrt
+from typing import Dict, Iterator, List, Optional, Tuple
+from providers.lobby import RoleComposition
+from providers.voting import DEFAULT_VOTE_RULES, TIE_BREAK_POLICIES, VoteRules
+
+# exact P(villagers win) when every player follows the random policies of providers.policies.
+# players of the same role are interchangeable, so a game between two nights is only
+#   counts     alive players per role, in CLASSES order
+#   potions    whether the witch still has her save and kill potions
+#   saved      the role of the player the bodyguard saved last night, NO_PLAYER when nobody alive
+# and the rounds are played on distributions over these keys instead of on players
+WEREWOLF, VILLAGER, SEER, BODYGUARD, WITCH = range(5)
+CLASSES = ('Werewolf', 'Villager', 'Seer', 'Bodyguard', 'Witch')
+NO_PLAYER = -1
+VICTIM = -2
+SUPPORTED_TIE_BREAKS = ('random', 'no_kill')
+DEFAULT_MEMO_SIZE = 1 << 16
+# the revotes stop being played out once another one moves no probability by more than this
+CONVERGENCE = 1e-15
+# the keys grow with werewolves times villagers. solved cold, 11 players take about 80 ms, 20 players
+# 0.4-0.6 s, 24 players about 1 s and 30 players 2.3 s, so the solver stops at 20. warm containers answer
+# a composition they solved in tens of microseconds, and share endgames between compositions
+MAX_EXACT_PLAYERS = 20
+VILLAGER_ROLES = (VILLAGER, SEER, BODYGUARD, WITCH)
+# the witch can't poison herself
+POISONABLE_ROLES = (WEREWOLF, VILLAGER, SEER, BODYGUARD)
+
+Counts = Tuple[int, ...]
+
+def _split(n: int, k: int) -> List[Tuple[int, int, float]]:
+    # (highest count, candidates with it, probability) for n votes spread uniformly over k candidates.
+    # P(max = m, t candidates at m) = C(k, t) [x^(n - tm)] (sum_{c<m} x^c/c!)^(k-t) / m!^t * n!/k^n
+    if n == 0:
+        return [(0, k, 1.0)]
+    return _split_cached(n, k)
+
+@lru_cache(maxsize=DEFAULT_MEMO_SIZE)
+def _split_cached(n: int, k: int) -> List[Tuple[int, int, float]]:
+    scale = factorial(n) / k ** n
+    outcomes = []
+    for highest in range(1, n + 1):
+        # once the votes left to the others are fewer than highest, the cap c < highest never binds and
+        # the coefficient is the one of e^((k - tied) x), so the powers are only built for highest <= n / 2
+        rest_limit = n - highest
+        powers = []
+        if 2 * highest <= n:
+            below = [1 / factorial(c) for c in range(highest)]
+            # powers[j] is (sum_{c<highest} x^c/c!)^j truncated after x^rest_limit
+            powers = [[1.0] + [0.0] * rest_limit]
+            for _ in range(k - 1):
+                previous = powers[-1]
+                power = [0.0] * (rest_limit + 1)
+                for degree, coefficient in enumerate(previous):
+                    if coefficient:
+                        for c, weight in enumerate(below[:rest_limit + 1 - degree]):
+                            power[degree + c] += coefficient * weight
+                powers.append(power)
+        for tied in range(1, min(k, n // highest) + 1):
+            rest = n - tied * highest
+            if rest < highest:
+                coefficient = (k - tied) ** rest / factorial(rest)
+            else:
+                coefficient = powers[k - tied][rest]
+            probability = comb(k, tied) * coefficient / factorial(highest) ** tied * scale
+            if probability > 0:
+                outcomes.append((highest, tied, probability))
+    return outcomes
+
+@lru_cache(maxsize=DEFAULT_MEMO_SIZE)
+def _get_below(n: int, k: int) -> List[float]:
+    # below[m] is P(highest count < m) of _split(n, k), for m up to n + 1
+    at = [0.0] * (n + 1)
+    for highest, _, probability in _split(n, k):
+        at[highest] += probability
+    below = [0.0]
+    for probability in at:
+        below.append(below[-1] + probability)
+    return below
+
+@lru_cache(maxsize=DEFAULT_MEMO_SIZE)
+def _tally(villager_voters: int, werewolf_voters: int, werewolf_candidates: int,
+           villager_candidates: int) -> List[Tuple[int, int, float]]:
+    # (werewolves tied at the top, villagers tied at the top, probability) of one vote, like
+    # handler._collect_village_votes: villagers pick any suspect, werewolves only villager suspects
+    # unless only werewolves are suspected. the werewolf vote is the same with no villager voters
+    candidates = werewolf_candidates + villager_candidates
+    if werewolf_candidates == 0 or villager_candidates == 0:
+        return [(tied if werewolf_candidates else 0, tied if villager_candidates else 0, probability)
+                for _, tied, probability in _split(villager_voters + werewolf_voters, candidates)]
+
+    # villagers' votes split binomially between the two sides, werewolves' votes all go to villagers.
+    # a side only has the top candidates when the other side's highest count is lower or equal
+    share = villager_candidates / candidates
+    merged: Dict[Tuple[int, int], float] = {}
+    get = merged.get
+    for to_villagers in range(villager_voters + 1):
+        weight = comb(villager_voters, to_villagers) * share ** to_villagers * \
+            (1 - share) ** (villager_voters - to_villagers)
+        werewolf_votes = villager_voters - to_villagers
+        villager_votes = to_villagers + werewolf_voters
+        werewolf_below = _get_below(werewolf_votes, werewolf_candidates)
+        villager_below = _get_below(villager_votes, villager_candidates)
+        werewolf_limit, villager_limit = len(werewolf_below), len(villager_below)
+        villager_at: Dict[int, List[Tuple[int, float]]] = {}
+        for highest, tied, probability in _split(villager_votes, villager_candidates):
+            villager_at.setdefault(highest, []).append((tied, weight * probability))
+            key = (0, tied)
+            below = werewolf_below[highest] if highest < werewolf_limit else 1.0
+            merged[key] = get(key, 0.0) + weight * probability * below
+        for highest, tied, probability in _split(werewolf_votes, werewolf_candidates):
+            key = (tied, 0)
+            below = villager_below[highest] if highest < villager_limit else 1.0
+            merged[key] = get(key, 0.0) + weight * probability * below
+            for villager_tied, villager_probability in villager_at.get(highest, ()):
+                key = (tied, villager_tied)
+                merged[key] = get(key, 0.0) + probability * villager_probability
+    return [(werewolves_tied, villagers_tied, probability)
+            for (werewolves_tied, villagers_tied), probability in merged.items()]
+
+@lru_cache(maxsize=DEFAULT_MEMO_SIZE)
+def _vote(villager_voters: int, werewolf_voters: int, werewolf_candidates: int, villager_candidates: int,
+          revotes: int, no_kill: bool) -> Tuple[float, float]:
+    # (P(a werewolf is voted out), P(a villager is voted out)) of a vote and its revotes.
+    # a revote is between the candidates tied at the top, so the chain is solved from the last revote back
+    # to the first over every (werewolves, villagers) tie it can reach, in a loop instead of one call per
+    # revote. once a revote changes no probability by more than CONVERGENCE the ones before it won't either
+    tallies = {}
+    pending = [(werewolf_candidates, villager_candidates)]
+    while pending:
+        candidates = pending.pop()
+        if candidates not in tallies:
+            tallies[candidates] = _tally(villager_voters, werewolf_voters, *candidates)
+            if revotes > 0:
+                pending.extend((werewolves_tied, villagers_tied)
+                               for werewolves_tied, villagers_tied, _ in tallies[candidates]
+                               if werewolves_tied + villagers_tied > 1)
+
+    outcomes: Dict[Tuple[int, int], Tuple[float, float]] = {}
+    for revote in range(revotes + 1):
+        previous = outcomes
+        outcomes = {}
+        for candidates, tally in tallies.items():
+            werewolf_out = villager_out = 0.0
+            for werewolves_tied, villagers_tied, probability in tally:
+                tied = werewolves_tied + villagers_tied
+                if tied == 1:
+                    werewolf_out += probability * werewolves_tied
+                    villager_out += probability * villagers_tied
+                elif revote > 0:
+                    werewolf_revote, villager_revote = previous[(werewolves_tied, villagers_tied)]
+                    werewolf_out += probability * werewolf_revote
+                    villager_out += probability * villager_revote
+                elif not no_kill:
+                    werewolf_out += probability * werewolves_tied / tied
+                    villager_out += probability * villagers_tied / tied
+            outcomes[candidates] = (werewolf_out, villager_out)
+        if revote > 0 and all(abs(outcome[0] - previous[candidates][0]) <= CONVERGENCE and
+                              abs(outcome[1] - previous[candidates][1]) <= CONVERGENCE
+                              for candidates, outcome in outcomes.items()):
+            break
+    return outcomes[(werewolf_candidates, villager_candidates)]
+
+class WinProbabilitySolver(object):
+    # memoizes every key it solves, so the compositions of a balance sweep share their endgames
+    def __init__(self, rules: VoteRules = DEFAULT_VOTE_RULES, memo_size: int = DEFAULT_MEMO_SIZE):
+        if rules.tie_break.name not in SUPPORTED_TIE_BREAKS:
+            raise ValueError(f"the exact solver supports the {', '.join(SUPPORTED_TIE_BREAKS)} tie breaks")
+        self.rules = rules
+        self.no_kill = rules.tie_break.name == 'no_kill'
+        self.memo_size = memo_size
+        self.memo: Dict[Tuple[Counts, int], Dict[int, float]] = {}
+        self.dawns: Dict[Tuple[Counts, int, int], float] = {}
+
+    def solve(self, composition: RoleComposition) -> float:
+        counts = [0] * len(CLASSES)
+        for name, count in composition.counts.items():
+            if name not in CLASSES:
+                raise ValueError(f"the exact solver doesn't know the {name} role")
+            counts[CLASSES.index(name)] = count
+        if sum(counts) > MAX_EXACT_PLAYERS:
+            raise ValueError(f"the exact solver is limited to {MAX_EXACT_PLAYERS} players")
+        for role in (SEER, BODYGUARD, WITCH):
+            if counts[role] > 1:
+                raise ValueError(f"a game can't have more than one {CLASSES[role]}")
+        return self._get_value(tuple(counts), 0b11 if counts[WITCH] else 0, NO_PLAYER)
+
+    def _get_value(self, counts: Counts, potions: int, saved: int) -> float:
+        # P(villagers win) from the start of a night
+        winner = self._get_winner(counts)
+        if winner is not None:
+            return winner
+        if not counts[WITCH]:
+            potions = 0
+        key = (counts, potions)
+        values = self.memo.get(key)
+        if values is None:
+            values = self._remember(self.memo, key, self._solve_group(counts, potions))
+        return values[saved]
+
+    def _get_dawn_value(self, counts: Counts, potions: int, saved: int) -> float:
+        # P(villagers win) from the start of a day, after a night that changed the counts or potions
+        winner = self._get_winner(counts)
+        if winner is not None:
+            return winner
+        key = (counts, potions, saved)
+        value = self.dawns.get(key)
+        if value is None:
+            value = sum(probability * self._get_value(day_counts, potions, day_saved)
+                        for probability, day_counts, day_saved in self._play_day(counts, saved))
+            self._remember(self.dawns, key, value)
+        return value
+
+    def _remember(self, memo: dict, key, value):
+        # the oldest entry makes room, it is solved again if it is ever needed
+        if len(memo) >= self.memo_size:
+            memo.pop(next(iter(memo)))
+        memo[key] = value
+        return value
+
+    @staticmethod
+    def _get_winner(counts: Counts) -> Optional[float]:
+        # Game.is_game_over: villagers win once no werewolf is alive, werewolves once they outnumber the rest
+        werewolves = counts[WEREWOLF]
+        if werewolves == 0:
+            return 1.0
+        if werewolves > sum(counts) - werewolves:
+            return 0.0
+        return None
+
+    def _solve_group(self, counts: Counts, potions: int) -> Dict[int, float]:
+        # rounds where nobody dies and no potion is used come back to the same counts and potions,
+        # with maybe another saved player, so the keys of a group are solved together as a linear system.
+        # the keys only differ in whom the bodyguard may protect, so each protected role's night is played once
+        saved_players = [NO_PLAYER]
+        if counts[BODYGUARD]:
+            saved_players += [role for role in range(len(CLASSES)) if counts[role]]
+        index = {saved: position for position, saved in enumerate(saved_players)}
+        size = len(saved_players)
+        matrix = [[float(row == column) for column in range(size)] + [0.0] for row in range(size)]
+        guarded_rounds: Dict[int, Tuple[float, Dict[int, float]]] = {}
+        for row, saved in enumerate(saved_players):
+            for guard_probability, guarded in self._get_guards(counts, saved):
+                if guarded not in guarded_rounds:
+                    guarded_rounds[guarded] = self._play_guarded_round(counts, potions, guarded)
+                value, loops = guarded_rounds[guarded]
+                matrix[row][size] += guard_probability * value
+                for next_saved, probability in loops.items():
+                    matrix[row][index[next_saved]] -= guard_probability * probability
+        return dict(zip(saved_players, _solve_linear(matrix)))
+
+    def _play_guarded_round(self, counts: Counts, potions: int, guarded: int) -> Tuple[float, Dict[int, float]]:
+        # (P(villagers win) through rounds that leave the group, P(coming back) per saved player)
+        value = 0.0
+        loops: Dict[int, float] = {}
+        for probability, night_counts, night_potions in self._play_night(counts, potions, guarded):
+            if night_counts != counts or night_potions != potions:
+                value += probability * self._get_dawn_value(night_counts, night_potions, guarded)
+                continue
+            for day_probability, day_counts, day_saved in self._play_day(night_counts, guarded):
+                if day_counts == counts:
+                    loops[day_saved] = loops.get(day_saved, 0.0) + probability * day_probability
+                else:
+                    value += probability * day_probability * self._get_value(day_counts, potions, day_saved)
+        return value, loops
+
+    @staticmethod
+    def _get_guards(counts: Counts, saved: int) -> List[Tuple[float, int]]:
+        # the bodyguard protects anyone alive but last night's player
+        if not counts[BODYGUARD]:
+            return [(1.0, NO_PLAYER)]
+        guardable = [count - (role == saved) for role, count in enumerate(counts)]
+        total = sum(guardable)
+        return [(count / total, role) for role, count in enumerate(guardable) if count]
+
+    def _play_night(self, counts: Counts, potions: int, guarded: int) -> List[Tuple[float, Counts, int]]:
+        # handler._play_night once the bodyguard protected a player of the guarded role: werewolves vote,
+        # the witch flips a coin for each potion she still has. only whether the werewolves' victim and
+        # the witch's one are the guarded player, or each other, matters, not who they are
+        werewolves = counts[WEREWOLF]
+        alive = sum(counts)
+        villagers = alive - werewolves
+        _, werewolves_kill = _vote(0, werewolves, 0, villagers, self.rules.max_revotes, self.no_kill)
+        can_save = counts[WITCH] and potions & 1
+        can_poison = counts[WITCH] and potions & 2
+        saves = [(0.5, True), (0.5, False)] if can_save else [(1.0, False)]
+        poison_share = 0.5 / (alive - 1) if can_poison else 0.0
+
+        killed: Dict[Tuple[int, int], Counts] = {}
+
+        def counts_after(first: int, second: int) -> Counts:
+            after = killed.get((first, second))
+            if after is None:
+                after = list(counts)
+                for role in (first, second):
+                    if role != NO_PLAYER:
+                        after[role] -= 1
+                after = killed[(first, second)] = tuple(after)
+            return after
+
+        # (probability, role of the werewolves' victim, whether the victim is the guarded player)
+        victims = [(1 - werewolves_kill, NO_PLAYER, False)] if werewolves_kill < 1 else []
+        for role in VILLAGER_ROLES:
+            others = counts[role] - (role == guarded)
+            if others:
+                victims.append((werewolves_kill * others / villagers, role, False))
+        if guarded in VILLAGER_ROLES:
+            victims.append((werewolves_kill / villagers, guarded, True))
+
+        outcomes: Dict[Tuple[Counts, int], float] = {}
+        for victim_probability, victim, victim_guarded in victims:
+            victim_exposed = victim != NO_PLAYER and not victim_guarded
+            # (probability, role the poison kills or NO_PLAYER, potion used), poisoning the werewolves'
+            # victim kills them even when the witch saved them, but only once
+            poisons = [(1 - (alive - 1) * poison_share, NO_PLAYER, False)]
+            if can_poison:
+                if guarded not in (NO_PLAYER, WITCH):
+                    poisons.append((poison_share, NO_PLAYER, True))
+                if victim_exposed and victim != WITCH:
+                    poisons.append((poison_share, VICTIM, True))
+                for role in POISONABLE_ROLES:
+                    others = counts[role] - (role == guarded) - (victim_exposed and role == victim)
+                    if others:
+                        poisons.append((poison_share * others, role, True))
+
+            for save_probability, witch_saves in saves:
+                victim_dies = victim_exposed and not witch_saves
+                probability = victim_probability * save_probability
+                for poison_probability, poisoned, poison_used in poisons:
+                    if victim_dies or poisoned == VICTIM:
+                        next_counts = counts_after(victim, poisoned if poisoned >= 0 else NO_PLAYER)
+                    else:
+                        next_counts = counts_after(poisoned if poisoned >= 0 else NO_PLAYER, NO_PLAYER)
+                    next_potions = potions & ~(int(witch_saves) | int(poison_used) << 1) if next_counts[WITCH] else 0
+                    key = (next_counts, next_potions)
+                    outcomes[key] = outcomes.get(key, 0.0) + probability * poison_probability
+        return [(probability, *key) for key, probability in outcomes.items()]
+
+    def _play_day(self, counts: Counts, saved: int) -> Iterator[Tuple[float, Counts, int]]:
+        # handler._play_day: the village votes one player out, any player of a role as likely as the others
+        werewolves = counts[WEREWOLF]
+        villagers = sum(counts) - werewolves
+        if not counts[BODYGUARD]:
+            saved = NO_PLAYER
+        werewolf_out, villager_out = _vote(villagers, werewolves, werewolves, villagers, self.rules.max_revotes,
+                                           self.no_kill)
+        if werewolf_out + villager_out < 1:
+            yield 1 - werewolf_out - villager_out, counts, saved
+        for role, count in enumerate(counts):
+            if not count:
+                continue
+            probability = werewolf_out if role == WEREWOLF else villager_out * count / villagers
+            next_counts = counts[:role] + (count - 1,) + counts[role + 1:]
+            next_saved = saved if next_counts[BODYGUARD] else NO_PLAYER
+            if role == saved:
+                # the saved player is the one voted out one time in count
+                yield probability / count, next_counts, NO_PLAYER
+                probability -= probability / count
+                if next_counts[role] == 0:
+                    continue
+            yield probability, next_counts, next_saved
+
+def _solve_linear(matrix: List[List[float]]) -> List[float]:
+    # gauss-jordan on an augmented matrix, the systems have at most one row per role plus one
+    size = len(matrix)
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda row: abs(matrix[row][column]))
+        matrix[column], matrix[pivot] = matrix[pivot], matrix[column]
+        divisor = matrix[column][column]
+        matrix[column] = [value / divisor for value in matrix[column]]
+        for row in range(size):
+            if row != column and matrix[row][column]:
+                factor = matrix[row][column]
+                matrix[row] = [value - factor * pivot_value for value, pivot_value in zip(matrix[row], matrix[column])]
+    return [row[size] for row in matrix]
+
+@lru_cache(maxsize=len(SUPPORTED_TIE_BREAKS) * 4)
+def _get_solver(max_revotes: int, tie_break: str) -> WinProbabilitySolver:
+    # one solver per rules, so warm containers answer later compositions from the memo
+    return WinProbabilitySolver(VoteRules(max_revotes, TIE_BREAK_POLICIES[tie_break]))
+
+def get_villagers_win_probability(composition: RoleComposition, rules: VoteRules = DEFAULT_VOTE_RULES) -> float:
+    return _get_solver(rules.max_revotes, rules.tie_break.name).solve(composition)
+
+def cross_check(probability: float, villager_wins: int, games: int) -> Dict[str, Optional[float]]:
+    # how far a simulated win rate is from the exact probability, in standard errors
+    rate = villager_wins / games if games else None
+    error = sqrt(probability * (1 - probability) / games) if games else None
+    return {
+        "villagers_win_probability": probability,
+        "simulated_villagers_win_rate": rate,
+        "standard_error": error,
+        "z_score": (rate - probability) / error if error else None,
+    }
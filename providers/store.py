@@ -0,0 +1,251 @@
+import os
+import random
+import struct
+import tempfile
+import time
+from threading import Lock
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+from providers.objects import Game
+from providers.snapshot import restore_game, snapshot_game
+
+DEFAULT_STATE_STORE = 'sqlite:/tmp/werewolves.db'
+# several stores separated by this make a sharded store, e.g. sqlite:/tmp/a.db;sqlite:/tmp/b.db
+SHARD_SEPARATOR = ';'
+DEFAULT_MAX_RETRIES = 50
+# the first retry waits up to this long, every retry after it up to twice as long as the one before
+RETRY_BACKOFF_SECONDS = 0.0005
+MAX_RETRY_BACKOFF_SECONDS = 0.05
+# a game that isn't stored has version 0, the first write makes it 1
+NO_VERSION = 0
+
+T = TypeVar('T')
+
+class VersionConflictError(RuntimeError):
+    pass
+
+class StateStore(object):
+    # keeps game snapshots between the requests of a multi-step game. every write bumps the game's version and
+    # compare_and_swap only writes over the version the writer read, so when two containers update the same
+    # game at once one of them fails and retries on the other's snapshot instead of overwriting it
+    def __init__(self):
+        # compare and swaps update_game lost and retried, in this process
+        self.conflicts = 0
+
+    def get_versioned(self, game_id: str) -> Tuple[Optional[bytes], int]:
+        raise NotImplementedError()
+
+    def compare_and_swap(self, game_id: str, version: int, snapshot: bytes) -> Optional[int]:
+        # writes the snapshot if the game is still at version (NO_VERSION for a new game) and returns the new
+        # version, None if another write came first
+        raise NotImplementedError()
+
+    def put(self, game_id: str, snapshot: bytes) -> int:
+        # writes whatever the version, returns the new one
+        raise NotImplementedError()
+
+    def delete(self, game_id: str):
+        raise NotImplementedError()
+
+    def get(self, game_id: str) -> Optional[bytes]:
+        return self.get_versioned(game_id)[0]
+
+    def save_game(self, game: Game) -> int:
+        return self.put(game.game_id, snapshot_game(game))
+
+    def load_game(self, game_id: str) -> Optional[Game]:
+        snapshot = self.get(game_id)
+        return None if snapshot is None else restore_game(snapshot)
+
+    def update_game(self, game_id: str, update: Callable[[Game], T], max_retries: int = DEFAULT_MAX_RETRIES) -> T:
+        # optimistic concurrency: read, apply the update to the restored game and write it back over the
+        # version it was read at. a lost race rereads the game and applies the update again, so the update
+        # must only change the game
+        backoff = RETRY_BACKOFF_SECONDS
+        for attempt in range(max_retries + 1):
+            snapshot, version = self.get_versioned(game_id)
+            if snapshot is None:
+                raise ValueError(f"unknown game {game_id}")
+            game = restore_game(snapshot)
+            result = update(game)
+            if self.compare_and_swap(game_id, version, snapshot_game(game)) is not None:
+                return result
+            self.conflicts += 1
+            if attempt < max_retries:
+                # jittered, so the writers that lost together don't collide again
+                time.sleep(random.random() * backoff)
+                backoff = min(backoff * 2, MAX_RETRY_BACKOFF_SECONDS)
+        raise VersionConflictError(f"game {game_id} kept changing, gave up after {max_retries} retries")
+
+class MemoryStateStore(StateStore):
+    def __init__(self):
+        super().__init__()
+        self.lock = Lock()
+        # game id: (version, snapshot)
+        self.snapshots: Dict[str, Tuple[int, bytes]] = {}
+
+    def get_versioned(self, game_id: str) -> Tuple[Optional[bytes], int]:
+        version, snapshot = self.snapshots.get(game_id, (NO_VERSION, None))
+        return snapshot, version
+
+    def compare_and_swap(self, game_id: str, version: int, snapshot: bytes) -> Optional[int]:
+        with self.lock:
+            if self.snapshots.get(game_id, (NO_VERSION,))[0] != version:
+                return None
+            self.snapshots[game_id] = (version + 1, snapshot)
+            return version + 1
+
+    def put(self, game_id: str, snapshot: bytes) -> int:
+        with self.lock:
+            version = self.snapshots.get(game_id, (NO_VERSION,))[0] + 1
+            self.snapshots[game_id] = (version, snapshot)
+            return version
+
+    def delete(self, game_id: str):
+        with self.lock:
+            self.snapshots.pop(game_id, None)
+
+class FileStateStore(StateStore):
+    # one file per game, its version then its snapshot, replaced atomically so a reader never sees half a
+    # file. writers take a lock on the directory, which works across processes on the same machine
+    _VERSION = struct.Struct('<Q')
+
+    def __init__(self, directory: str):
+        super().__init__()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock_path = os.path.join(directory, '.lock')
+
+    def _get_path(self, game_id: str) -> str:
+        if not game_id or os.sep in game_id or game_id.startswith('.'):
+            raise ValueError(f"invalid game id {game_id}")
+        return os.path.join(self.directory, f'{game_id}.game')
+
+    def _read(self, path: str) -> Tuple[Optional[bytes], int]:
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None, NO_VERSION
+        return data[self._VERSION.size:], self._VERSION.unpack_from(data)[0]
+
+    def _write(self, path: str, version: int, snapshot: bytes):
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, prefix='.')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(self._VERSION.pack(version))
+                file.write(snapshot)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def _locked(self, write: Callable[[int], Optional[int]], path: str) -> Optional[int]:
+        # fcntl is only imported by the processes that keep games in files
+        import fcntl
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                return write(self._read(path)[1])
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def get_versioned(self, game_id: str) -> Tuple[Optional[bytes], int]:
+        return self._read(self._get_path(game_id))
+
+    def compare_and_swap(self, game_id: str, version: int, snapshot: bytes) -> Optional[int]:
+        path = self._get_path(game_id)
+
+        def write(current: int) -> Optional[int]:
+            if current != version:
+                return None
+            self._write(path, version + 1, snapshot)
+            return version + 1
+        return self._locked(write, path)
+
+    def put(self, game_id: str, snapshot: bytes) -> int:
+        path = self._get_path(game_id)
+
+        def write(current: int) -> int:
+            self._write(path, current + 1, snapshot)
+            return current + 1
+        return self._locked(write, path)
+
+    def delete(self, game_id: str):
+        try:
+            os.unlink(self._get_path(game_id))
+        except FileNotFoundError:
+            pass
+
+class SqliteStateStore(StateStore):
+    # the version check is part of the UPDATE, so a compare and swap is one statement and needs no transaction
+    def __init__(self, path: str, timeout: float = 30.0):
+        super().__init__()
+        # sqlite is only imported by the processes that keep games in it
+        import sqlite3
+        self.path = path
+        self.lock = Lock()
+        self.connection = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        # games are short lived, a crash may lose the last writes but never corrupts the database
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS games (game_id TEXT PRIMARY KEY, snapshot BLOB NOT NULL, '
+                                'updated_at REAL NOT NULL, version INTEGER NOT NULL DEFAULT 1)')
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(games)')]
+        if 'version' not in columns:
+            # databases written before games had versions
+            self.connection.execute('ALTER TABLE games ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+
+    def get_versioned(self, game_id: str) -> Tuple[Optional[bytes], int]:
+        with self.lock:
+            row = self.connection.execute('SELECT snapshot, version FROM games WHERE game_id = ?',
+                                          (game_id,)).fetchone()
+        return (None, NO_VERSION) if row is None else (bytes(row[0]), row[1])
+
+    def compare_and_swap(self, game_id: str, version: int, snapshot: bytes) -> Optional[int]:
+        with self.lock:
+            if version == NO_VERSION:
+                cursor = self.connection.execute('INSERT OR IGNORE INTO games (game_id, snapshot, updated_at, version) '
+                                                 'VALUES (?, ?, ?, 1)', (game_id, snapshot, time.time()))
+            else:
+                cursor = self.connection.execute('UPDATE games SET snapshot = ?, updated_at = ?, version = version + 1 '
+                                                 'WHERE game_id = ? AND version = ?',
+                                                 (snapshot, time.time(), game_id, version))
+        return version + 1 if cursor.rowcount == 1 else None
+
+    def put(self, game_id: str, snapshot: bytes) -> int:
+        with self.lock:
+            # a write transaction from the start, so the version read is still current when it is bumped
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = self.connection.execute('SELECT version FROM games WHERE game_id = ?', (game_id,)).fetchone()
+                version = (NO_VERSION if row is None else row[0]) + 1
+                self.connection.execute('INSERT OR REPLACE INTO games (game_id, snapshot, updated_at, version) '
+                                        'VALUES (?, ?, ?, ?)', (game_id, snapshot, time.time(), version))
+                self.connection.execute('COMMIT')
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+        return version
+
+    def delete(self, game_id: str):
+        with self.lock:
+            self.connection.execute('DELETE FROM games WHERE game_id = ?', (game_id,))
+
+    def close(self):
+        self.connection.close()
+
+def create_state_store(url: Optional[str] = None) -> StateStore:
+    # memory:, file:<directory> or sqlite:<path>, from WEREWOLF_STATE_STORE by default. several of them
+    # separated by ; shard the games between them
+    url = url or os.environ.get('WEREWOLF_STATE_STORE', DEFAULT_STATE_STORE)
+    if SHARD_SEPARATOR in url:
+        from providers.sharding import ShardedStateStore
+        return ShardedStateStore({shard: create_state_store(shard) for shard in url.split(SHARD_SEPARATOR) if shard})
+    kind, _, location = url.partition(':')
+    if kind == 'memory':
+        return MemoryStateStore()
+    if kind == 'file' and location:
+        return FileStateStore(location)
+    if kind == 'sqlite' and location:
+        return SqliteStateStore(location)
+    raise ValueError(f"unknown state store {url}")
@@ -0,0 +1,58 @@
+import json
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from providers.objects import Game
+
+# a streamed game is one message per phase: start, then night and day as each resolves, then end.
+# every phase message carries the events recorded since the previous one (vote rounds, seer result, kills)
+NDJSON = 'ndjson'
+SSE = 'sse'
+CONTENT_TYPES = {NDJSON: 'application/x-ndjson', SSE: 'text/event-stream'}
+
+def start_message(game: Game) -> dict:
+    return {
+        "type": "start",
+        "game_id": game.game_id,
+        "seed": game.seed,
+        "players": [{"id": player.id, "name": player.name, "role": player.role.name} for player in game.players],
+        "events": [event.toJson() for event in game.events],
+    }
+
+def phase_message(game: Game, phase: str, first_event: int) -> dict:
+    results = game.last_night_results if phase == 'night' else game.last_day_results
+    return {
+        "type": phase,
+        "round": game.night if phase == 'night' else game.day,
+        "events": [event.toJson() for event in game.events.since(first_event)],
+        "results": results.toJson() if results else None,
+    }
+
+def end_message(game: Game, first_event: int) -> dict:
+    return {
+        "type": "end",
+        "events": [event.toJson() for event in game.events.since(first_event)],
+        "winning_side": game.winning_side,
+        "winners": [winner.toJson() for winner in game.winners],
+    }
+
+def to_ndjson(message: dict) -> str:
+    return json.dumps(message) + '\n'
+
+def to_sse(message: dict) -> str:
+    return f'event: {message["type"]}\ndata: {json.dumps(message)}\n\n'
+
+FORMATTERS: Dict[str, Callable[[dict], str]] = {NDJSON: to_ndjson, SSE: to_sse}
+
+def get_stream_format(params: dict, headers: Optional[dict] = None) -> str:
+    # format=ndjson|sse wins, otherwise an Accept: text/event-stream header asks for server-sent events
+    stream_format = params.get('format')
+    if stream_format is None:
+        accept = {name.lower(): value for name, value in (headers or {}).items()}.get('accept', '')
+        stream_format = SSE if CONTENT_TYPES[SSE] in accept else NDJSON
+    if stream_format not in FORMATTERS:
+        raise ValueError(f"format must be one of {', '.join(FORMATTERS)}")
+    return stream_format
+
+def format_stream(messages: Iterable[dict], stream_format: str) -> Iterator[str]:
+    formatter = FORMATTERS[stream_format]
+    for message in messages:
+        yield formatter(message)
@@ -0,0 +1,189 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from providers.events import EVENT_FIELDS, NO_PLAYER, EventType, VoteKind
+from providers.objects import Game, NightActions, Player, VoteTally
+from providers.policies import RANDOM_POLICY, BotPolicy
+
+# a voting bot that reads the public record: who voted for whom on every village ballot and the role of
+# every player who died. the rules give werewolves away in the record, they never vote for one of their
+# own while a villager is suspected, so voting for a werewolf or being voted by one clears a player,
+# and voting like a werewolf (their voting bloc) or against villagers darkens them.
+# the model keeps every ballot as a row of a voter x target matrix and is updated as events come in:
+# a ballot costs one fancy assignment, a death one pass over the matrix column and the rows, and the
+# scores of the whole lobby are one dot product. bots of the same side vote for the same top suspect,
+# ties are broken by a per game jitter so seeded games stay reproducible.
+# the seer's results are announced without naming the player, so they only move the seer's own scores
+
+# a co-vote is one ballot where two players voted for the same target
+FEATURES = ('covotes_werewolves', 'covotes_villagers', 'voted_werewolves', 'voted_villagers',
+            'voted_by_werewolves')
+WEIGHTS = np.array([0.5, -0.25, -2.0, 0.5, -2.0])
+SEER_WEIGHT = 100.0
+JITTER = 1e-3
+# ballots rows allocated at once
+BALLOT_ROWS = 16
+MAX_GAMES = 256
+
+UNKNOWN, WEREWOLF, VILLAGER = 0, 1, -1
+
+class SuspicionModel(object):
+    __slots__ = ('game', 'size', 'position', 'ballots', 'ballot_count', 'revealed', 'features', 'seer_results',
+                 'jitter', 'id_index')
+
+    def __init__(self, game: Game):
+        self.game = game
+        self.size = len(game.players)
+        # events already read
+        self.position = 0
+        # ballot x voter index: index of the target, -1 when the voter didn't vote
+        self.ballots = np.full((BALLOT_ROWS, self.size), -1, dtype=np.int32)
+        self.ballot_count = 0
+        self.revealed = np.zeros(self.size, dtype=np.int8)
+        self.features = np.zeros((len(FEATURES), self.size))
+        # what the seer learned: WEREWOLF or VILLAGER by index
+        self.seer_results = np.zeros(self.size, dtype=np.int8)
+        self.jitter = np.random.default_rng(game.seed).random(self.size) * JITTER
+        # lobbies number their players 1..n, other games need a lookup array
+        self.id_index: Optional[np.ndarray] = None
+        if game.player_index is not None:
+            self.id_index = np.full(max(game.player_index) + 1, -1, dtype=np.int32)
+            for player_id, index in game.player_index.items():
+                self.id_index[player_id] = index
+
+    def _to_index(self, ids: np.ndarray) -> np.ndarray:
+        return ids - 1 if self.id_index is None else self.id_index[ids]
+
+    def update(self):
+        data = self.game.events.data
+        if len(data) == self.position * EVENT_FIELDS:
+            return
+        # a copy, a view would keep the event array from growing
+        records = np.array(data[self.position * EVENT_FIELDS:], dtype=np.int32).reshape(-1, EVENT_FIELDS)
+        self.position += len(records)
+        types, values = records[:, 0], records[:, 4]
+        village = values == VoteKind.Village
+
+        # the ballot every record falls in, then every vote in one assignment, a later cast or withdrawal
+        # of the same voter overwrites the earlier one
+        starts = (types == EventType.VoteStarted) & village
+        rows = self.ballot_count - 1 + np.cumsum(starts)
+        self.ballot_count += int(starts.sum())
+        if self.ballot_count > len(self.ballots):
+            grown = np.full((max(self.ballot_count, 2 * len(self.ballots)), self.size), -1, dtype=np.int32)
+            grown[:len(self.ballots)] = self.ballots
+            self.ballots = grown
+        votes = ((types == EventType.VoteCast) | (types == EventType.VoteRemoved)) & village
+        if votes.any():
+            voters = self._to_index(records[votes, 2])
+            targets = np.where(types[votes] == EventType.VoteCast, self._to_index(records[votes, 3]), -1)
+            self.ballots[rows[votes], voters] = targets
+
+        for record in records[(types == EventType.PlayerKilled) | (types == EventType.SeerResult)]:
+            index = int(self._to_index(record[3])) if record[3] != NO_PLAYER else -1
+            if index < 0:
+                continue
+            role = WEREWOLF if self.game.is_werewolf(self.game.players[index]) else VILLAGER
+            if record[0] == EventType.SeerResult:
+                self.seer_results[index] = WEREWOLF if record[4] else VILLAGER
+            elif self.revealed[index] == UNKNOWN:
+                self._reveal(index, role)
+
+    def _reveal(self, index: int, role: int):
+        # a death shows the player's role: every ballot they were part of now says something about the others
+        self.revealed[index] = role
+        ballots = self.ballots[:self.ballot_count]
+        column = ballots[:, index]
+        voted = column >= 0
+        covotes = (ballots[voted] == column[voted, None]).sum(axis=0)
+        covotes[index] = 0
+        voted_for = (ballots == index).sum(axis=0)
+        if role == WEREWOLF:
+            self.features[0] += covotes
+            self.features[2] += voted_for
+            self.features[4] += np.bincount(column[voted], minlength=self.size)
+        else:
+            self.features[1] += covotes
+            self.features[3] += voted_for
+
+    def get_scores(self) -> np.ndarray:
+        # higher is more likely a werewolf
+        return WEIGHTS @ self.features + self.jitter
+
+    def get_seer_scores(self) -> np.ndarray:
+        return self.get_scores() + SEER_WEIGHT * self.seer_results
+
+class SuspicionPolicy(BotPolicy):
+    # the rankings are computed once per ballot, a voter then only skips themselves
+    name = 'suspicion'
+
+    def __init__(self):
+        self.models: 'OrderedDict[str, SuspicionModel]' = OrderedDict()
+        self.tally: Optional[VoteTally] = None
+        self.rankings: Dict[int, Tuple[List[Player], List[Player]]] = {}
+        self.seer: Optional[Player] = None
+        self.model: Optional[SuspicionModel] = None
+
+    def get_model(self, game: Game) -> SuspicionModel:
+        model = self.models.get(game.game_id)
+        if model is None or model.game is not game:
+            if len(self.models) >= MAX_GAMES:
+                self.models.popitem(last=False)
+            model = self.models[game.game_id] = SuspicionModel(game)
+        model.update()
+        return model
+
+    def _get_indexes(self, model: SuspicionModel, players: List[Player]) -> np.ndarray:
+        return model._to_index(np.fromiter((player.id for player in players), dtype=np.int32, count=len(players)))
+
+    def _rank(self, players: List[Player], seer: bool = False) -> List[Player]:
+        # the players list is kept with its ranking, so a new list reusing a freed list's id isn't mistaken for it
+        cached = self.rankings.get(id(players) * 2 + seer)
+        if cached is not None and cached[0] is players:
+            return cached[1]
+        model = self.model
+        scores = model.get_seer_scores() if seer else model.get_scores()
+        order = np.argsort(-scores[self._get_indexes(model, players)], kind='stable')
+        ranking = [players[position] for position in order.tolist()]
+        self.rankings[id(players) * 2 + seer] = (players, ranking)
+        return ranking
+
+    def _open_ballot(self, game: Game, tally: Optional[VoteTally]):
+        if tally is not self.tally:
+            self.tally = tally
+            self.rankings = {}
+            self.seer = game.get_seer()
+            # the votes of an open ballot don't move the scores, the events are read once per ballot
+            self.model = self.get_model(game)
+
+    def choose_village_victim(self, game: Game, voter: Player, suspected_players: List[Player],
+                              suspected_villagers: List[Player]) -> Player:
+        self._open_ballot(game, game.village_tally)
+        # werewolves side with the village against its top villager suspect
+        if game.is_werewolf(voter):
+            return self._rank(suspected_villagers)[0]
+        ranking = self._rank(suspected_players, voter is self.seer)
+        if ranking[0] != voter or len(ranking) == 1:
+            return ranking[0]
+        return ranking[1]
+
+    def choose_werewolf_victim(self, game: Game, werewolf: Player, villagers: List[Player]) -> Player:
+        # the villager the village trusts most
+        self._open_ballot(game, game.werewolf_tally)
+        return self._rank(villagers)[-1]
+
+    def choose_seer_target(self, game: Game, seer: Player) -> Player:
+        # the top suspect the seer hasn't looked at yet
+        model = self.get_model(game)
+        scores = model.get_scores() - 2 * SEER_WEIGHT * (model.seer_results != 0)
+        players = [player for player in game.get_players_alive() if player != seer]
+        return players[int(np.argmax(scores[self._get_indexes(model, players)]))]
+
+    def choose_bodyguard_target(self, game: Game, bodyguard: Player) -> Optional[Player]:
+        return RANDOM_POLICY.choose_bodyguard_target(game, bodyguard)
+
+    def choose_witch_save(self, game: Game, witch: Player, night_actions: NightActions) -> bool:
+        return RANDOM_POLICY.choose_witch_save(game, witch, night_actions)
+
+    def choose_witch_victim(self, game: Game, witch: Player, night_actions: NightActions) -> Optional[Player]:
+        return RANDOM_POLICY.choose_witch_victim(game, witch, night_actions)
@@ -0,0 +1,171 @@
+from typing import Dict, List, Optional, Tuple
+from providers.events import EVENT_FIELDS, NO_PLAYER, EventLog, EventType, VoteKind
+from providers.objects import PlayerAction, RoleAction
+
+# indexes of the event log for post-game analytics and bots: what each player did, who voted for whom on
+# every ballot, and who voted along with whom. the index is fed the events as they are recorded, so a
+# query never rescans the log and costs as much as the answer it returns.
+# a round is the night number, the village votes of round n are on the day after night n
+
+class Ballot(object):
+    # one vote of a round, the first one (number 0) or a revote
+    __slots__ = ('kind', 'round', 'number', 'votes', 'voters')
+
+    def __init__(self, kind: int, round: int, number: int):
+        self.kind = kind
+        self.round = round
+        self.number = number
+        # voter id: target id
+        self.votes: Dict[int, int] = {}
+        # target id: voter ids in voting order, a dict so a withdrawn vote is removed in O(1)
+        self.voters: Dict[int, Dict[int, None]] = {}
+
+    def __repr__(self):
+        return f'round {self.round} vote {self.number}: {self.votes}'
+
+    def cast(self, voter: int, target: int):
+        self.votes[voter] = target
+        voters = self.voters.get(target)
+        if voters is None:
+            self.voters[target] = {voter: None}
+        else:
+            voters[voter] = None
+
+    def withdraw(self, voter: int, target: int):
+        if self.votes.get(voter) != target:
+            return
+        del self.votes[voter]
+        voters = self.voters[target]
+        del voters[voter]
+        if not voters:
+            del self.voters[target]
+
+    def get_voters(self, target: int) -> List[int]:
+        return list(self.voters.get(target, ()))
+
+    def toJson(self):
+        return {"kind": 'werewolves' if self.kind == VoteKind.Werewolves else 'village', "round": self.round,
+                "number": self.number, "votes": {str(voter): target for voter, target in self.votes.items()}}
+
+class ActionTimeline(object):
+    __slots__ = ('events', 'position', 'actions', 'targeted', 'deaths', 'ballots', 'round_ballots',
+                 'player_ballots', 'open_ballots', 'werewolf_victim')
+
+    def __init__(self, events: EventLog):
+        self.events = events
+        # events already indexed
+        self.position = 0
+        self.actions: Dict[int, List[PlayerAction]] = {}
+        # target id: (actor id, action) for every action aimed at the player
+        self.targeted: Dict[int, List[Tuple[int, PlayerAction]]] = {}
+        # player id: (round, kill reason)
+        self.deaths: Dict[int, Tuple[int, int]] = {}
+        self.ballots: List[Ballot] = []
+        self.round_ballots: Dict[Tuple[int, int], List[Ballot]] = {}
+        self.player_ballots: Dict[int, List[Ballot]] = {}
+        self.open_ballots: Dict[int, Ballot] = {}
+        self.werewolf_victim = NO_PLAYER
+
+    def update(self):
+        # reads the raw event array, building an Event per record would cost more than indexing it
+        data = self.events.data
+        for start in range(self.position * EVENT_FIELDS, len(data), EVENT_FIELDS):
+            type, round, actor, target, value = data[start:start + EVENT_FIELDS]
+            if type == EventType.VoteCast:
+                self._cast(value, actor, target)
+            elif type == EventType.VoteRemoved:
+                self._withdraw(value, actor, target)
+            elif type == EventType.VoteStarted:
+                ballots = self.round_ballots.setdefault((value, round), [])
+                ballot = Ballot(value, round, len(ballots))
+                ballots.append(ballot)
+                self.ballots.append(ballot)
+                self.open_ballots[value] = ballot
+            elif type == EventType.WerewolfVictimChosen:
+                self.werewolf_victim = target
+            elif type == EventType.BodyguardSaved and actor != NO_PLAYER:
+                self._add_action(actor, PlayerAction(RoleAction.Protect, target, round))
+            elif type == EventType.SeerResult and actor != NO_PLAYER:
+                self._add_action(actor, PlayerAction(RoleAction.Investigate, target, round))
+            elif type == EventType.WitchSaved and value and actor != NO_PLAYER:
+                self._add_action(actor, PlayerAction(RoleAction.Save, self.werewolf_victim, round))
+            elif type == EventType.WitchVictimChosen and actor != NO_PLAYER:
+                self._add_action(actor, PlayerAction(RoleAction.Kill, target, round))
+            elif type == EventType.PlayerKilled:
+                self.deaths[target] = (round, value)
+        self.position = len(data) // EVENT_FIELDS
+
+    def _add_action(self, actor: int, action: PlayerAction):
+        actions = self.actions.get(actor)
+        if actions is None:
+            self.actions[actor] = [action]
+        else:
+            actions.append(action)
+        if action.target != NO_PLAYER:
+            targeted = self.targeted.get(action.target)
+            if targeted is None:
+                self.targeted[action.target] = [(actor, action)]
+            else:
+                targeted.append((actor, action))
+
+    def _cast(self, kind: int, voter: int, target: int):
+        ballot = self.open_ballots[kind]
+        ballot.cast(voter, target)
+        ballots = self.player_ballots.get(voter)
+        if ballots is None:
+            self.player_ballots[voter] = [ballot]
+        elif not ballots or ballots[-1] is not ballot:
+            # empty once the voter withdrew their only vote
+            ballots.append(ballot)
+        action = RoleAction.Kill if kind == VoteKind.Werewolves else RoleAction.Vote
+        self._add_action(voter, PlayerAction(action, target, ballot.round))
+
+    def _withdraw(self, kind: int, voter: int, target: int):
+        ballot = self.open_ballots[kind]
+        ballot.withdraw(voter, target)
+        ballots = self.player_ballots.get(voter)
+        if ballots and ballots[-1] is ballot and voter not in ballot.votes:
+            ballots.pop()
+        # the withdrawn vote is the voter's latest action on that target
+        actions = self.actions.get(voter, [])
+        for index in range(len(actions) - 1, -1, -1):
+            if actions[index].target == target and actions[index].action in (RoleAction.Kill, RoleAction.Vote):
+                action = actions.pop(index)
+                targeted = self.targeted[target]
+                for position in range(len(targeted) - 1, -1, -1):
+                    if targeted[position][1] is action:
+                        del targeted[position]
+                        break
+                break
+
+    def get_actions(self, player_id: int) -> List[PlayerAction]:
+        # everything the player did, in order
+        return list(self.actions.get(player_id, ()))
+
+    def get_targeted_by(self, player_id: int) -> List[Tuple[int, PlayerAction]]:
+        # (actor id, action) for the votes, protections, investigations and potions aimed at the player
+        return list(self.targeted.get(player_id, ()))
+
+    def get_death(self, player_id: int) -> Optional[Tuple[int, int]]:
+        return self.deaths.get(player_id)
+
+    def get_ballots(self, kind: int, round: int) -> List[Ballot]:
+        return list(self.round_ballots.get((kind, round), ()))
+
+    def get_vote_matrix(self, kind: int, round: int, number: int = -1) -> Dict[int, int]:
+        # voter id: target id on one ballot of the round, the last one (the one that counted) by default
+        ballots = self.round_ballots.get((kind, round))
+        if not ballots:
+            return {}
+        return dict(ballots[number].votes)
+
+    def get_voted_with(self, player_id: int, kind: Optional[int] = None) -> Dict[int, int]:
+        # player id: how many ballots they voted for the same target as the player
+        together: Dict[int, int] = {}
+        for ballot in self.player_ballots.get(player_id, ()):
+            if kind is not None and ballot.kind != kind:
+                continue
+            for voter in ballot.voters[ballot.votes[player_id]]:
+                if voter != player_id:
+                    together[voter] = together.get(voter, 0) + 1
+        return together
@@ -0,0 +1,248 @@
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+from providers.objects import Player
+from providers.simulation import SimulationStats
+from providers.voting import DEFAULT_VOTE_RULES, VoteRules
+
+# role codes used by the array engine
+VILLAGER = 0
+WEREWOLF = 1
+SEER = 2
+BODYGUARD = 3
+WITCH = 4
+
+ROLE_CODES = {'Villager': VILLAGER, 'Werewolf': WEREWOLF, 'Seer': SEER, 'Bodyguard': BODYGUARD, 'Witch': WITCH}
+ROLE_NAMES = {code: name for name, code in ROLE_CODES.items()}
+
+NO_PLAYER = -1
+WEREWOLVES_WIN = 0
+VILLAGERS_WIN = 1
+UNFINISHED = -1
+TIE_BREAKS = ('random', 'earliest_vote', 'no_kill')
+
+def role_codes(players: List[Player]) -> np.ndarray:
+    return np.array([ROLE_CODES[player.role.name] for player in players], dtype=np.int8)
+
+def _choose(rng: np.random.Generator, candidates: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    # every chooser, given as the row of its game, picks uniformly among that game's candidates (K, N).
+    # returns the picked player index, or NO_PLAYER where the game has no candidate
+    cumulative = candidates[rows].cumsum(axis=1, dtype=np.int16)
+    counts = cumulative[:, -1]
+    draws = (rng.random(len(rows)) * counts).astype(np.int16)
+    picks = (cumulative > draws[:, None]).argmax(axis=1)
+    return np.where(counts > 0, picks, NO_PLAYER)
+
+def _tally(rows: np.ndarray, targets: np.ndarray, games: int, players: int) -> np.ndarray:
+    voted = targets >= 0
+    flat = rows[voted] * players + targets[voted]
+    return np.bincount(flat, minlength=games * players).reshape(games, players)
+
+def _break_earliest(rows: np.ndarray, voters: np.ndarray, targets: np.ndarray, tied: np.ndarray) -> np.ndarray:
+    # the tied player whose first vote came first. voters vote in roster order, so it is the target of the
+    # lowest voter index that voted for a tied player, per row of tied
+    victims = np.full(len(tied), NO_PLAYER, dtype=np.int64)
+    voted = targets >= 0
+    rows, voters, targets = rows[voted], voters[voted], targets[voted]
+    for_tied = tied[rows, targets]
+    rows, voters, targets = rows[for_tied], voters[for_tied], targets[for_tied]
+    order = np.lexsort((voters, rows))
+    first_rows, first = np.unique(rows[order], return_index=True)
+    victims[first_rows] = targets[order][first]
+    return victims
+
+class VectorizedGames(object):
+    def __init__(self, roles: Sequence[int], games: int, rng: np.random.Generator,
+                 rules: VoteRules = DEFAULT_VOTE_RULES):
+        if rules.tie_break.name not in TIE_BREAKS:
+            raise ValueError(f"the vectorized engine supports the {', '.join(TIE_BREAKS)} tie breaks")
+        roles = np.asarray(roles, dtype=np.int8)
+        self.games = games
+        self.rules = rules
+        self.players = len(roles)
+        self.rng = rng
+        self.roles = np.broadcast_to(roles, (games, self.players))
+        self.is_werewolf = self.roles == WEREWOLF
+        self.alive = np.ones((games, self.players), dtype=bool)
+        self.save_potion = np.ones(games, dtype=bool)
+        self.kill_potion = np.ones(games, dtype=bool)
+        self.last_saved = np.full(games, NO_PLAYER, dtype=np.int64)
+        self.active = np.ones(games, dtype=bool)
+        self.winner = np.full(games, UNFINISHED, dtype=np.int8)
+        self.nights = np.zeros(games, dtype=np.int64)
+        self.deaths = np.zeros(games, dtype=np.int64)
+        # 1-based order in which each player died, 0 while alive
+        self.death_order = np.zeros((games, self.players), dtype=np.int64)
+        self.werewolf_revotes = 0
+        self.village_revotes = 0
+        self._special = {role: self._special_index(role) for role in (BODYGUARD, WITCH)}
+
+    def _special_index(self, role: int) -> Optional[int]:
+        indexes = np.flatnonzero(self.roles[0] == role)
+        return int(indexes[0]) if len(indexes) > 0 else None
+
+    def _is_special_alive(self, role: int, games: np.ndarray) -> np.ndarray:
+        index = self._special[role]
+        if index is None:
+            return np.zeros(len(games), dtype=bool)
+        return self.alive[games, index]
+
+    def _kill(self, games: np.ndarray, victims: np.ndarray):
+        games = games[victims >= 0]
+        victims = victims[victims >= 0]
+        already_dead = ~self.alive[games, victims]
+        games, victims = games[~already_dead], victims[~already_dead]
+        self.alive[games, victims] = False
+        self.deaths[games] += 1
+        self.death_order[games, victims] = self.deaths[games]
+
+    def _check_game_over(self):
+        games = np.flatnonzero(self.active)
+        werewolves = (self.alive[games] & self.is_werewolf[games]).sum(axis=1)
+        villagers = (self.alive[games] & ~self.is_werewolf[games]).sum(axis=1)
+        villagers_win = werewolves == 0
+        werewolves_win = ~villagers_win & (werewolves > villagers)
+        self.winner[games[villagers_win]] = VILLAGERS_WIN
+        self.winner[games[werewolves_win]] = WEREWOLVES_WIN
+        self.active[games[villagers_win | werewolves_win]] = False
+
+    def _resolve_vote(self, games: np.ndarray, candidates: np.ndarray, werewolf_voters: np.ndarray,
+                      village_voters: np.ndarray) -> Tuple[np.ndarray, int]:
+        # revote among the tied players up to rules.max_revotes times, like handler._collect_village_votes,
+        # then break the ties that are left with the rules' tie break
+        victims = np.full(len(games), NO_PLAYER, dtype=np.int64)
+        pending = np.arange(len(games))
+        revotes = 0
+        for revote in range(self.rules.max_revotes + 1):
+            game_candidates = candidates[pending]
+            werewolf_candidates = game_candidates & ~self.is_werewolf[games[pending]]
+            only_werewolves = ~werewolf_candidates.any(axis=1)
+            werewolf_candidates[only_werewolves] = game_candidates[only_werewolves]
+
+            werewolf_rows, werewolf_indexes = np.nonzero(werewolf_voters[pending])
+            village_rows, village_indexes = np.nonzero(village_voters[pending])
+            rows = np.concatenate((werewolf_rows, village_rows))
+            targets = np.concatenate((
+                _choose(self.rng, werewolf_candidates, werewolf_rows),
+                _choose(self.rng, game_candidates, village_rows),
+            ))
+            counts = _tally(rows, targets, len(pending), self.players)
+            highest = counts.max(axis=1)
+            tied = (counts == highest[:, None]) & (highest[:, None] > 0)
+            decided = tied.sum(axis=1) <= 1
+            victims[pending[decided]] = np.where(highest[decided] > 0, counts[decided].argmax(axis=1), NO_PLAYER)
+            if decided.all():
+                break
+
+            if revote == self.rules.max_revotes:
+                undecided = np.flatnonzero(~decided)
+                tie_break = self.rules.tie_break.name
+                if tie_break == 'random':
+                    victims[pending[undecided]] = _choose(self.rng, tied, undecided)
+                elif tie_break == 'earliest_vote':
+                    voters = np.concatenate((werewolf_indexes, village_indexes))
+                    victims[pending[undecided]] = _break_earliest(rows, voters, targets, tied)[undecided]
+                break
+
+            candidates[pending[~decided]] = tied[~decided]
+            pending = pending[~decided]
+            revotes += len(pending)
+        return victims, revotes
+
+    def play_night(self):
+        games = np.flatnonzero(self.active)
+        self.nights[games] += 1
+        alive = self.alive[games]
+        is_werewolf = self.is_werewolf[games]
+
+        # 1 - werewolves kill a player
+        no_voters = np.zeros_like(alive)
+        werewolf_victims, revotes = self._resolve_vote(games, alive & ~is_werewolf, alive & is_werewolf, no_voters)
+        self.werewolf_revotes += revotes
+
+        # 2 - bodyguard saves anyone but last night's saved player
+        has_bodyguard = self._is_special_alive(BODYGUARD, games)
+        saveable = alive.copy()
+        last_saved = self.last_saved[games]
+        saved_before = np.flatnonzero(last_saved >= 0)
+        saveable[saved_before, last_saved[saved_before]] = False
+        saved = np.full(len(games), NO_PLAYER, dtype=np.int64)
+        bodyguard_rows = np.flatnonzero(has_bodyguard)
+        saved[bodyguard_rows] = _choose(self.rng, saveable, bodyguard_rows)
+        self.last_saved[games] = saved
+
+        # 3 - seer investigates: the result is only announced, so it never changes the outcome
+
+        # 4 - witch saves the werewolf victim
+        has_witch = self._is_special_alive(WITCH, games)
+        can_save = has_witch & self.save_potion[games]
+        witch_saves = can_save & (self.rng.random(len(games)) < 0.5)
+        self.save_potion[games[witch_saves]] = False
+
+        # 5 - witch kills anyone but herself
+        can_kill = has_witch & self.kill_potion[games]
+        witch_kills = can_kill & (self.rng.random(len(games)) < 0.5)
+        self.kill_potion[games[witch_kills]] = False
+        killable = alive.copy()
+        if self._special[WITCH] is not None:
+            killable[:, self._special[WITCH]] = False
+        witch_victims = np.full(len(games), NO_PLAYER, dtype=np.int64)
+        witch_rows = np.flatnonzero(witch_kills)
+        witch_victims[witch_rows] = _choose(self.rng, killable, witch_rows)
+
+        werewolf_victims[witch_saves | (saved == werewolf_victims)] = NO_PLAYER
+        witch_victims[saved == witch_victims] = NO_PLAYER
+        self._kill(games, werewolf_victims)
+        self._kill(games, witch_victims)
+        self._check_game_over()
+
+    def play_day(self):
+        games = np.flatnonzero(self.active)
+        alive = self.alive[games]
+        is_werewolf = self.is_werewolf[games]
+        village_victims, revotes = self._resolve_vote(games, alive.copy(), alive & is_werewolf, alive & ~is_werewolf)
+        self.village_revotes += revotes
+        self._kill(games, village_victims)
+        self._check_game_over()
+
+    def play(self):
+        self._check_game_over()
+        while self.active.any():
+            self.play_night()
+            if not self.active.any():
+                break
+            self.play_day()
+        return self
+
+    def add_to_stats(self, stats: SimulationStats) -> SimulationStats:
+        stats.games += self.games
+        for side, code in [('Werewolves', WEREWOLVES_WIN), ('Villagers', VILLAGERS_WIN)]:
+            wins = int((self.winner == code).sum())
+            if wins > 0:
+                stats.wins[side] = stats.wins.get(side, 0) + wins
+
+        nights, counts = np.unique(self.nights, return_counts=True)
+        for rounds, count in zip(nights.tolist(), counts.tolist()):
+            stats.rounds[rounds] = stats.rounds.get(rounds, 0) + count
+
+        stats.werewolf_revotes += self.werewolf_revotes
+        stats.village_revotes += self.village_revotes
+
+        for index, code in enumerate(self.roles[0].tolist()):
+            role = ROLE_NAMES[code]
+            order = self.death_order[:, index]
+            stats.role_counts[role] = stats.role_counts.get(role, 0) + self.games
+            stats.deaths[role] = stats.deaths.get(role, 0) + int((order > 0).sum())
+            stats.death_order_total[role] = stats.death_order_total.get(role, 0) + int(order.sum())
+            stats.first_deaths[role] = stats.first_deaths.get(role, 0) + int((order == 1).sum())
+        return stats
+
+def run_vectorized_simulations(roles: Sequence[int], games: int, seed: Optional[int] = None,
+                               batch_size: int = 20000, rules: VoteRules = DEFAULT_VOTE_RULES) -> SimulationStats:
+    rng = np.random.default_rng(seed)
+    stats = SimulationStats()
+    remaining = games
+    while remaining > 0:
+        batch = min(batch_size, remaining)
+        VectorizedGames(roles, batch, rng, rules).play().add_to_stats(stats)
+        remaining -= batch
+    return stats
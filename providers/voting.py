@@ -0,0 +1,62 @@
+from typing import Dict, List, Optional
+from providers.objects import Vote
+from providers.rng import PhaseRandom
+
+DEFAULT_MAX_REVOTES = 10
+# every revote asks every voter again, a tie that survives this many won't be broken by more
+MAX_REVOTES = 100
+
+class TieBreakPolicy(object):
+    name = ''
+
+    def break_tie(self, tied_votes: List[Vote], rng: PhaseRandom) -> Optional[Vote]:
+        raise NotImplementedError()
+
+    def __repr__(self):
+        return self.name
+
+class RandomTieBreak(TieBreakPolicy):
+    name = 'random'
+
+    def break_tie(self, tied_votes: List[Vote], rng: PhaseRandom) -> Optional[Vote]:
+        return rng.choice(tied_votes)
+
+class NoKillTieBreak(TieBreakPolicy):
+    name = 'no_kill'
+
+    def break_tie(self, tied_votes: List[Vote], rng: PhaseRandom) -> Optional[Vote]:
+        return None
+
+class EarliestVoteTieBreak(TieBreakPolicy):
+    name = 'earliest_vote'
+
+    def break_tie(self, tied_votes: List[Vote], rng: PhaseRandom) -> Optional[Vote]:
+        # votes keep the order in which each player received their first vote
+        return tied_votes[0]
+
+TIE_BREAK_POLICIES: Dict[str, TieBreakPolicy] = {
+    policy.name: policy for policy in [RandomTieBreak(), NoKillTieBreak(), EarliestVoteTieBreak()]
+}
+
+class VoteRules(object):
+    def __init__(self, max_revotes: int = DEFAULT_MAX_REVOTES, tie_break: Optional[TieBreakPolicy] = None):
+        if max_revotes < 0 or max_revotes > MAX_REVOTES:
+            raise ValueError(f"max revotes must be between 0 and {MAX_REVOTES}")
+        self.max_revotes = max_revotes
+        self.tie_break: TieBreakPolicy = tie_break or TIE_BREAK_POLICIES['random']
+
+    def __repr__(self):
+        return f'max {self.max_revotes} revotes, then {self.tie_break}'
+
+    @classmethod
+    def from_params(cls, params: Dict[str, str]) -> 'VoteRules':
+        tie_break_name = params.get('tieBreak', 'random')
+        if tie_break_name not in TIE_BREAK_POLICIES:
+            raise ValueError(f"unknown tie break policy {tie_break_name}")
+        try:
+            max_revotes = int(params.get('maxRevotes', DEFAULT_MAX_REVOTES))
+        except (TypeError, ValueError):
+            raise ValueError("maxRevotes must be an integer")
+        return cls(max_revotes, TIE_BREAK_POLICIES[tie_break_name])
+
+DEFAULT_VOTE_RULES = VoteRules()
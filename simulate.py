@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+from logs.logger import set_quiet
+from providers.lobby import RoleComposition, get_balance_tolerance, get_max_players
+from providers.policies import BOT_POLICIES, DEFAULT_BOT_BUDGET_MS, create_bot_policy
+from providers.simulation import SimulationStats, derive_game_seed
+from providers.voting import DEFAULT_MAX_REVOTES, TIE_BREAK_POLICIES, VoteRules
+
+DEFAULT_CHUNK_SIZE = 2000
+
+def _init_worker():
+    set_quiet(True)
+
+def _run_chunk(engine: str, first_game: int, games: int, seed: int, tie_break: str, max_revotes: int,
+               composition: Optional[RoleComposition] = None, bots: str = 'random',
+               bot_budget_ms: float = DEFAULT_BOT_BUDGET_MS) -> SimulationStats:
+    # runs inside a worker process and only sends the merged counters back
+    import handler
+    rules = VoteRules(max_revotes, TIE_BREAK_POLICIES[tie_break])
+    if engine == 'vectorized':
+        from providers.vectorized import role_codes, run_vectorized_simulations
+        return run_vectorized_simulations(role_codes(handler._init_players(composition)), games,
+                                          derive_game_seed(seed, first_game), rules=rules)
+
+    return handler.run_simulations(games, rules, seed, first_game, composition,
+                                   create_bot_policy(bots, bot_budget_ms, timed=False))
+
+def _get_chunks(games: int, chunk_size: int) -> List[Tuple[int, int]]:
+    return [(first_game, min(chunk_size, games - first_game)) for first_game in range(0, games, chunk_size)]
+
+def run_tournament(games: int, workers: int, seed: int, engine: str = 'objects', chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   tie_break: str = 'random', max_revotes: int = DEFAULT_MAX_REVOTES,
+                   progress: bool = False, composition: Optional[RoleComposition] = None, bots: str = 'random',
+                   bot_budget_ms: float = DEFAULT_BOT_BUDGET_MS) -> SimulationStats:
+    stats = SimulationStats()
+    chunks = _get_chunks(games, chunk_size)
+    if workers <= 1:
+        _init_worker()
+        for first_game, chunk_games in chunks:
+            stats.merge(_run_chunk(engine, first_game, chunk_games, seed, tie_break, max_revotes, composition,
+                                   bots, bot_budget_ms))
+        return stats
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = [executor.submit(_run_chunk, engine, first_game, chunk_games, seed, tie_break, max_revotes,
+                                   composition, bots, bot_budget_ms)
+                   for first_game, chunk_games in chunks]
+        for future in as_completed(futures):
+            stats.merge(future.result())
+            if progress:
+                print(f'{stats.games}/{games} games', file=sys.stderr)
+    return stats
+
+def _parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Play many werewolves games across all cores and report aggregated stats')
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=None, help='base seed, random when omitted')
+    parser.add_argument('--engine', choices=['objects', 'vectorized'], default='objects')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='games per worker task')
+    parser.add_argument('--tie-break', choices=sorted(TIE_BREAK_POLICIES), default='random')
+    parser.add_argument('--max-revotes', type=int, default=DEFAULT_MAX_REVOTES)
+    parser.add_argument('--players', type=int, help='players per game, the configured lobby when omitted')
+    parser.add_argument('--roles', help='role counts or ratios, e.g. Werewolf:0.14,Seer:1,Witch:1')
+    parser.add_argument('--allow-unbalanced', action='store_true', help='skip the balance points check')
+    parser.add_argument('--bots', choices=BOT_POLICIES, default='random', help='how the players decide')
+    parser.add_argument('--bot-budget-ms', type=float, default=DEFAULT_BOT_BUDGET_MS,
+                        help='budget per decision of the search bots, played as a fixed number of playouts '
+                             'so the report is reproducible from the seed')
+    parser.add_argument('--exact', action='store_true', help='also report the exact villagers win probability')
+    parser.add_argument('--output', help='write the report to this file instead of stdout')
+    parser.add_argument('--progress', action='store_true', help='print merged progress to stderr')
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = _parse_args(argv)
+    if args.games < 1 or args.chunk_size < 1 or args.workers < 1:
+        raise SystemExit('games, chunk size and workers must be positive')
+    if args.engine == 'vectorized' and args.bots != 'random':
+        raise SystemExit('the vectorized engine only plays random bots')
+
+    composition = None
+    if args.players is not None or args.roles is not None:
+        try:
+            composition = RoleComposition.parse(args.roles, args.players)
+            composition.validate(get_max_players(), None if args.allow_unbalanced else get_balance_tolerance())
+        except ValueError as error:
+            raise SystemExit(str(error))
+
+    try:
+        rules = VoteRules(args.max_revotes, TIE_BREAK_POLICIES[args.tie_break])
+    except ValueError as error:
+        raise SystemExit(str(error))
+
+    probability = None
+    if args.exact:
+        from providers.lobby import get_default_composition
+        from providers.solver import get_villagers_win_probability
+        try:
+            probability = get_villagers_win_probability(composition or get_default_composition(), rules)
+        except ValueError as error:
+            raise SystemExit(str(error))
+
+    seed = args.seed if args.seed is not None else random.getrandbits(32)
+    start = time.perf_counter()
+    stats = run_tournament(args.games, args.workers, seed, args.engine, args.chunk_size, args.tie_break,
+                           args.max_revotes, args.progress, composition, args.bots, args.bot_budget_ms)
+    elapsed = time.perf_counter() - start
+
+    report = stats.toJson()
+    report["run"] = {
+        "seed": seed,
+        "engine": args.engine,
+        "bots": args.bots,
+        "workers": args.workers,
+        "roles": composition.counts if composition else None,
+        "seconds": elapsed,
+        "games_per_second": stats.games / elapsed if elapsed > 0 else None,
+    }
+    if args.exact:
+        from providers.solver import cross_check
+        report["exact"] = cross_check(probability, stats.wins.get('Villagers', 0), stats.games)
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
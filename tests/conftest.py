@@ -0,0 +1,16 @@
+import os
+
+# the logger reads these when it is first imported: tests neither print the games nor write logs/werewolf.log
+os.environ['WEREWOLF_LOG_QUIET'] = '1'
+os.environ['WEREWOLF_LOG_FILE'] = ''
+
+from providers.lobby import build_roster
+from providers.objects import Game
+
+import handler
+
+def player_ids(players):
+    return [player.id for player in players]
+
+def play_game(seed: int, players: int = 30) -> Game:
+    return handler._run_game(Game(build_roster(players), seed=seed))
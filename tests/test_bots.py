@@ -0,0 +1,38 @@
+import json
+import handler
+from providers.lobby import RoleComposition
+from providers.mcts import MctsPolicy
+from providers.objects import Game
+
+def _play(policy: MctsPolicy, seed: int, players: int = 11) -> Game:
+    game = Game(handler._init_players(RoleComposition.parse(None, players)), seed=seed)
+    return handler._run_game(game, bots=policy)
+
+def test_untimed_search_replays_from_the_seed():
+    first = _play(MctsPolicy(5, timed=False), seed=3)
+    second = _play(MctsPolicy(5, timed=False), seed=3)
+    assert list(first.events.data) == list(second.events.data)
+
+def test_seeded_play_with_search_bots_replays():
+    event = {'queryStringParameters': {'bots': 'mcts', 'seed': '5', 'botBudgetMs': '2'}}
+    first, second = handler.play(event, None), handler.play(event, None)
+    assert first["statusCode"] == 200
+    assert json.loads(first["body"]) == json.loads(second["body"])
+
+def test_total_budget_is_shared_by_every_decision():
+    policy = MctsPolicy(5, timed=False, total_budget_ms=20)
+    _play(policy, seed=1)
+    assert policy.remaining_ms <= 0
+    # once it is spent the decisions are drawn without playouts
+    assert policy.last_rollouts == 0
+
+def test_timed_total_budget_runs_out():
+    policy = MctsPolicy(5, total_budget_ms=1)
+    _play(policy, seed=1)
+    assert policy.remaining_ms <= 0
+
+def test_search_bots_refuse_big_lobbies():
+    params = {'bots': 'mcts_villagers', 'players': str(handler.MAX_SEARCH_BOT_PLAYERS + 1)}
+    assert handler.play({'queryStringParameters': params}, None)["statusCode"] == 400
+    params['bots'] = 'suspicion'
+    assert handler.play({'queryStringParameters': params}, None)["statusCode"] == 200
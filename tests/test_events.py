@@ -0,0 +1,49 @@
+import pytest
+from conftest import play_game
+from providers.events import EVENT_FIELDS, NO_PLAYER, EventLog, EventType
+
+def _fields(event):
+    return (event.type, event.round, event.actor, event.target, event.value)
+
+def test_events_read_back_as_appended():
+    log = EventLog()
+    log.append(EventType.GameStarted, 0, value=11)
+    log.append(EventType.VoteCast, 1, 3, 7, 2)
+    assert len(log) == 2
+    assert _fields(log[0]) == (EventType.GameStarted, 0, NO_PLAYER, NO_PLAYER, 11)
+    assert _fields(log[1]) == (EventType.VoteCast, 1, 3, 7, 2)
+    assert _fields(log[-1]) == _fields(log[1])
+    assert [_fields(event) for event in log.since(1)] == [_fields(log[1])]
+    assert list(log.since(2)) == []
+    assert log.get_nbytes() == 2 * EVENT_FIELDS * log.data.itemsize
+
+@pytest.mark.parametrize('index', [2, 100, -3])
+def test_out_of_range_index_raises_index_error(index):
+    log = EventLog()
+    log.append(EventType.GameStarted, 0)
+    log.append(EventType.GameEnded, 3)
+    with pytest.raises(IndexError):
+        log[index]
+
+def test_empty_log():
+    log = EventLog()
+    assert len(log) == 0 and list(log) == [] and log.toJson() == []
+    with pytest.raises(IndexError):
+        log[0]
+    assert len(EventLog.from_bytes(log.to_bytes())) == 0
+
+def test_bytes_round_trip_keeps_a_played_game():
+    events = play_game(5).events
+    restored = EventLog.from_bytes(events.to_bytes())
+    assert len(restored) == len(events)
+    assert list(restored.data) == list(events.data)
+    assert restored.toJson() == events.toJson()
+    assert _fields(events[0])[0] == EventType.GameStarted and _fields(events[-1])[0] == EventType.GameEnded
+
+def test_history_getters_are_rebuilt_from_the_log():
+    game = play_game(6)
+    nights, days = game.get_night_results_history(), game.get_day_results_history()
+    assert len(nights) == sum(event.type == EventType.NightResolved for event in game.events)
+    assert len(days) == sum(event.type == EventType.DayResolved for event in game.events)
+    killed = [player for results in nights + days for player in results.killed_players]
+    assert sorted(player.id for player in killed) == sorted(player.id for player in game.players_dead)
@@ -0,0 +1,37 @@
+import pytest
+from benchmarks.load import SCENARIOS, Invocation, parse_mix, plan_requests, summarize
+
+def test_parse_mix():
+    assert parse_mix('single:8,big:1') == {'single': 8.0, 'big': 1.0}
+    assert parse_mix('seeded') == {'seeded': 1.0}
+    for mix in ('huge:1', 'single:0', 'single:-1'):
+        with pytest.raises(ValueError):
+            parse_mix(mix)
+
+def test_plans_are_reproducible():
+    mix = {'single': 8, 'seeded': 1, 'big': 1}
+    plan = plan_requests(mix, 500, seed=3)
+    assert plan == plan_requests(mix, 500, seed=3)
+    assert plan != plan_requests(mix, 500, seed=4)
+    assert len(plan) == 500
+    for number, (name, params) in enumerate(plan):
+        assert params == SCENARIOS[name](number)
+    counts = {name: sum(scenario == name for scenario, _ in plan) for name in mix}
+    assert 300 < counts['single'] < 500 and counts['seeded'] > 20 and counts['big'] > 20
+
+def test_summary_splits_cold_and_warm():
+    invocations = [Invocation('single', 200, 500.0, init_ms=400.0, cold=True, container_peak_kb=40 * 1024)]
+    invocations += [Invocation('single', 200, float(latency), container_peak_kb=50 * 1024) for latency in range(1, 101)]
+    invocations += [Invocation('big', 500, 10.0), Invocation('big', 0, 60000.0)]
+    summary = summarize(invocations, elapsed=2.0)
+    assert summary['requests'] == 103 and summary['errors'] == 2 and summary['cold_requests'] == 1
+    assert summary['requests_per_second'] == 101 / 2.0
+    assert summary['warm_p50_ms'] == 51.0 and summary['warm_p99_ms'] == 100.0
+    assert summary['cold_p50_ms'] == 500.0 and summary['init_p50_ms'] == 400.0
+    # errors don't count towards the latencies
+    assert summary['p99_ms'] == 100.0 and summary['p50_ms'] == 51.0
+    assert summary['container_peak_p50_mb'] == 50.0 and summary['container_peak_max_mb'] == 50.0
+
+def test_summary_of_failed_requests():
+    summary = summarize([Invocation('big', 500, 10.0)])
+    assert summary == {"requests": 1, "errors": 1, "cold_requests": 0}
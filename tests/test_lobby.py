@@ -0,0 +1,71 @@
+import pytest
+from providers.lobby import ROLES, RoleComposition, build_lobby, build_roster, get_default_composition
+
+def test_counts_without_players():
+    composition = RoleComposition.parse('Werewolf:3,Seer:1, Witch:1')
+    assert composition.counts == {'Werewolf': 3, 'Seer': 1, 'Witch': 1}
+    assert composition.get_players_count() == 5
+
+def test_villagers_fill_up_the_players():
+    composition = RoleComposition.parse('Werewolf:3,Seer:1', 11)
+    assert composition.counts == {'Werewolf': 3, 'Seer': 1, 'Villager': 7}
+
+def test_ratios_are_rounded_to_counts():
+    assert RoleComposition.parse('Werewolf:0.25,Seer:1', 20).counts == {'Werewolf': 5, 'Seer': 1, 'Villager': 14}
+    assert RoleComposition.parse('Werewolf:0.15', 100).counts == {'Werewolf': 15, 'Villager': 85}
+    # a ratio always gets at least one player, a whole float is a count
+    assert RoleComposition.parse('Werewolf:0.01', 10).counts == {'Werewolf': 1, 'Villager': 9}
+    assert RoleComposition.parse('Werewolf:2.0', 10).counts == {'Werewolf': 2, 'Villager': 8}
+
+@pytest.mark.parametrize('roles, players', [
+    ('Werewolf:0.2', None),
+    ('Werewolf:1.5', 10),
+    ('Werewolf:a', 10),
+    ('Werewolf:1/4', 10),
+    ('Werewolf:8,Seer:3', 10),
+    ('Werewolf:-1', None),
+    ('Dragon:1', 10),
+])
+def test_invalid_specs_are_refused(roles, players):
+    with pytest.raises(ValueError):
+        RoleComposition.parse(roles, players)
+
+def test_no_roles_is_the_default_or_balanced_lobby():
+    assert RoleComposition.parse(None).counts == get_default_composition().counts
+    assert RoleComposition.parse('', 30).counts == RoleComposition.balanced(30).counts
+
+@pytest.mark.parametrize('players', [8, 11, 20, 50, 333, 1000])
+def test_balanced_has_the_werewolves_closest_to_even(players):
+    composition = RoleComposition.balanced(players)
+    assert composition.get_players_count() == players
+    for name in ('Seer', 'Bodyguard', 'Witch'):
+        assert composition.counts[name] == 1
+    composition.validate()
+
+    def balance(werewolves):
+        return abs(RoleComposition.from_spec({**composition.counts, 'Werewolf': werewolves}, players).get_balance())
+    werewolves = composition.counts['Werewolf']
+    assert balance(werewolves) == min(balance(count) for count in range(1, players - 3))
+
+def test_balanced_keeps_a_werewolf_and_a_villager():
+    composition = RoleComposition.balanced(5)
+    assert composition.counts['Werewolf'] == 1 and composition.counts['Villager'] == 1
+
+def test_validate():
+    RoleComposition.parse('Werewolf:2,Seer:1', 9).validate()
+    with pytest.raises(ValueError):
+        RoleComposition.parse('Seer:2', 9).validate(tolerance=None)
+    with pytest.raises(ValueError):
+        RoleComposition.parse('Werewolf:0', 9).validate(tolerance=None)
+    with pytest.raises(ValueError):
+        RoleComposition.parse('Werewolf:5', 9).validate()
+    RoleComposition.parse('Werewolf:5', 9).validate(tolerance=None)
+    with pytest.raises(ValueError):
+        RoleComposition.balanced(101).validate(max_players=100)
+
+def test_lobby_follows_the_composition():
+    players = build_lobby(RoleComposition.parse('Werewolf:2,Seer:1', 5), ['Ann', 'Bob'])
+    assert [player.id for player in players] == [1, 2, 3, 4, 5]
+    assert [player.name for player in players] == ['Ann', 'Bob', 'Player 3', 'Player 4', 'Player 5']
+    assert [player.role for player in players] == [ROLES['Werewolf']] * 2 + [ROLES['Seer']] + [ROLES['Villager']] * 2
+    assert len(build_roster(1000)) == 1000
@@ -0,0 +1,42 @@
+import logging
+import threading
+from logs import logger as game_logging
+
+class _Recorder(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record: logging.LogRecord):
+        self.messages.append(record.getMessage())
+
+def test_suppressed_logging_only_silences_its_thread(monkeypatch):
+    recorder = _Recorder()
+    monkeypatch.setattr(game_logging.logger, 'handlers', [recorder])
+    monkeypatch.setattr(game_logging.logger, 'disabled', False)
+    suppressed, resume = threading.Event(), threading.Event()
+
+    def simulate():
+        with game_logging.suppressed_logging():
+            suppressed.set()
+            game_logging.get_game_logger('simulated').info('simulated game')
+            resume.wait()
+        game_logging.get_game_logger('simulated').info('after the simulation')
+
+    thread = threading.Thread(target=simulate)
+    thread.start()
+    suppressed.wait()
+    assert not game_logging.is_quiet()
+    game_logging.get_game_logger('played').info('played game')
+    resume.set()
+    thread.join()
+    assert recorder.messages == ['played game', 'after the simulation']
+
+def test_set_quiet_silences_every_thread(monkeypatch):
+    monkeypatch.setattr(game_logging.logger, 'disabled', False)
+    game_logging.set_quiet(True)
+    quiet = []
+    thread = threading.Thread(target=lambda: quiet.append(game_logging.is_quiet()))
+    thread.start()
+    thread.join()
+    assert quiet == [True]
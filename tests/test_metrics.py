@@ -0,0 +1,99 @@
+import io
+import json
+import pytest
+import handler
+from providers.lobby import build_roster
+from providers.metrics import (MAX_EMF_VALUES, TIMED_METHODS, VOTE_ROUNDS, EmfExporter, GameMetrics, PrometheusExporter,
+                               create_exporter, disable_metrics, enable_metrics)
+from providers.objects import Game
+
+HOOKED_METHODS = list(TIMED_METHODS.values()) + [name for names in VOTE_ROUNDS.values() for name in names] + ['end']
+
+@pytest.fixture
+def emf():
+    stream = io.StringIO()
+    enable_metrics(EmfExporter(stream, namespace='Test'))
+    yield stream
+    disable_metrics()
+
+def _lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+def test_hooks_are_installed_and_removed():
+    originals = {name: Game.__dict__[name] for name in HOOKED_METHODS}
+    enable_metrics(PrometheusExporter())
+    try:
+        for name in HOOKED_METHODS:
+            assert Game.__dict__[name] is not originals[name]
+            assert Game.__dict__[name].__wrapped__ is originals[name]
+        # enabling again replaces the hooks instead of wrapping them twice
+        enable_metrics(PrometheusExporter())
+        for name in HOOKED_METHODS:
+            assert Game.__dict__[name].__wrapped__ is originals[name]
+    finally:
+        disable_metrics()
+    for name in HOOKED_METHODS:
+        assert Game.__dict__[name] is originals[name]
+
+def test_one_emf_line_per_game(emf):
+    games = [handler._run_game(Game(build_roster(11), seed=seed)) for seed in range(3)]
+    lines = _lines(emf)
+    assert [line['game_id'] for line in lines] == [game.game_id for game in games]
+    for line, game in zip(lines, games):
+        (directive,) = line['_aws']['CloudWatchMetrics']
+        assert directive['Namespace'] == 'Test' and directive['Dimensions'] == [['Function']]
+        names = [definition['Name'] for definition in directive['Metrics']]
+        assert all(name in line for name in names)
+        assert 'process_night_actions_ms' in names and 'werewolf_vote_round_allocated_blocks' in names
+        assert line['process_night_actions_ms'] and all(value >= 0 for value in line['process_night_actions_ms'])
+        assert line['werewolf_revotes'] == game.werewolf_revotes
+        assert line['village_revotes'] == game.village_revotes
+        assert len(line['werewolf_vote_round_ms']) == game.night + game.werewolf_revotes
+
+def test_emf_values_are_capped():
+    metrics = GameMetrics('game')
+    for _ in range(MAX_EMF_VALUES + 20):
+        metrics.add('is_game_over', 0.001, 0)
+    line = EmfExporter(io.StringIO()).to_emf(metrics)
+    assert len(line['is_game_over_ms']) == MAX_EMF_VALUES
+
+def test_interleaved_games_keep_their_samples(emf):
+    first, second = Game(build_roster(11), seed=1), Game(build_roster(11), seed=2)
+    first.start()
+    second.start()
+    first.is_game_over()
+    for _ in range(3):
+        second.is_game_over()
+    second.end()
+    first.end()
+    lines = _lines(emf)
+    assert [line['game_id'] for line in lines] == [second.game_id, first.game_id]
+    assert [len(line['is_game_over_ms']) for line in lines] == [3, 1]
+
+def test_abandoned_game_samples_are_not_picked_up(emf):
+    # the abandoned game is freed, a new game may get its id(), but not its samples
+    for seed in range(20):
+        game = Game(build_roster(11), seed=seed)
+        game.start()
+        game.is_game_over()
+        del game
+    game = Game(build_roster(11), seed=99)
+    game.start()
+    game.end()
+    (line,) = _lines(emf)
+    assert line['game_id'] == game.game_id
+    assert 'is_game_over_ms' not in line
+
+def test_prometheus_totals():
+    exporter = create_exporter('prometheus')
+    enable_metrics(exporter)
+    try:
+        for seed in range(2):
+            handler._run_game(Game(build_roster(11), seed=seed))
+    finally:
+        disable_metrics()
+    text = exporter.render()
+    assert 'werewolves_games_total 2\n' in text
+    assert 'werewolves_phase_seconds_count{phase="process_night_actions"}' in text
+    with pytest.raises(ValueError):
+        create_exporter('statsd')
@@ -0,0 +1,115 @@
+import random
+import pytest
+from conftest import play_game, player_ids
+from providers.events import EventType, VoteKind
+from providers.lobby import build_roster
+from providers.objects import Game, VoteTally
+
+@pytest.mark.parametrize('players', [11, 100])
+def test_alive_lists_follow_the_deaths(players):
+    game = Game(build_roster(players), seed=1)
+    rng = random.Random(players)
+    victims = list(game.get_players_alive())
+    rng.shuffle(victims)
+    for victim in victims[:players - 1]:
+        assert game.kill_player(victim, 'Test') is None
+        alive = [player for player in game.players if player.is_alive]
+        assert player_ids(game.get_players_alive()) == player_ids(alive)
+        assert player_ids(game.get_werewolves()) == player_ids(player for player in alive if game.is_werewolf(player))
+        assert player_ids(game.get_villagers()) == player_ids(player for player in alive if not game.is_werewolf(player))
+        assert game.get_werewolves_count() == len(game.get_werewolves())
+        assert game.get_villagers_count() == len(game.get_villagers())
+        assert not game.is_player_alive(victim)
+
+def test_killing_a_dead_player_changes_nothing():
+    game = Game(build_roster(11), seed=1)
+    victim = game.get_villagers()[0]
+    game.kill_player(victim, 'Test')
+    alive, events = list(game.get_players_alive()), len(game.events)
+    game.kill_player(victim, 'Test')
+    assert game.get_players_alive() == alive
+    assert len(game.events) == events
+    assert game.players_dead == [victim]
+
+def test_players_with_other_ids():
+    players = build_roster(11)
+    for player in players:
+        player.id += 100
+    game = Game(players, seed=1)
+    game.kill_player(players[5], 'Test')
+    game.kill_player(players[0], 'Test')
+    assert player_ids(game.get_players_alive()) == player_ids(players[1:5] + players[6:])
+    assert game.get_player(106) is players[5]
+    assert game.get_player(5) is None
+
+def test_alive_lists_are_not_changed_by_later_deaths():
+    game = Game(build_roster(11), seed=1)
+    alive, villagers, werewolves = game.get_players_alive(), game.get_villagers(), game.get_werewolves()
+    game.kill_player(villagers[0], 'Test')
+    game.kill_player(werewolves[-1], 'Test')
+    assert len(alive) == 11 and len(villagers) == 7 and len(werewolves) == 4
+    alive.clear()
+    assert len(game.get_players_alive()) == 9
+
+def test_players_vote_in_roster_order():
+    game = play_game(4)
+    votes = []
+    for event in game.events:
+        if event.type == EventType.VoteStarted:
+            votes.append([])
+        elif event.type == EventType.VoteCast:
+            votes[-1].append(event.actor)
+    assert len(votes) > 2
+    assert all(voters == sorted(voters) for voters in votes)
+
+def _counts(votes):
+    return [(vote.player.id, vote.votes) for vote in votes]
+
+def test_tally_leader_and_ties_follow_withdrawn_and_recast_votes():
+    players = build_roster(6)
+    tally = VoteTally()
+    assert tally.get_highest_votes() == [] and tally.get_leader() is None and not tally.is_tie()
+    assert tally.add(players[0], players[4])
+    assert tally.add(players[1], players[3])
+    assert not tally.add(players[1], players[4])
+    # players[4] got their first vote before players[3], so they come first in the tie
+    assert tally.is_tie() and tally.get_leader() is None
+    assert _counts(tally.get_highest_votes()) == [(5, 1), (4, 1)]
+    assert tally.add(players[2], players[3])
+    assert tally.get_leader().player is players[3] and not tally.is_tie()
+    assert not tally.remove(players[2], players[4])
+    assert tally.remove(players[2], players[3])
+    assert tally.is_tie() and tally.get_target(players[2]) is None
+    assert tally.add(players[2], players[4])
+    assert tally.get_leader().player is players[4]
+    assert _counts(tally.get_votes()) == [(5, 2), (4, 1)]
+    assert tally.remove(players[1], players[3])
+    assert len(tally) == 1 and _counts(tally.get_votes()) == [(5, 2)]
+    tally.remove(players[0], players[4])
+    tally.remove(players[2], players[4])
+    assert len(tally) == 0 and tally.get_highest_votes() == [] and tally.get_leader() is None
+
+@pytest.mark.parametrize('seed', range(5))
+def test_tally_matches_a_recount(seed):
+    rng = random.Random(seed)
+    players = build_roster(12)
+    tally = VoteTally()
+    targets = {}
+    for _ in range(2000):
+        voter = rng.choice(players)
+        if voter in targets and rng.random() < 0.6:
+            assert tally.remove(voter, targets.pop(voter))
+        else:
+            victim = rng.choice(players)
+            assert tally.add(voter, victim) == (voter not in targets)
+            targets.setdefault(voter, victim)
+        recount = {}
+        for victim in targets.values():
+            recount[victim.id] = recount.get(victim.id, 0) + 1
+        highest = max(recount.values(), default=0)
+        leaders = sorted(id for id, votes in recount.items() if votes == highest)
+        assert sorted(vote.player.id for vote in tally.get_highest_votes()) == leaders
+        assert sorted(_counts(tally.get_votes())) == sorted(recount.items())
+        assert tally.is_tie() == (len(leaders) > 1)
+        leader = tally.get_leader()
+        assert (leader.player.id if leader else None) == (leaders[0] if len(leaders) == 1 else None)
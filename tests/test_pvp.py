@@ -0,0 +1,115 @@
+import asyncio
+import time
+import pytest
+import handler
+from providers.objects import Game, RoleAction
+from providers.pvp import PhaseTimeouts, PvpGame
+
+def _new_game(humans, timeouts: PhaseTimeouts, seed: int = 1) -> PvpGame:
+    game = Game(handler._init_players(), seed=seed)
+    game.start()
+    return PvpGame(game, [player.id for player in humans(game)], timeouts=timeouts)
+
+async def _next_request(pvp: PvpGame, player_id: int, action: RoleAction):
+    # what a client polling get_pending_actions sees
+    while True:
+        for request in pvp.get_pending_actions(player_id):
+            if request.action == action:
+                return request
+        await asyncio.sleep(0)
+
+def test_witch_is_asked_to_save_the_werewolves_victim():
+    async def play():
+        pvp = _new_game(lambda game: game.get_werewolves() + [game.get_witch()], PhaseTimeouts(5, 5, 5))
+        game = pvp.game
+        werewolves, witch = game.get_werewolves(), game.get_witch()
+        target = game.get_villagers()[0] if game.get_villagers()[0] != witch else game.get_villagers()[1]
+        night = asyncio.ensure_future(pvp.play_night())
+        for werewolf in werewolves:
+            await _next_request(pvp, werewolf.id, RoleAction.Kill)
+        # nobody is dying yet, so there is nothing to ask the witch
+        assert [request.action for request in pvp.get_pending_actions(witch.id)] == [RoleAction.Kill]
+        for werewolf in werewolves:
+            pvp.submit(werewolf.id, RoleAction.Kill, target.id)
+
+        save = await _next_request(pvp, witch.id, RoleAction.Save)
+        assert save.subject == target
+        assert save.toJson()["subject"] == target.id
+        pvp.submit(witch.id, RoleAction.Save, True)
+        pvp.submit(witch.id, RoleAction.Kill, None)
+        await night
+        return game
+
+    game = asyncio.run(play())
+    results = game.last_night_results
+    assert results.did_witch_save_werewolf_victim
+    assert results.killed_players == []
+    assert game.is_witch_save_potion_used() and not game.is_witch_kill_potion_used()
+
+def test_day_vote_of_simulated_clients():
+    async def play():
+        pvp = _new_game(lambda game: game.players, PhaseTimeouts(5, 5, 5))
+        game = pvp.game
+        target = game.get_werewolves()[0]
+        day_actions = game.new_day()
+
+        async def client(player):
+            await _next_request(pvp, player.id, RoleAction.Vote)
+            victim = target if player != target else game.get_villagers()[0]
+            pvp.submit(player.id, RoleAction.Vote, victim.id)
+
+        await asyncio.gather(pvp.play_day(day_actions), *(client(player) for player in game.get_players_alive()))
+        return game, target
+
+    game, target = asyncio.run(play())
+    assert game.last_day_results.killed_players == [target]
+    assert not target.is_alive
+
+def test_unanswered_actions_are_drawn_after_the_timeout():
+    async def play():
+        pvp = _new_game(lambda game: game.players, PhaseTimeouts(0.01, 0.01, 0.01))
+        await pvp.play()
+        return pvp
+
+    pvp = asyncio.run(play())
+    assert pvp.game.winning_side is not None
+    assert not any(pvp.get_pending_actions(player.id) for player in pvp.game.players)
+
+def test_late_action_is_refused():
+    async def play():
+        pvp = _new_game(lambda game: game.get_werewolves(), PhaseTimeouts(0.01, 0.01, 0.01))
+        werewolf = pvp.game.get_werewolves()[0]
+        await pvp.play_night()
+        with pytest.raises(ValueError):
+            pvp.submit(werewolf.id, RoleAction.Kill, pvp.game.get_villagers()[0].id)
+
+    asyncio.run(play())
+
+def test_invalid_target_is_refused():
+    async def play():
+        pvp = _new_game(lambda game: game.get_werewolves(), PhaseTimeouts(0.01, 0.01, 0.01))
+        werewolves = pvp.game.get_werewolves()
+        night = asyncio.ensure_future(pvp.play_night())
+        await _next_request(pvp, werewolves[0].id, RoleAction.Kill)
+        with pytest.raises(ValueError):
+            pvp.submit(werewolves[0].id, RoleAction.Kill, werewolves[1].id)
+        await night
+
+    asyncio.run(play())
+
+def test_disconnected_player_is_not_waited_for():
+    async def play():
+        pvp = _new_game(lambda game: game.get_werewolves()[:1], PhaseTimeouts(30, 30, 30))
+        werewolf = pvp.game.get_werewolves()[0]
+        night = asyncio.ensure_future(pvp.play_night())
+        await _next_request(pvp, werewolf.id, RoleAction.Kill)
+        pvp.disconnect(werewolf.id)
+        start = time.perf_counter()
+        await night
+        # the bots voted in the player's place, without waiting for the night to end
+        assert time.perf_counter() - start < 5
+        assert not pvp.is_human(werewolf)
+        return pvp.game
+
+    game = asyncio.run(play())
+    assert game.last_night_results.werewolf_victim is not None
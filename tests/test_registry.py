@@ -0,0 +1,84 @@
+import handler
+from providers.lobby import build_roster
+from providers.objects import Game
+from providers.registry import GameRegistry, estimate_game_size
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _new_game(players: int = 11, seed: int = 1) -> Game:
+    return Game(build_roster(players), seed=seed)
+
+def test_add_and_remove():
+    registry = GameRegistry(sizeof=lambda game: 100)
+    game = _new_game()
+    game_id = registry.add(game)
+    assert game_id == game.game_id
+    assert game_id in registry and registry.get(game_id) is game
+    assert registry.get_stats() == {"games": 1, "memory_bytes": 100}
+    assert registry.remove(game_id) is game
+    assert game_id not in registry and registry.get(game_id) is None
+    assert registry.remove(game_id) is None
+    assert registry.get_stats() == {"games": 0, "memory_bytes": 0}
+
+def test_adding_an_id_again_replaces_the_game():
+    registry = GameRegistry(sizeof=lambda game: 100)
+    first, second = _new_game(), _new_game()
+    registry.add(first, 'game')
+    registry.add(second, 'game')
+    assert registry.get('game') is second
+    assert registry.get_stats() == {"games": 1, "memory_bytes": 100}
+
+def test_least_recently_used_games_are_evicted_first():
+    registry = GameRegistry(max_games=2, sizeof=lambda game: 100)
+    games = [_new_game(seed=seed) for seed in range(3)]
+    registry.add(games[0], 'a')
+    registry.add(games[1], 'b')
+    registry.get('a')
+    registry.add(games[2], 'c')
+    assert 'a' in registry and 'b' not in registry and 'c' in registry
+
+def test_games_are_evicted_over_the_memory_budget():
+    registry = GameRegistry(max_memory_bytes=250, sizeof=lambda game: len(game.players) * 10)
+    registry.add(_new_game(11), 'a')
+    registry.add(_new_game(11), 'b')
+    registry.add(_new_game(11), 'c')
+    assert len(registry) == 2 and 'a' not in registry
+    # the newest game stays even when it alone is over the budget
+    registry.add(_new_game(30), 'd')
+    assert len(registry) == 1 and 'd' in registry
+    assert registry.get_stats()["memory_bytes"] == 300
+
+def test_idle_games_expire():
+    clock = Clock()
+    registry = GameRegistry(idle_ttl_seconds=10, sizeof=lambda game: 100, clock=clock)
+    registry.add(_new_game(), 'a')
+    clock.now = 5
+    registry.add(_new_game(), 'b')
+    clock.now = 12
+    assert registry.evict_expired() == 1
+    assert 'a' not in registry and 'b' in registry
+    clock.now = 30
+    assert registry.get('b') is None
+    assert registry.get_stats() == {"games": 0, "memory_bytes": 0}
+
+def test_touch_measures_the_game_again():
+    sizes = {}
+    registry = GameRegistry(sizeof=lambda game: sizes.get(game, 100))
+    game = _new_game()
+    registry.add(game, 'a')
+    sizes[game] = 400
+    assert registry.touch('a')
+    assert registry.get_stats()["memory_bytes"] == 400
+    assert not registry.touch('missing')
+
+def test_new_games_are_charged_their_measured_size():
+    game = _new_game(12)
+    assert estimate_game_size(game) == game.memory_footprint()
+    assert estimate_game_size(_new_game(12, seed=2)) == game.memory_footprint()
+    played = handler._run_game(game)
+    assert estimate_game_size(played) == played.memory_footprint() > estimate_game_size(_new_game(12))
@@ -0,0 +1,33 @@
+import json
+import pytest
+import handler
+from conftest import play_game, player_ids
+from providers.replay import copy_roster, find_round_start, replay_game
+
+@pytest.mark.parametrize('seed', range(10))
+def test_same_seed_plays_the_same_game(seed):
+    first, second = play_game(seed), play_game(seed)
+    assert list(first.events.data) == list(second.events.data)
+    assert player_ids(first.winners) == player_ids(second.winners)
+
+def test_seeded_play_requests_are_reproducible():
+    event = {'queryStringParameters': {'seed': '42', 'players': '25'}}
+    assert json.loads(handler.play(event, None)['body']) == json.loads(handler.play(event, None)['body'])
+
+@pytest.mark.parametrize('seed', range(10))
+def test_replaying_the_whole_log_rebuilds_the_game(seed):
+    game = play_game(seed)
+    replayed = replay_game(copy_roster(game.players), seed, game.events, game_id=game.game_id)
+    assert player_ids(replayed.players_dead) == player_ids(game.players_dead)
+    assert player_ids(replayed.get_players_alive()) == player_ids(game.get_players_alive())
+    assert replayed.winning_side == game.winning_side
+    assert list(replayed.events.data) == list(game.events.data)
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('night', [1, 2, 3])
+def test_replay_resumes_at_a_round_boundary(seed, night):
+    game = play_game(seed)
+    until = find_round_start(game.events, night)
+    resumed = handler._resume_game(replay_game(copy_roster(game.players), seed, game.events, until))
+    assert list(resumed.events.data) == list(game.events.data)
+    assert player_ids(resumed.winners) == player_ids(game.winners)
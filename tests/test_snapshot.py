@@ -0,0 +1,83 @@
+import pytest
+import handler
+from conftest import player_ids
+from providers.lobby import build_roster
+from providers.objects import Game, Player
+from providers.snapshot import SnapshotError, restore_game, snapshot_game
+
+def _play_phases(game: Game, phases: int):
+    game.start()
+    played = handler._iter_phases(game)
+    for _ in range(phases):
+        next(played)
+    return played
+
+def test_round_trip_keeps_the_game():
+    game = Game(build_roster(40), seed=3)
+    _play_phases(game, 2)
+    game.start_new_village_vote()
+    voters = game.get_players_alive()
+    game.add_village_vote(voters[0], voters[1])
+    game.add_village_vote(voters[2], voters[1])
+
+    restored = restore_game(snapshot_game(game))
+
+    assert restored.game_id == game.game_id
+    assert restored.seed == game.seed
+    assert (restored.day, restored.night) == (game.day, game.night)
+    assert bytes(restored.alive_mask) == bytes(game.alive_mask)
+    assert player_ids(restored.players_dead) == player_ids(game.players_dead)
+    assert player_ids(restored.get_players_alive()) == player_ids(game.get_players_alive())
+    assert player_ids(restored.get_villagers()) == player_ids(game.get_villagers())
+    assert player_ids(restored.get_werewolves()) == player_ids(game.get_werewolves())
+    assert restored.get_werewolves_count() == game.get_werewolves_count()
+    assert [(vote.player.id, vote.votes) for vote in restored.get_highest_village_votes()] == \
+        [(vote.player.id, vote.votes) for vote in game.get_highest_village_votes()]
+    assert list(restored.events.data) == list(game.events.data)
+    assert snapshot_game(restored) == snapshot_game(game)
+
+@pytest.mark.parametrize('seed', range(20))
+def test_restored_game_plays_on_like_the_original(seed):
+    game = Game(build_roster(30), seed=seed)
+    played = _play_phases(game, 2)
+    restored = restore_game(snapshot_game(game))
+
+    for _ in played:
+        pass
+    handler._resume_game(restored)
+
+    assert list(restored.events.data) == list(game.events.data)
+    assert restored.winning_side == game.winning_side
+
+def test_truncated_snapshot_is_refused():
+    snapshot = snapshot_game(Game(build_roster(11), seed=1))
+    with pytest.raises(SnapshotError):
+        restore_game(snapshot[:len(snapshot) // 2])
+
+def test_snapshot_with_another_magic_is_refused():
+    snapshot = snapshot_game(Game(build_roster(11), seed=1))
+    with pytest.raises(SnapshotError):
+        restore_game(b'XXX' + snapshot[3:])
+
+def test_round_trip_keeps_the_seer_investigation():
+    game = Game(build_roster(11), seed=2)
+    _play_phases(game, 1)
+    investigated = game.last_night_results.seer_investigated_player
+    assert investigated is not None
+    restored = restore_game(snapshot_game(game)).last_night_results
+    assert restored.seer_investigated_player.id == investigated.id
+    assert restored.did_seer_find_werewolf == game.last_night_results.did_seer_find_werewolf
+
+def test_snapshot_with_undecodable_names_is_refused():
+    game = Game(build_roster(11), seed=1)
+    snapshot = snapshot_game(game)
+    name = game.players[0].name.encode()
+    with pytest.raises(SnapshotError):
+        restore_game(snapshot.replace(name, b'\xff' + name[1:], 1))
+
+def test_snapshot_with_an_unknown_player_is_refused():
+    game = Game(build_roster(11), seed=1)
+    _play_phases(game, 1)
+    game.last_night_results.actions.bodyguard_saved_player = Player(999, 'Stranger', game.players[0].role)
+    with pytest.raises(SnapshotError):
+        restore_game(snapshot_game(game))
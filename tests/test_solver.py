@@ -0,0 +1,54 @@
+import json
+import sys
+import pytest
+import handler
+import simulate
+from providers.lobby import get_default_composition
+from providers.solver import MAX_EXACT_PLAYERS, _split, _vote, get_villagers_win_probability
+from providers.voting import MAX_REVOTES, TIE_BREAK_POLICIES, VoteRules
+
+@pytest.mark.parametrize('no_kill', [False, True])
+def test_revotes_deeper_than_the_recursion_limit(no_kill):
+    deep = _vote(8, 4, 4, 8, sys.getrecursionlimit() * 2, no_kill)
+    assert deep == pytest.approx(_vote(8, 4, 4, 8, MAX_REVOTES, no_kill), abs=1e-12)
+
+def test_a_vote_without_voters_stays_tied():
+    assert _vote(0, 0, 0, 3, 50, True) == (0.0, 0.0)
+    assert _vote(0, 0, 1, 2, 50, False) == pytest.approx((1 / 3, 2 / 3))
+
+@pytest.mark.parametrize('no_kill', [False, True])
+def test_vote_probabilities_add_up(no_kill):
+    werewolf_out, villager_out = _vote(6, 3, 3, 6, 10, no_kill)
+    assert 0 < werewolf_out + villager_out <= 1 + 1e-12
+    if not no_kill:
+        assert werewolf_out + villager_out == pytest.approx(1)
+
+@pytest.mark.parametrize('tie_break', ['random', 'no_kill'])
+def test_most_revotes_allowed(tie_break):
+    probability = get_villagers_win_probability(get_default_composition(),
+                                                VoteRules(MAX_REVOTES, TIE_BREAK_POLICIES[tie_break]))
+    assert 0 < probability < 1
+
+def test_exact_simulation_with_too_many_revotes_is_refused():
+    params = {'games': '10', 'exact': '1', 'maxRevotes': '5000'}
+    assert handler.simulate({'queryStringParameters': params}, None)["statusCode"] == 400
+
+def test_exact_simulation_with_most_revotes():
+    params = {'games': '10', 'exact': '1', 'maxRevotes': str(MAX_REVOTES), 'seed': '1'}
+    response = handler.simulate({'queryStringParameters': params}, None)
+    assert response["statusCode"] == 200
+    assert 0 < json.loads(response["body"])["exact"]["villagers_win_probability"] < 1
+
+def test_simulate_cli_refuses_too_many_revotes():
+    with pytest.raises(SystemExit):
+        simulate.main(['--games', '10', '--exact', '--max-revotes', '5000'])
+
+def test_larger_lobbies_are_refused():
+    params = {'games': '10', 'exact': '1', 'players': str(MAX_EXACT_PLAYERS + 1)}
+    response = handler.simulate({'queryStringParameters': params}, None)
+    assert response["statusCode"] == 400
+    assert str(MAX_EXACT_PLAYERS) in json.loads(response["body"])["error"]
+
+@pytest.mark.parametrize('n, k', [(0, 3), (1, 1), (7, 3), (12, 5), (20, 20), (30, 4)])
+def test_vote_splits_add_up(n, k):
+    assert sum(probability for _, _, probability in _split(n, k)) == pytest.approx(1)
@@ -0,0 +1,114 @@
+import threading
+import pytest
+from providers.lobby import build_roster
+from providers.objects import Game
+from providers.sharding import HashRing, ShardedStateStore
+from providers.store import (NO_VERSION, FileStateStore, MemoryStateStore, SqliteStateStore, VersionConflictError,
+                             create_state_store)
+
+@pytest.fixture(params=['memory', 'file', 'sqlite', 'sharded'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryStateStore()
+    if request.param == 'file':
+        return FileStateStore(str(tmp_path / 'games'))
+    if request.param == 'sqlite':
+        return SqliteStateStore(str(tmp_path / 'games.db'))
+    return create_state_store(';'.join(f'sqlite:{tmp_path / f"shard{shard}.db"}' for shard in range(3)))
+
+def _new_game(store) -> Game:
+    game = Game(build_roster(11), seed=1)
+    game.start()
+    game.start_new_village_vote()
+    store.save_game(game)
+    return game
+
+def test_unknown_game_has_no_version(store):
+    assert store.get_versioned('missing') == (None, NO_VERSION)
+
+def test_compare_and_swap_bumps_the_version(store):
+    assert store.compare_and_swap('game', NO_VERSION, b'first') == 1
+    assert store.compare_and_swap('game', 1, b'second') == 2
+    assert store.get_versioned('game') == (b'second', 2)
+
+def test_compare_and_swap_refuses_a_stale_version(store):
+    store.compare_and_swap('game', NO_VERSION, b'first')
+    store.compare_and_swap('game', 1, b'second')
+    assert store.compare_and_swap('game', 1, b'stale') is None
+    assert store.get_versioned('game') == (b'second', 2)
+
+def test_only_one_new_game_wins(store):
+    assert store.compare_and_swap('game', NO_VERSION, b'first') == 1
+    assert store.compare_and_swap('game', NO_VERSION, b'second') is None
+    assert store.get('game') == b'first'
+
+def test_put_writes_over_any_version(store):
+    assert store.put('game', b'first') == 1
+    assert store.put('game', b'second') == 2
+    store.delete('game')
+    assert store.get_versioned('game') == (None, NO_VERSION)
+
+def test_update_game_retries_on_a_concurrent_write(store):
+    game = _new_game(store)
+    voter, other, victim = game.players[0], game.players[1], game.players[2]
+    attempts = []
+
+    def vote(stored: Game) -> bool:
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            # another container votes between this read and its write
+            store.update_game(game.game_id, lambda concurrent: concurrent.add_village_vote(other, victim))
+        return stored.add_village_vote(stored.get_player(voter.id), stored.get_player(victim.id))
+
+    assert store.update_game(game.game_id, vote)
+    assert len(attempts) == 2
+    assert store.conflicts == 1
+    assert store.load_game(game.game_id).get_highest_village_votes()[0].votes == 2
+
+def test_update_game_gives_up(store):
+    game = _new_game(store)
+
+    def always_stale(stored: Game):
+        store.put(game.game_id, store.get(game.game_id))
+
+    with pytest.raises(VersionConflictError):
+        store.update_game(game.game_id, always_stale, max_retries=3)
+    assert store.conflicts == 4
+
+def test_update_game_of_an_unknown_game(store):
+    with pytest.raises(ValueError):
+        store.update_game('missing', lambda game: None)
+
+def test_concurrent_votes_are_never_lost(store):
+    game = _new_game(store)
+    victim = game.players[0]
+
+    def vote(voter_id: int):
+        store.update_game(game.game_id, lambda stored: stored.add_village_vote(stored.get_player(voter_id),
+                                                                               stored.get_player(victim.id)))
+
+    threads = [threading.Thread(target=vote, args=(player.id,)) for player in game.players[1:]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.load_game(game.game_id).get_highest_village_votes()[0].votes == len(game.players) - 1
+
+def test_sharded_store_keeps_a_game_on_one_shard():
+    shards = {f'shard{shard}': MemoryStateStore() for shard in range(4)}
+    store = ShardedStateStore(shards)
+    for number in range(100):
+        store.put(f'game{number}', b'snapshot')
+    assert sum(len(shard.snapshots) for shard in shards.values()) == 100
+    assert all(shard.snapshots for shard in shards.values())
+    for number in range(100):
+        assert f'game{number}' in store.get_shard(f'game{number}').snapshots
+
+def test_adding_a_node_only_moves_games_to_it():
+    ring = HashRing(['a', 'b', 'c'])
+    keys = [f'game{number}' for number in range(2000)]
+    before = {key: ring.get_node(key) for key in keys}
+    ring.add_node('d')
+    moved = [key for key in keys if ring.get_node(key) != before[key]]
+    assert all(ring.get_node(key) == 'd' for key in moved)
+    assert 0.1 < len(moved) / len(keys) < 0.4
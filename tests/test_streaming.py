@@ -0,0 +1,77 @@
+import json
+import pytest
+import handler
+from providers.objects import Game
+from providers.streaming import CONTENT_TYPES, NDJSON, SSE, get_stream_format
+
+def _stream(params: dict, headers=None) -> dict:
+    return handler.play_stream({'queryStringParameters': params, 'headers': headers}, None)
+
+def _check_phases(messages):
+    assert messages[0]['type'] == 'start' and messages[-1]['type'] == 'end'
+    phases = [message['type'] for message in messages[1:-1]]
+    assert phases == ['night', 'day'] * (len(phases) // 2) + ['night'] * (len(phases) % 2)
+    # the game starts on day 1, so the day after night n is day n + 1
+    for index, message in enumerate(messages[1:-1]):
+        assert message['round'] == index // 2 + 1 + (message['type'] == 'day')
+        assert message['results'] is not None
+
+def test_ndjson_is_one_message_per_line():
+    response = _stream({'seed': '7'})
+    assert response['statusCode'] == 200
+    assert response['headers']['Content-Type'] == CONTENT_TYPES[NDJSON]
+    body = response['body']
+    assert body.endswith('\n') and '\n\n' not in body
+    messages = [json.loads(line) for line in body.splitlines()]
+    _check_phases(messages)
+
+    # the phases carry every event of the game, once, in order
+    game = handler._run_game(Game(handler._init_players(), seed=7))
+    assert [event for message in messages for event in message['events']] == game.events.toJson()
+    assert messages[0]['players'] == [{"id": player.id, "name": player.name, "role": player.role.name}
+                                      for player in game.players]
+    assert messages[-1]['winners'] == json.loads(handler.play({'queryStringParameters': {'seed': '7'}}, None)['body'])['winners']
+
+def test_sse_frames_name_their_event():
+    response = _stream({'seed': '7', 'format': 'sse'})
+    assert response['headers']['Content-Type'] == CONTENT_TYPES[SSE]
+    body = response['body']
+    assert body.endswith('\n\n')
+    messages = []
+    for frame in body[:-2].split('\n\n'):
+        event, data = frame.split('\n')
+        assert event.startswith('event: ') and data.startswith('data: ')
+        message = json.loads(data[len('data: '):])
+        assert event[len('event: '):] == message['type']
+        messages.append(message)
+    _check_phases(messages)
+    ndjson = [json.loads(line) for line in _stream({'seed': '7'})['body'].splitlines()]
+    # the same game, except for its random game id
+    assert messages[0].pop('game_id') != ndjson[0].pop('game_id')
+    assert messages == ndjson
+
+@pytest.mark.parametrize('params, headers, expected', [
+    ({}, None, NDJSON),
+    ({}, {'Accept': 'application/json'}, NDJSON),
+    ({}, {'accept': 'text/html, text/event-stream'}, SSE),
+    ({'format': 'ndjson'}, {'Accept': 'text/event-stream'}, NDJSON),
+    ({'format': 'sse'}, None, SSE),
+])
+def test_stream_format(params, headers, expected):
+    assert get_stream_format(params, headers) == expected
+
+def test_unknown_format_is_refused():
+    with pytest.raises(ValueError):
+        get_stream_format({'format': 'xml'})
+    response = _stream({'format': 'xml'})
+    assert response['statusCode'] == 400 and 'format' in json.loads(response['body'])['error']
+
+def test_stream_starts_when_first_read():
+    stream_format, chunks = handler.open_stream({'queryStringParameters': {'seed': '3'}})
+    assert stream_format == NDJSON
+    games = len(handler.registry)
+    assert json.loads(next(chunks))['type'] == 'start'
+    assert len(handler.registry) == games + 1
+    for _ in chunks:
+        pass
+    assert len(handler.registry) == games
@@ -0,0 +1,80 @@
+import random
+import handler
+from conftest import play_game
+from providers.events import EventType, VoteKind
+from providers.lobby import build_roster
+from providers.objects import Game, RoleAction
+from providers.timeline import ActionTimeline
+
+def _scan_ballots(events):
+    # every ballot as (kind, round, number, votes), straight from the events
+    ballots, open_ballots, numbers = [], {}, {}
+    for event in events:
+        if event.type == EventType.VoteStarted:
+            number = numbers[event.value, event.round] = numbers.get((event.value, event.round), -1) + 1
+            open_ballots[event.value] = (event.value, event.round, number, {})
+            ballots.append(open_ballots[event.value])
+        elif event.type == EventType.VoteCast:
+            open_ballots[event.value][3][event.actor] = event.target
+        elif event.type == EventType.VoteRemoved and open_ballots[event.value][3].get(event.actor) == event.target:
+            del open_ballots[event.value][3][event.actor]
+    return ballots
+
+def _scan_voted_with(ballots, player_id, kind=None):
+    together = {}
+    for ballot_kind, _, _, votes in ballots:
+        if player_id not in votes or kind not in (None, ballot_kind):
+            continue
+        for voter, target in votes.items():
+            if voter != player_id and target == votes[player_id]:
+                together[voter] = together.get(voter, 0) + 1
+    return together
+
+def _check_against_scan(game: Game):
+    timeline = game.timeline
+    ballots = _scan_ballots(game.events)
+    assert len(timeline.ballots) == len(ballots)
+    for kind, round, number, votes in ballots:
+        assert timeline.get_vote_matrix(kind, round, number) == votes
+    for kind, round in {(kind, round) for kind, round, _, _ in ballots}:
+        last = [votes for ballot_kind, ballot_round, _, votes in ballots if (ballot_kind, ballot_round) == (kind, round)][-1]
+        assert timeline.get_vote_matrix(kind, round) == last
+    for player in game.players:
+        assert timeline.get_voted_with(player.id) == _scan_voted_with(ballots, player.id)
+        for kind in (VoteKind.Werewolves, VoteKind.Village):
+            assert timeline.get_voted_with(player.id, kind) == _scan_voted_with(ballots, player.id, kind)
+
+def test_queries_match_a_scan_of_the_events():
+    for seed in range(300):
+        _check_against_scan(play_game(seed, players=11 + seed % 20))
+
+def test_withdrawn_votes_leave_the_matrix():
+    game = Game(build_roster(11), seed=1)
+    game.start()
+    rng = random.Random(1)
+    alive = game.get_players_alive()
+    game.start_new_village_vote()
+    for _ in range(200):
+        voter, target = rng.choice(alive), rng.choice(alive)
+        if rng.random() < 0.5:
+            game.add_village_vote(voter, target)
+        else:
+            game.remove_village_vote(voter, game.village_tally.get_target(voter) or target)
+    _check_against_scan(game)
+    # withdrawn votes are dropped from the voters' actions too
+    votes = game.timeline.get_vote_matrix(VoteKind.Village, game.night)
+    for player in alive:
+        cast = [action.target for action in game.timeline.get_actions(player.id) if action.action == RoleAction.Vote]
+        assert cast == ([votes[player.id]] if player.id in votes else [])
+
+def test_index_grows_with_the_game():
+    game = Game(build_roster(20), seed=4)
+    game.start()
+    for _ in handler._iter_phases(game):
+        _check_against_scan(game)
+    fresh = ActionTimeline(game.events)
+    fresh.update()
+    for player in game.players:
+        assert fresh.get_voted_with(player.id) == game.timeline.get_voted_with(player.id)
+        assert [(action.action, action.target, action.round) for action in fresh.get_actions(player.id)] == \
+            [(action.action, action.target, action.round) for action in game.timeline.get_actions(player.id)]
@@ -0,0 +1,61 @@
+import json
+import math
+import pytest
+import handler
+from providers.voting import DEFAULT_MAX_REVOTES, MAX_REVOTES, TIE_BREAK_POLICIES, VoteRules
+
+def test_default_rules():
+    rules = VoteRules.from_params({})
+    assert rules.max_revotes == DEFAULT_MAX_REVOTES
+    assert rules.tie_break is TIE_BREAK_POLICIES['random']
+
+@pytest.mark.parametrize('max_revotes', [0, 1, MAX_REVOTES])
+def test_revotes_within_bounds(max_revotes):
+    assert VoteRules.from_params({'maxRevotes': str(max_revotes)}).max_revotes == max_revotes
+
+@pytest.mark.parametrize('max_revotes', [-1, MAX_REVOTES + 1, 5000])
+def test_revotes_out_of_bounds(max_revotes):
+    with pytest.raises(ValueError):
+        VoteRules(max_revotes)
+    with pytest.raises(ValueError):
+        VoteRules.from_params({'maxRevotes': str(max_revotes)})
+
+@pytest.mark.parametrize('params', [{'maxRevotes': 'ten'}, {'maxRevotes': '1.5'}, {'tieBreak': 'coin'}])
+def test_invalid_params(params):
+    with pytest.raises(ValueError):
+        VoteRules.from_params(params)
+
+@pytest.mark.parametrize('function', [handler.play, handler.simulate])
+def test_handler_refuses_too_many_revotes(function):
+    response = function({'queryStringParameters': {'maxRevotes': str(MAX_REVOTES + 1), 'games': '1'}}, None)
+    assert response["statusCode"] == 400
+    assert str(MAX_REVOTES) in json.loads(response["body"])["error"]
+
+@pytest.mark.parametrize('tie_break', sorted(TIE_BREAK_POLICIES))
+@pytest.mark.parametrize('engine', ['objects', 'vectorized'])
+def test_simulate_applies_the_rules_to_every_engine(engine, tie_break):
+    params = {'games': '200', 'seed': '1', 'engine': engine, 'tieBreak': tie_break}
+    no_revotes = json.loads(handler.simulate({'queryStringParameters': {**params, 'maxRevotes': '0'}}, None)["body"])
+    revotes = json.loads(handler.simulate({'queryStringParameters': {**params, 'maxRevotes': '3'}}, None)["body"])
+    assert no_revotes["tie_revotes"]["werewolves"] == no_revotes["tie_revotes"]["village"] == 0
+    assert revotes["tie_revotes"]["werewolves"] + revotes["tie_revotes"]["village"] > 0
+
+@pytest.mark.parametrize('engine, games', [('objects', handler.MAX_SIMULATION_GAMES + 1),
+                                           ('vectorized', handler.MAX_VECTORIZED_SIMULATION_GAMES + 1), ('other', 1)])
+def test_simulate_refuses_more_games_than_the_engine_allows(engine, games):
+    response = handler.simulate({'queryStringParameters': {'games': str(games), 'engine': engine}}, None)
+    assert response["statusCode"] == 400
+
+@pytest.mark.parametrize('tie_break', sorted(TIE_BREAK_POLICIES))
+def test_engines_agree_on_the_win_rate(tie_break):
+    # without revotes every tie goes to the tie break, so a difference in how the engines break ties shows
+    rates = {}
+    for engine, games in (('objects', 2000), ('vectorized', 20000)):
+        params = {'games': str(games), 'seed': '3', 'players': '20', 'maxRevotes': '0', 'tieBreak': tie_break,
+                  'engine': engine}
+        body = json.loads(handler.simulate({'queryStringParameters': params}, None)["body"])
+        rates[engine] = (body["win_rate"].get('Villagers', 0.0), games)
+    (objects, objects_games), (vectorized, vectorized_games) = rates['objects'], rates['vectorized']
+    pooled = (objects * objects_games + vectorized * vectorized_games) / (objects_games + vectorized_games)
+    error = math.sqrt(pooled * (1 - pooled) * (1 / objects_games + 1 / vectorized_games))
+    assert abs(objects - vectorized) < 4 * error